@@ -1,6 +1,13 @@
 from datetime import datetime
 from pydantic import BaseModel, Field
-from typing import Optional
+from typing import Optional, List, Literal
+
+# Statuses an admin can set. Every other status frees the registration's
+# seat, so a typo must not get through. Registrations only join the
+# waitlist on their own, when a workshop is full.
+RegistrationStatus = Literal["pending", "approved", "rejected"]
+# Statuses a registration can be found in
+RegistrationStatusFilter = Literal["pending", "approved", "rejected", "waitlisted"]
 
 class RegistrationBase(BaseModel):
     workshop_id: str
@@ -13,23 +20,47 @@ class RegistrationBase(BaseModel):
     parent_name: str
     parent_phone: str
     payment_status: str = "pending"  # pending, completed, failed
-    registration_status: str = "pending"  # pending, approved, rejected
+    registration_status: str = "pending"  # pending, approved, rejected, waitlisted
 
 class RegistrationCreate(RegistrationBase):
     pass
 
 class RegistrationUpdate(BaseModel):
     payment_status: Optional[str] = None
-    registration_status: Optional[str] = None
+    registration_status: Optional[RegistrationStatus] = None
     payment_id: Optional[str] = None
     notes: Optional[str] = None
 
+class RegistrationBulkFilter(BaseModel):
+    workshop_id: Optional[str] = None
+    registration_status: Optional[RegistrationStatusFilter] = None
+
+class RegistrationBulkUpdate(BaseModel):
+    # Select registrations by ids, by filter, or both
+    ids: Optional[List[str]] = None
+    filter: Optional[RegistrationBulkFilter] = None
+    payment_status: Optional[str] = None
+    registration_status: Optional[RegistrationStatus] = None
+    notes: Optional[str] = None
+
+class RegistrationBulkItemResult(BaseModel):
+    id: str
+    status: str  # updated, unchanged, no_seat, conflict, not_found, invalid_id
+
+class RegistrationBulkUpdateResult(BaseModel):
+    matched: int
+    updated: int
+    results: List[RegistrationBulkItemResult]
+
 class Registration(RegistrationBase):
     id: str = Field(default=None, alias="_id")
     created_at: datetime = Field(default_factory=datetime.utcnow)
     payment_id: Optional[str] = None
     amount_paid: Optional[float] = None
     notes: Optional[str] = None
+    promoted_at: Optional[datetime] = None
+    # Place in the workshop's waitlist, set when a waitlisted registration is fetched
+    waitlist_position: Optional[int] = None
     
     class Config:
         populate_by_name = True
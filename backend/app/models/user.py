@@ -53,7 +53,7 @@ class UserInDB(UserBase):
 
 class User(UserBase):
     id: str = Field(default=None, alias="_id")
-    created_at: datetime
+    created_at: datetime = Field(default_factory=datetime.utcnow)
     grade: Optional[int] = None
     school: Optional[str] = None
     phone: Optional[str] = None
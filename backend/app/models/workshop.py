@@ -39,6 +39,28 @@ class Workshop(WorkshopBase):
     id: str = Field(default=None, alias="_id")
     created_at: datetime = Field(default_factory=datetime.utcnow)
     registered_count: int = 0
+    waitlist_count: int = 0
+
+    class Config:
+        populate_by_name = True
+
+class WorkshopSummary(BaseModel):
+    """Workshop fields shown on cards and lists, without the long description"""
+    id: str = Field(default=None, alias="_id")
+    title: str
+    short_description: str
+    image_url: str
+    start_date: datetime
+    end_date: datetime
+    registration_deadline: datetime
+    location: str
+    max_participants: int
+    fee: float
+    eligible_grades: List[int]
+    featured: bool = False
+    status: str = "upcoming"
+    registered_count: int = 0
+    waitlist_count: int = 0
 
     class Config:
         populate_by_name = True
@@ -1,78 +1,99 @@
-from fastapi import APIRouter, HTTPException, Depends, status
-from typing import List, Dict, Any
+from fastapi import APIRouter, HTTPException, Depends, Response, status
+from fastapi.responses import StreamingResponse
+from typing import List, Dict, Any, Optional
 from bson import ObjectId
 from datetime import datetime, timedelta
+import csv
+import io
+import zlib
 
 from app.models.user import User, UserUpdate
-from app.models.registration import Registration
-from app.utils.auth import get_admin_user
+from app.models.registration import Registration, RegistrationStatusFilter
+from app.utils.auth import get_admin_user, invalidate_principal, principal_cache
+from app.utils.hashing import password_hasher
+from app.utils.catalog_cache import catalog_cache
+from app.utils.ratelimit import rate_limit_stats
+from app.utils.admission import admission_controller
+from app.utils.fastjson import trusted_response
+from app.utils.pagination import DEFAULT_PAGE_SIZE, fetch_page
+from app.utils.stats import DASHBOARD_RANGES, get_dashboard_snapshot
+from app.utils.query_audit import QUERY_AUDIT, query_auditor
 from app.utils.db import (
+    get_client,
     workshops_collection, 
     registrations_collection, 
     users_collection,
-    testimonials_collection
+    testimonials_collection,
+    update_document,
+    model_projection
 )
 
 router = APIRouter()
 
 @router.get("/dashboard", response_model=Dict[str, Any])
-async def admin_dashboard(current_user: User = Depends(get_admin_user)):
+async def admin_dashboard(days: int = 7, current_user: User = Depends(get_admin_user)):
     """
-    Get admin dashboard statistics
+    Get admin dashboard statistics from the periodically refreshed snapshot
     """
-    # Count totals
-    total_workshops = await workshops_collection.count_documents({})
-    total_users = await users_collection.count_documents({})
-    total_registrations = await registrations_collection.count_documents({})
-    
-    # Count upcoming workshops
-    upcoming_workshops = await workshops_collection.count_documents({
-        "start_date": {"$gt": datetime.utcnow()}
-    })
-    
-    # Count pending registrations
-    pending_registrations = await registrations_collection.count_documents({
-        "registration_status": "pending"
-    })
-    
-    # Get registration counts for last 7 days
-    seven_days_ago = datetime.utcnow() - timedelta(days=7)
-    daily_registrations = []
-    
-    for i in range(7):
-        date = seven_days_ago + timedelta(days=i)
-        next_date = date + timedelta(days=1)
-        count = await registrations_collection.count_documents({
-            "created_at": {
-                "$gte": date,
-                "$lt": next_date
-            }
-        })
-        daily_registrations.append({
-            "date": date.strftime("%Y-%m-%d"),
-            "count": count
-        })
+    if days not in DASHBOARD_RANGES:
+        raise HTTPException(
+            status_code=400,
+            detail=f"days must be one of {', '.join(str(d) for d in DASHBOARD_RANGES)}"
+        )
     
+    snapshot = await get_dashboard_snapshot()
+    snapshot["daily_registrations"] = snapshot["daily_registrations"][-days:]
+    return snapshot
+
+@router.get("/system/stats", response_model=Dict[str, Any])
+async def admin_system_stats(current_user: User = Depends(get_admin_user)):
+    """
+    Get runtime statistics for this API process
+    """
     return {
-        "total_workshops": total_workshops,
-        "total_users": total_users,
-        "total_registrations": total_registrations,
-        "upcoming_workshops": upcoming_workshops,
-        "pending_registrations": pending_registrations,
-        "daily_registrations": daily_registrations
+        "password_hashing": password_hasher.stats(),
+        "principal_cache": principal_cache.stats(),
+        "catalog_cache": catalog_cache.stats(),
+        "rate_limits": rate_limit_stats(),
+        "admission": admission_controller.stats()
     }
 
-@router.get("/users", response_model=List[User])
-async def admin_get_users(current_user: User = Depends(get_admin_user)):
+@router.get("/system/query-audit", response_model=List[Dict[str, Any]])
+async def admin_query_audit(current_user: User = Depends(get_admin_user)):
+    """
+    Explain the query shapes seen by this process and list the ones that
+    scan a collection or sort in memory (requires QUERY_AUDIT=true)
     """
-    Get all users for admin management
+    if not QUERY_AUDIT:
+        raise HTTPException(status_code=404, detail="Query audit is not enabled")
+    return await query_auditor.audit(get_client())
+
+@router.get("/users", response_model=List[User])
+async def admin_get_users(
+    response: Response,
+    cursor: Optional[str] = None,
+    limit: int = DEFAULT_PAGE_SIZE,
+    role: Optional[str] = None,
+    created_from: Optional[datetime] = None,
+    created_to: Optional[datetime] = None,
+    count: bool = False,
+    current_user: User = Depends(get_admin_user)
+):
     """
-    users = await users_collection.find().to_list(1000)
+    Get users for admin management, newest first.
 
-    for user in users:
-        user["_id"]=str(user["_id"])
+    Pass the X-Next-Cursor response header back as `cursor` to get the next page.
+    """
+    query = {}
+    if role:
+        query["role"] = role
 
-    return users
+    users = await fetch_page(
+        users_collection, query, response, cursor=cursor, limit=limit,
+        created_from=created_from, created_to=created_to, count=count,
+        projection=model_projection(User)
+    )
+    return trusted_response(users, User, response)
 
 @router.put("/users/{user_id}", response_model=User)
 async def admin_update_user(user_id: str, user_update: UserUpdate, current_user: User = Depends(get_admin_user)):
@@ -84,83 +105,161 @@ async def admin_update_user(user_id: str, user_update: UserUpdate, current_user:
     except:
         raise HTTPException(status_code=404, detail="Invalid user ID")
     
-    # Check if user exists
-    user = await users_collection.find_one({"_id": user_obj_id})
-    if not user:
-        raise HTTPException(status_code=404, detail="User not found")
-    
     # Check if admin is trying to update their own user
-    if str(user["_id"]) == str(current_user.id):
+    if user_id == str(current_user.id):
         raise HTTPException(status_code=403, detail="Admin cannot update their own user details")
-    
 
     # Filter out None values
-    update_data = {k: v for k, v in user_update.dict().items() if v is not None}
+    update_data = {k: v for k, v in user_update.model_dump(exclude_unset=True).items() if v is not None}
     
     if not update_data:
         raise HTTPException(status_code=400, detail="No fields to update")
     
     # Update user
-    result = await users_collection.update_one(
+    updated_user = await update_document(
+        users_collection,
         {"_id": user_obj_id},
-        {"$set": update_data}
+        {"$set": update_data},
+        projection=model_projection(User)
     )
     
-    # if result.modified_count == 0:
-    if not result:
-        raise HTTPException(status_code=400, detail="User update failed")
+    if updated_user is None:
+        raise HTTPException(status_code=404, detail="User not found")
     
-    # Get updated user
-    updated_user = await users_collection.find_one({"_id": user_obj_id})
-
-    updated_user["_id"] = str(updated_user["_id"])
+    invalidate_principal(updated_user["email"])
 
     return updated_user
 
 @router.get("/registrations", response_model=List[Registration])
-async def admin_get_registrations(current_user: User = Depends(get_admin_user)):
+async def admin_get_registrations(
+    response: Response,
+    cursor: Optional[str] = None,
+    limit: int = DEFAULT_PAGE_SIZE,
+    workshop_id: Optional[str] = None,
+    registration_status: Optional[RegistrationStatusFilter] = None,
+    created_from: Optional[datetime] = None,
+    created_to: Optional[datetime] = None,
+    count: bool = False,
+    current_user: User = Depends(get_admin_user)
+):
     """
-    Get all registrations for admin management
+    Get registrations for admin management, newest first.
+
+    Pass the X-Next-Cursor response header back as `cursor` to get the next page.
     """
-    registrations = await registrations_collection.find().to_list(1000)
-    for registration in registrations:
-        registration["_id"]=str(registration["_id"])
-    return registrations
+    query = {}
+    if workshop_id:
+        query["workshop_id"] = workshop_id
+    if registration_status:
+        query["registration_status"] = registration_status
+
+    registrations = await fetch_page(
+        registrations_collection, query, response, cursor=cursor, limit=limit,
+        created_from=created_from, created_to=created_to, count=count,
+        projection=model_projection(Registration)
+    )
+    return trusted_response(registrations, Registration, response)
+
+EXPORT_BATCH_SIZE = 500
+
+EXPORT_HEADER = [
+    "Full Name", "Email", "Grade", "School", "Phone", "Parent Name",
+    "Parent Phone", "Status", "Payment Status", "Registration Date"
+]
+
+EXPORT_PROJECTION = {
+    "full_name": 1, "email": 1, "grade": 1, "school": 1, "phone": 1,
+    "parent_name": 1, "parent_phone": 1, "registration_status": 1,
+    "payment_status": 1, "created_at": 1
+}
+
+def registration_csv_row(reg: Dict[str, Any]) -> List[Any]:
+    """Build one export row for a registration document"""
+    created_at = reg.get("created_at", datetime.utcnow()).strftime("%Y-%m-%d")
+    return [
+        reg["full_name"], reg["email"], reg["grade"], reg["school"], reg["phone"],
+        reg["parent_name"], reg["parent_phone"], reg["registration_status"],
+        reg["payment_status"], created_at
+    ]
+
+async def stream_registrations_csv(first_registration, cursor, compress: bool):
+    """
+    Yield CSV chunks of EXPORT_BATCH_SIZE rows, optionally gzip-compressed,
+    so memory use does not grow with the number of registrations
+    """
+    compressor = zlib.compressobj(wbits=31) if compress else None
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+
+    def flush():
+        chunk = buffer.getvalue().encode("utf-8")
+        buffer.seek(0)
+        buffer.truncate()
+        return compressor.compress(chunk) if compressor else chunk
+
+    writer.writerow(EXPORT_HEADER)
+    writer.writerow(registration_csv_row(first_registration))
+    rows = 1
+    async for reg in cursor:
+        writer.writerow(registration_csv_row(reg))
+        rows += 1
+        if rows % EXPORT_BATCH_SIZE == 0:
+            yield flush()
+
+    chunk = flush()
+    if compressor:
+        chunk += compressor.flush()
+    if chunk:
+        yield chunk
 
 @router.post("/export/registrations/{workshop_id}")
-async def export_workshop_registrations(workshop_id: str, current_user: User = Depends(get_admin_user)):
+async def export_workshop_registrations(
+    workshop_id: str,
+    format: str = "csv",
+    gzip: bool = False,
+    current_user: User = Depends(get_admin_user)
+):
     """
-    Export workshop registrations as CSV
+    Export workshop registrations as a streamed CSV download.
+
+    format=json returns the CSV inside a JSON body instead, as the admin
+    frontend expects.
     """
+    if format not in ("csv", "json"):
+        raise HTTPException(status_code=400, detail="format must be csv or json")
+    
     try:
-        workshop = await workshops_collection.find_one({"_id": ObjectId(workshop_id)})
+        workshop = await workshops_collection.find_one({"_id": ObjectId(workshop_id)}, {"title": 1})
     except:
         raise HTTPException(status_code=404, detail="Invalid workshop ID")
     
     if not workshop:
         raise HTTPException(status_code=404, detail="Workshop not found")
     
-    # Get all registrations for this workshop
-    registrations = await registrations_collection.find(
-        {"workshop_id": workshop_id}
-    ).to_list(1000)
+    cursor = registrations_collection.find(
+        {"workshop_id": workshop_id}, EXPORT_PROJECTION
+    ).batch_size(EXPORT_BATCH_SIZE)
     
-    if not registrations:
+    first_registration = await anext(cursor, None)
+    if first_registration is None:
         raise HTTPException(status_code=404, detail="No registrations found for this workshop")
     
-    # Create CSV content
-    csv_header = "Full Name,Email,Grade,School,Phone,Parent Name,Parent Phone,Status,Payment Status,Registration Date\n"
-    csv_rows = []
+    filename = f"workshop_{workshop_id}_registrations.csv"
     
-    for reg in registrations:
-        created_at = reg.get("created_at", datetime.utcnow()).strftime("%Y-%m-%d")
-        row = f"\"{reg['full_name']}\",\"{reg['email']}\",{reg['grade']},\"{reg['school']}\",\"{reg['phone']}\",\"{reg['parent_name']}\",\"{reg['parent_phone']}\",{reg['registration_status']},{reg['payment_status']},{created_at}"
-        csv_rows.append(row)
+    if format == "json":
+        chunks = [chunk async for chunk in stream_registrations_csv(first_registration, cursor, False)]
+        return {
+            "filename": filename,
+            "content": b"".join(chunks).decode("utf-8"),
+            "workshop_title": workshop["title"]
+        }
     
-    csv_content = csv_header + "\n".join(csv_rows)
+    headers = {"Content-Disposition": f'attachment; filename="{filename}"'}
+    if gzip:
+        headers["Content-Encoding"] = "gzip"
     
-    return {
-        "filename": f"workshop_{workshop_id}_registrations.csv",
-        "content": csv_content,
-        "workshop_title": workshop["title"]
-    }
\ No newline at end of file
+    return StreamingResponse(
+        stream_registrations_csv(first_registration, cursor, gzip),
+        media_type="text/csv; charset=utf-8",
+        headers=headers
+    )
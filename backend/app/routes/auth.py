@@ -3,21 +3,23 @@ from fastapi.security import OAuth2PasswordRequestForm
 from datetime import timedelta
 from typing import List, Dict
 from datetime import datetime
-import random
+import secrets
 import string
 from app.models.user import UserCreate, User, Token, LoginCredentials
 from app.utils.auth import (
-    authenticate_user, create_access_token, get_password_hash,
-    ACCESS_TOKEN_EXPIRE_MINUTES, get_current_user, verify_password
+    authenticate_user, create_access_token, get_password_hash_async,
+    ACCESS_TOKEN_EXPIRE_MINUTES, get_current_user, verify_password_async,
+    invalidate_principal
 )
-from app.utils.db import users_collection, parse_mongo_doc, serialize_id
+from app.utils.db import users_collection, parse_mongo_doc, serialize_id, insert_document
 from app.utils.email import send_password_reset, send_otp_email
+from app.utils.otp_store import otp_store, OTP_EXPIRED, OTP_INVALID, OTP_LOCKED, OTP_MISSING
 from pydantic import BaseModel, EmailStr
+from pymongo.errors import DuplicateKeyError
 
 router = APIRouter()
 
-# Store OTPs with expiry time (in-memory storage - in production use Redis)
-otp_store = {}
+OTP_TTL_SECONDS = 30 * 60
 
 class ForgotPasswordRequest(BaseModel):
     email: EmailStr
@@ -33,27 +35,22 @@ class ChangePasswordRequest(BaseModel):
 
 @router.post("/auth/register", response_model=User)
 async def register_user(user: UserCreate):
-    # Check if user already exists
-    if await users_collection.find_one({"email": user.email}):
-        raise HTTPException(
-            status_code=status.HTTP_400_BAD_REQUEST,
-            detail="Email already registered"
-        )
-    
     # Hash the password
-    hashed_password = get_password_hash(user.password)
+    hashed_password = await get_password_hash_async(user.password)
     
     # Create new user
     user_dict = user.model_dump()
     user_dict["password"] = hashed_password
     user_dict["created_at"] = datetime.utcnow()  # Set the current UTC datetime
     
-    new_user = await users_collection.insert_one(user_dict)
-    created_user = await users_collection.find_one({"_id": new_user.inserted_id})
-    
-    # Convert ObjectId to string before returning
-    if created_user:
-        created_user["_id"] = str(created_user["_id"])
+    # The unique email index rejects users that already exist
+    try:
+        created_user = await insert_document(users_collection, user_dict)
+    except DuplicateKeyError:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Email already registered"
+        )
     
     return created_user
 
@@ -89,11 +86,10 @@ async def forgot_password(request: ForgotPasswordRequest):
         return {"message": "If your email is registered, you will receive a password reset OTP"}
     
     # Generate OTP
-    otp = ''.join(random.choices(string.digits, k=6))
+    otp = ''.join(secrets.choice(string.digits) for _ in range(6))
     
     # Store OTP with expiry (30 minutes)
-    expiry_time = datetime.utcnow() + timedelta(minutes=30)
-    otp_store[request.email] = {"otp": otp, "expiry": expiry_time}
+    await otp_store.issue(request.email, otp, OTP_TTL_SECONDS)
     
     # Send OTP email
     await send_otp_email(request.email, user["full_name"], otp)
@@ -102,30 +98,35 @@ async def forgot_password(request: ForgotPasswordRequest):
 
 @router.post("/auth/reset-password", status_code=status.HTTP_200_OK)
 async def reset_password(request: ResetPasswordRequest):
-    # Check if OTP exists and is valid
-    if request.email not in otp_store:
+    # Check the OTP; a valid one is used up by this call
+    otp_status = await otp_store.verify(request.email, request.otp)
+    
+    if otp_status == OTP_MISSING:
         raise HTTPException(
             status_code=status.HTTP_400_BAD_REQUEST,
             detail="Invalid or expired OTP. Please request a new one."
         )
     
-    otp_data = otp_store[request.email]
-    if otp_data["expiry"] < datetime.utcnow():
-        # Remove expired OTP
-        del otp_store[request.email]
+    if otp_status == OTP_EXPIRED:
         raise HTTPException(
             status_code=status.HTTP_400_BAD_REQUEST,
             detail="OTP has expired. Please request a new one."
         )
     
-    if otp_data["otp"] != request.otp:
+    if otp_status == OTP_LOCKED:
+        raise HTTPException(
+            status_code=status.HTTP_429_TOO_MANY_REQUESTS,
+            detail="Too many incorrect attempts. Please request a new OTP."
+        )
+    
+    if otp_status == OTP_INVALID:
         raise HTTPException(
             status_code=status.HTTP_400_BAD_REQUEST,
             detail="Invalid OTP"
         )
     
     # OTP is valid, update password
-    hashed_password = get_password_hash(request.new_password)
+    hashed_password = await get_password_hash_async(request.new_password)
     result = await users_collection.update_one(
         {"email": request.email},
         {"$set": {"password": hashed_password}}
@@ -137,8 +138,7 @@ async def reset_password(request: ResetPasswordRequest):
             detail="Password update failed"
         )
     
-    # Clear OTP
-    del otp_store[request.email]
+    invalidate_principal(request.email)
     
     return {"message": "Password has been reset successfully"}
 
@@ -153,14 +153,14 @@ async def change_password(request: ChangePasswordRequest, current_user: User = D
         )
     
     # Verify old password
-    if not verify_password(request.old_password, user["password"]):
+    if not await verify_password_async(request.old_password, user["password"]):
         raise HTTPException(
             status_code=status.HTTP_400_BAD_REQUEST,
             detail="Incorrect old password"
         )
     
     # Update password
-    hashed_password = get_password_hash(request.new_password)
+    hashed_password = await get_password_hash_async(request.new_password)
     result = await users_collection.update_one(
         {"_id": serialize_id(current_user.id)},
         {"$set": {"password": hashed_password}}
@@ -172,4 +172,6 @@ async def change_password(request: ChangePasswordRequest, current_user: User = D
             detail="Password update failed"
         )
     
+    invalidate_principal(current_user.email)
+    
     return {"message": "Password updated successfully"}
\ No newline at end of file
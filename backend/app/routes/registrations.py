@@ -1,91 +1,253 @@
 from fastapi import APIRouter, HTTPException, Depends, status
 from typing import List, Optional
 from bson import ObjectId
+from pymongo import UpdateOne
+from pymongo.errors import DuplicateKeyError
 from datetime import datetime
+from collections import Counter
 
-from app.models.registration import Registration, RegistrationCreate, RegistrationUpdate
+from app.models.registration import (
+    Registration, RegistrationCreate, RegistrationUpdate,
+    RegistrationBulkUpdate, RegistrationBulkUpdateResult
+)
 from app.models.user import User
-from app.utils.auth import get_current_user, get_admin_user
-from app.utils.db import registrations_collection, workshops_collection, users_collection
-from app.utils.email import send_registration_confirmation, send_registration_approval
+from app.utils.auth import get_current_user, get_optional_user, get_admin_user
+from app.utils.db import (
+    registrations_collection, workshops_collection, users_collection,
+    serialize_id, update_document, model_projection
+)
+from app.utils.fastjson import trusted_response
+from app.utils.email import (
+    send_registration_confirmation, send_registration_approval, send_waitlist_confirmation,
+    registration_approval_message, enqueue_emails
+)
+from app.utils.seats import (
+    RESERVATION_PROJECTION, SEAT_STATUSES, WAITLISTED,
+    reserve_seat, release_seat, raise_reservation_error, change_seat, change_waitlist_count,
+    join_waitlist, waitlist_position
+)
 
 router = APIRouter()
 
 @router.post("/registrations", response_model=Registration)
-async def create_registration(registration: RegistrationCreate, current_user: Optional[User] = Depends(get_current_user)):
-    # Validate workshop exists and is open for registration
-    try:
-        workshop = await workshops_collection.find_one({"_id": ObjectId(registration.workshop_id)})
-    except:
+async def create_registration(registration: RegistrationCreate, current_user: Optional[User] = Depends(get_optional_user)):
+    workshop_obj_id = serialize_id(registration.workshop_id)
+    if not workshop_obj_id:
         raise HTTPException(status_code=404, detail="Invalid workshop ID")
     
-    if not workshop:
-        raise HTTPException(status_code=404, detail="Workshop not found")
+    # If user is logged in, use their data. The unique indexes reject a
+    # second registration by the same user, or by the same guest email,
+    # when inserting.
+    registration.user_id = str(current_user.id) if current_user else None
     
-    if workshop["registration_deadline"] < datetime.utcnow():
-        raise HTTPException(status_code=400, detail="Registration deadline has passed")
+    # Claim a seat; capacity, deadline and status are checked atomically.
+    # A full workshop puts the registration on its waitlist instead.
+    workshop = await reserve_seat(workshop_obj_id)
+    waitlisted = workshop is None
+    if waitlisted:
+        await raise_reservation_error(workshop_obj_id, allow_waitlist=True)
+        workshop = await workshops_collection.find_one({"_id": workshop_obj_id}, RESERVATION_PROJECTION)
     
-    if workshop["status"] not in ["upcoming", "ongoing"]:
-        raise HTTPException(status_code=400, detail="Workshop is not open for registration")
+    # Create registration
+    registration_dict = registration.model_dump()
+    registration_dict["created_at"] = datetime.utcnow()
+    registration_dict["registration_status"] = WAITLISTED if waitlisted else "pending"
     
-    if workshop["registered_count"] >= workshop["max_participants"]:
-        raise HTTPException(status_code=400, detail="Workshop is already full")
+    # Set additional fields
+    registration_dict["amount_paid"] = workshop["fee"]
     
-    # If user is logged in, use their data
-    if current_user:
-        registration.user_id = str(current_user.id)
-        
-        # Check if user already registered
-        existing_reg = await registrations_collection.find_one({
-            "workshop_id": registration.workshop_id,
-            "user_id": registration.user_id
-        })
-        
-        if existing_reg:
-            raise HTTPException(
-                status_code=400,
-                detail="You have already registered for this workshop"
+    try:
+        result = await registrations_collection.insert_one(registration_dict)
+    except DuplicateKeyError:
+        if not waitlisted:
+            await release_seat(workshop_obj_id)
+        # Guests are unique by email, signed-in users by user id
+        if current_user is None:
+            detail = "This email is already registered for this workshop"
+        else:
+            detail = "You have already registered for this workshop"
+        raise HTTPException(status_code=400, detail=detail)
+    except Exception:
+        if not waitlisted:
+            await release_seat(workshop_obj_id)
+        raise
+    registration_dict["_id"] = result.inserted_id
+    
+    if waitlisted:
+        promoted = await join_waitlist(workshop_obj_id)
+        if any(p["_id"] == result.inserted_id for p in promoted):
+            # A seat opened up while joining; the promotion email covers it
+            registration_dict["registration_status"] = "pending"
+        else:
+            registration_dict["waitlist_position"] = await waitlist_position(registration_dict)
+            await send_waitlist_confirmation(
+                registration.email,
+                registration.full_name,
+                workshop["title"],
+                registration_dict["waitlist_position"]
             )
     else:
-        # For guest registration, check if email already registered
-        existing_reg = await registrations_collection.find_one({
-            "workshop_id": registration.workshop_id,
-            "email": registration.email
-        })
-        
-        if existing_reg:
-            raise HTTPException(
-                status_code=400,
-                detail="This email is already registered for this workshop"
-            )
+        # Send confirmation email
+        await send_registration_confirmation(
+            registration.email,
+            registration.full_name,
+            workshop["title"]
+        )
     
-    # Create registration
-    registration_dict = registration.dict()
-    registration_dict["created_at"] = datetime.utcnow()
+    registration_dict["_id"] = str(result.inserted_id)
+    return registration_dict
+
+MAX_BULK_UPDATE = 1000
+
+@router.post("/registrations/bulk-status", response_model=RegistrationBulkUpdateResult)
+async def bulk_update_registration_status(
+    bulk_update: RegistrationBulkUpdate,
+    current_user: User = Depends(get_admin_user)
+):
+    """
+    Change the status of many registrations at once, selected by ids
+    and/or a filter, with a single bulk write. Registrations whose status
+    changes while this runs are reported as conflicts and left alone.
+    """
+    update_data = {
+        k: v for k, v in bulk_update.model_dump(
+            exclude_unset=True, include={"payment_status", "registration_status", "notes"}
+        ).items()
+        if v is not None
+    }
+    if not update_data:
+        raise HTTPException(status_code=400, detail="No fields to update")
     
-    # Set additional fields
-    registration_dict["amount_paid"] = workshop["fee"]
+    new_status = update_data.get("registration_status")
     
-    result = await registrations_collection.insert_one(registration_dict)
+    filter_data = {k: v for k, v in (bulk_update.filter.model_dump(exclude_unset=True) if bulk_update.filter else {}).items() if v is not None}
+    if not bulk_update.ids and not filter_data:
+        raise HTTPException(status_code=400, detail="Provide registration ids or a filter")
     
-    # Update workshop registration count
-    await workshops_collection.update_one(
-        {"_id": ObjectId(registration.workshop_id)},
-        {"$inc": {"registered_count": 1}}
-    )
+    if bulk_update.ids and len(bulk_update.ids) > MAX_BULK_UPDATE:
+        raise HTTPException(status_code=400, detail=f"At most {MAX_BULK_UPDATE} registrations can be updated at once")
     
-    # Send confirmation email
-    await send_registration_confirmation(
-        registration.email,
-        registration.full_name,
-        workshop["title"]
-    )
+    results = []
+    query = dict(filter_data)
+    if bulk_update.ids:
+        object_ids = []
+        for registration_id in dict.fromkeys(bulk_update.ids):
+            obj_id = serialize_id(registration_id)
+            if obj_id:
+                object_ids.append(obj_id)
+            else:
+                results.append({"id": registration_id, "status": "invalid_id"})
+        query["_id"] = {"$in": object_ids}
+    
+    elif await registrations_collection.count_documents(query, limit=MAX_BULK_UPDATE + 1) > MAX_BULK_UPDATE:
+        raise HTTPException(
+            status_code=400,
+            detail=f"The filter matches more than {MAX_BULK_UPDATE} registrations; narrow it down"
+        )
+    
+    registrations = await registrations_collection.find(
+        query,
+        {"email": 1, "full_name": 1, "workshop_id": 1, "payment_status": 1, "registration_status": 1, "notes": 1}
+    ).to_list(MAX_BULK_UPDATE)
+    
+    found = {str(reg["_id"]) for reg in registrations}
+    if bulk_update.ids:
+        for obj_id in query["_id"]["$in"]:
+            if str(obj_id) not in found:
+                results.append({"id": str(obj_id), "status": "not_found"})
+    
+    # Only write registrations that actually change
+    changed = [
+        reg for reg in registrations
+        if any(reg.get(field) != value for field, value in update_data.items())
+    ]
     
-    # Retrieve the registration and convert _id to string
-    new_registration = await registrations_collection.find_one({"_id": result.inserted_id})
-    new_registration["_id"] = str(new_registration["_id"])
+    # Registrations leaving rejected or the waitlist need a free seat first;
+    # the ones that can't get one are left as they are
+    no_seat = set()
+    if new_status in SEAT_STATUSES:
+        for reg in changed:
+            old_status = reg.get("registration_status")
+            if old_status not in SEAT_STATUSES:
+                if not await change_seat(serialize_id(reg["workshop_id"]), old_status, new_status):
+                    no_seat.add(reg["_id"])
+        changed = [reg for reg in changed if reg["_id"] not in no_seat]
     
-    return new_registration
+    # Each write only applies if the registration still has the status the
+    # seat changes above were based on. The marker shows which writes did.
+    conflicts = set()
+    if changed:
+        marker = ObjectId()
+        result = await registrations_collection.bulk_write(
+            [
+                UpdateOne(
+                    {"_id": reg["_id"], "registration_status": reg.get("registration_status")},
+                    {"$set": {**update_data, "bulk_update_id": marker}}
+                )
+                for reg in changed
+            ],
+            ordered=False
+        )
+        if result.matched_count < len(changed):
+            written = {
+                doc["_id"] async for doc in registrations_collection.find(
+                    {"_id": {"$in": [reg["_id"] for reg in changed]}, "bulk_update_id": marker}, {"_id": 1}
+                )
+            }
+            lost = [reg for reg in changed if reg["_id"] not in written]
+            conflicts = {reg["_id"] for reg in lost}
+            changed = [reg for reg in changed if reg["_id"] in written]
+            # Give back the seats claimed for registrations that changed meanwhile
+            if new_status in SEAT_STATUSES:
+                for reg in lost:
+                    old_status = reg.get("registration_status")
+                    if old_status not in SEAT_STATUSES:
+                        await change_seat(serialize_id(reg["workshop_id"]), new_status, old_status)
+    
+    changed_ids = {reg["_id"] for reg in changed}
+    for reg in registrations:
+        if reg["_id"] in no_seat:
+            item_status = "no_seat"
+        elif reg["_id"] in conflicts:
+            item_status = "conflict"
+        else:
+            item_status = "updated" if reg["_id"] in changed_ids else "unchanged"
+        results.append({"id": str(reg["_id"]), "status": item_status})
+    
+    # Free seats and waitlist places given up by the write, per workshop
+    if new_status:
+        transitions = Counter(
+            (reg["workshop_id"], reg.get("registration_status")) for reg in changed
+            if reg.get("registration_status") != new_status
+            and not (reg.get("registration_status") not in SEAT_STATUSES and new_status in SEAT_STATUSES)
+        )
+        for (workshop_id, old_status), count in transitions.items():
+            workshop_obj_id = serialize_id(workshop_id)
+            if workshop_obj_id:
+                await change_seat(workshop_obj_id, old_status, new_status, count)
+    
+    # Queue approval emails for newly approved registrations in one batch
+    if update_data.get("registration_status") == "approved":
+        approved = [reg for reg in changed if reg.get("registration_status") != "approved"]
+        workshop_ids = {serialize_id(reg["workshop_id"]) for reg in approved} - {None}
+        workshops = {}
+        if workshop_ids:
+            async for workshop in workshops_collection.find(
+                {"_id": {"$in": list(workshop_ids)}}, {"title": 1, "start_date": 1}
+            ):
+                workshops[str(workshop["_id"])] = workshop
+        
+        await enqueue_emails([
+            registration_approval_message(
+                reg["email"],
+                reg["full_name"],
+                workshops[reg["workshop_id"]]["title"],
+                workshops[reg["workshop_id"]]["start_date"].strftime("%Y-%m-%d %H:%M")
+            )
+            for reg in approved if reg["workshop_id"] in workshops
+        ])
+    
+    return {"matched": len(registrations), "updated": len(changed), "results": results}
 
 @router.get("/registrations/me", response_model=List[Registration])
 async def get_my_registrations(current_user: User = Depends(get_current_user)):
@@ -94,13 +256,11 @@ async def get_my_registrations(current_user: User = Depends(get_current_user)):
     
     if current_user:
         registrations = await registrations_collection.find(
-            {"user_id": str(current_user.id)}
+            {"user_id": str(current_user.id)},
+            model_projection(Registration)
         ).to_list(1000)
     
-    for registration in registrations:
-        registration["_id"] = str(registration["_id"])
-
-    return registrations
+    return trusted_response(registrations, Registration)
 
 @router.get("/registrations/{registration_id}", response_model=Registration)
 async def get_registration(registration_id: str, current_user: User = Depends(get_current_user)):
@@ -119,6 +279,9 @@ async def get_registration(registration_id: str, current_user: User = Depends(ge
     ):
         raise HTTPException(status_code=403, detail="Not authorized to view this registration")
     
+    if registration.get("registration_status") == WAITLISTED:
+        registration["waitlist_position"] = await waitlist_position(registration)
+    
     return registration
 
 @router.put("/registrations/{registration_id}", response_model=Registration)
@@ -127,36 +290,60 @@ async def update_registration_status(
     update: RegistrationUpdate,
     current_user: User = Depends(get_admin_user)
 ):
-    try:
-        registration = await registrations_collection.find_one({"_id": ObjectId(registration_id)})
-    except:
+    registration_obj_id = serialize_id(registration_id)
+    if not registration_obj_id:
         raise HTTPException(status_code=404, detail="Invalid registration ID")
     
-    if not registration:
-        raise HTTPException(status_code=404, detail="Registration not found")
-    
     # Filter out None values
-    update_data = {k: v for k, v in update.dict().items() if v is not None}
+    update_data = {k: v for k, v in update.model_dump(exclude_unset=True).items() if v is not None}
     
     if not update_data:
         raise HTTPException(status_code=400, detail="No fields to update")
     
+    new_status = update_data.get("registration_status")
+    
+    # Status changes move seats: claim one before leaving rejected or the
+    # waitlist, free one after a rejection. The write is guarded on the
+    # status read here so the seat counts can't drift.
+    query = {"_id": registration_obj_id}
+    needs_seat = False
+    if new_status:
+        current = await registrations_collection.find_one(
+            {"_id": registration_obj_id}, {"workshop_id": 1, "registration_status": 1}
+        )
+        if current is None:
+            raise HTTPException(status_code=404, detail="Registration not found")
+        old_status = current.get("registration_status")
+        workshop_obj_id = ObjectId(current["workshop_id"])
+        needs_seat = old_status not in SEAT_STATUSES and new_status in SEAT_STATUSES
+        if needs_seat and not await change_seat(workshop_obj_id, old_status, new_status):
+            raise HTTPException(status_code=400, detail="Workshop is already full")
+        query["registration_status"] = old_status
+    
     # Update registration
-    result = await registrations_collection.update_one(
-        {"_id": ObjectId(registration_id)},
+    updated_registration = await update_document(
+        registrations_collection,
+        query,
         {"$set": update_data}
     )
     
-    if result.modified_count == 0:
-        raise HTTPException(status_code=404, detail="Registration not updated")
+    if updated_registration is None:
+        if new_status:
+            if needs_seat:
+                await change_seat(workshop_obj_id, new_status, old_status)
+            raise HTTPException(status_code=409, detail="Registration was changed meanwhile, please retry")
+        raise HTTPException(status_code=404, detail="Registration not found")
     
-    # Fetch updated registration
-    updated_registration = await registrations_collection.find_one({"_id": ObjectId(registration_id)})
+    if new_status and not needs_seat and old_status != new_status:
+        await change_seat(workshop_obj_id, old_status, new_status)
     
     # If registration status was changed to approved, send email
     if update.registration_status == "approved":
         # Get workshop details
-        workshop = await workshops_collection.find_one({"_id": ObjectId(registration["workshop_id"])})
+        workshop = await workshops_collection.find_one(
+            {"_id": ObjectId(updated_registration["workshop_id"])},
+            {"title": 1, "start_date": 1}
+        )
         
         if workshop:
             # Send approval email
@@ -171,29 +358,29 @@ async def update_registration_status(
 
 @router.delete("/registrations/{registration_id}", status_code=status.HTTP_204_NO_CONTENT)
 async def cancel_registration(registration_id: str, current_user: User = Depends(get_current_user)):
-    try:
-        registration = await registrations_collection.find_one({"_id": ObjectId(registration_id)})
-    except:
+    registration_obj_id = serialize_id(registration_id)
+    if not registration_obj_id:
         raise HTTPException(status_code=404, detail="Invalid registration ID")
     
-    if not registration:
-        raise HTTPException(status_code=404, detail="Registration not found")
-    
-    # Ensure user can only cancel their own registrations unless they're admin
-    if current_user.role != "admin" and (
-        not registration.get("user_id") or 
-        str(registration.get("user_id")) != str(current_user.id)
-    ):
-        raise HTTPException(status_code=403, detail="Not authorized to cancel this registration")
+    # Users can only cancel their own registrations unless they're admin;
+    # the ownership check is part of the delete filter
+    query = {"_id": registration_obj_id}
+    if current_user.role != "admin":
+        query["user_id"] = str(current_user.id)
     
-    # Delete registration
-    result = await registrations_collection.delete_one({"_id": ObjectId(registration_id)})
+    registration = await registrations_collection.find_one_and_delete(
+        query, projection={"workshop_id": 1, "registration_status": 1}
+    )
     
-    if result.deleted_count == 0:
+    if not registration:
+        if await registrations_collection.find_one({"_id": registration_obj_id}, {"_id": 1}):
+            raise HTTPException(status_code=403, detail="Not authorized to cancel this registration")
         raise HTTPException(status_code=404, detail="Registration not found")
     
-    # Decrease workshop registration count
-    await workshops_collection.update_one(
-        {"_id": ObjectId(registration["workshop_id"])},
-        {"$inc": {"registered_count": -1}}
-    )
\ No newline at end of file
+    # Free the seat for the waitlist, or the waitlist place
+    workshop_obj_id = ObjectId(registration["workshop_id"])
+    registration_status = registration.get("registration_status", "pending")
+    if registration_status in SEAT_STATUSES:
+        await release_seat(workshop_obj_id)
+    elif registration_status == WAITLISTED:
+        await change_waitlist_count(workshop_obj_id, -1)
@@ -1,10 +1,12 @@
-from fastapi import APIRouter, HTTPException, Depends, status
+from fastapi import APIRouter, HTTPException, Depends, Response, status
 from typing import List, Optional
 from bson import ObjectId
 
 from app.models.user import User, UserUpdate
-from app.utils.auth import get_current_user, get_admin_user, get_password_hash
-from app.utils.db import users_collection
+from app.utils.auth import get_current_user, get_admin_user, get_password_hash, invalidate_principal
+from app.utils.db import users_collection, update_document, model_projection
+from app.utils.fastjson import trusted_response
+from app.utils.pagination import fetch_page
 
 router = APIRouter()
 
@@ -15,7 +17,7 @@ async def get_user_profile(current_user: User = Depends(get_current_user)):
 @router.put("/users/me", response_model=User)
 async def update_user_profile(user_update: UserUpdate, current_user: User = Depends(get_current_user)):
     # Filter out None values
-    update_data = {k: v for k, v in user_update.dict().items() if v is not None}
+    update_data = {k: v for k, v in user_update.model_dump(exclude_unset=True).items() if v is not None}
     
     if not update_data:
         raise HTTPException(
@@ -24,36 +26,53 @@ async def update_user_profile(user_update: UserUpdate, current_user: User = Depe
         )
     
     # Update user document
-    result = await users_collection.update_one(
+    updated_user = await update_document(
+        users_collection,
         {"_id": ObjectId(current_user.id)},
-        {"$set": update_data}
+        {"$set": update_data},
+        projection=model_projection(User)
     )
     
-    if result.modified_count == 0:
+    if updated_user is None:
         raise HTTPException(
             status_code=status.HTTP_400_BAD_REQUEST,
             detail="User update failed"
         )
     
-    # Get updated user
-    updated_user = await users_collection.find_one({"_id": ObjectId(current_user.id)})
+    invalidate_principal(current_user.email)
+    
     return updated_user
 
 @router.get("/users", response_model=List[User])
-async def get_users(skip: int = 0, limit: int = 100, role: Optional[str] = None, current_user: User = Depends(get_admin_user)):
+async def get_users(
+    response: Response,
+    skip: int = 0,
+    limit: int = 100,
+    role: Optional[str] = None,
+    cursor: Optional[str] = None,
+    current_user: User = Depends(get_admin_user)
+):
     # Only admin can get list of users
     query = {}
     if role:
         query["role"] = role
     
-    users = await users_collection.find(query).skip(skip).limit(limit).to_list(limit)
-    return users
+    # skip is kept for older clients; cursor paging stays fast at any depth
+    if skip and not cursor:
+        users = await users_collection.find(query, model_projection(User)).skip(skip).limit(limit).to_list(limit)
+        return trusted_response(users, User)
+    
+    users = await fetch_page(
+        users_collection, query, response, cursor=cursor, limit=limit,
+        projection=model_projection(User)
+    )
+    return trusted_response(users, User, response)
 
 @router.get("/users/{user_id}", response_model=User)
 async def get_user(user_id: str, current_user: User = Depends(get_admin_user)):
     # Only admin can get user details
     try:
-        user = await users_collection.find_one({"_id": ObjectId(user_id)})
+        user = await users_collection.find_one({"_id": ObjectId(user_id)}, model_projection(User))
     except:
         raise HTTPException(status_code=404, detail="Invalid user ID")
     
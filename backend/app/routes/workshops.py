@@ -1,24 +1,51 @@
-from fastapi import APIRouter, HTTPException, Depends, Query, status
-from typing import List, Optional
+from fastapi import APIRouter, HTTPException, Depends, Query, Request, status
+from fastapi.responses import StreamingResponse
+from typing import List, Optional, Union
 from bson import ObjectId
 from datetime import datetime
 
-from app.models.workshop import Workshop, WorkshopCreate, WorkshopUpdate
+from app.models.workshop import Workshop, WorkshopCreate, WorkshopUpdate, WorkshopSummary
 from app.models.user import User
 from app.utils.auth import get_current_user, get_admin_user
-from app.utils.db import workshops_collection, registrations_collection, serialize_id, parse_mongo_doc, serialize_list
+from app.utils.db import (
+    workshops_collection, registrations_collection, serialize_id,
+    insert_document, update_document, model_projection
+)
+from app.utils.catalog_cache import (
+    catalog_cache, cache_workshop, cache_workshop_list, cached_response, invalidate_catalog,
+    current_generation
+)
+from app.utils.search import PREFIX_FIELDS, search_prefixes, text_search_filter
+from app.utils.seats import promote_from_waitlist
+from app.utils.events import seat_broadcaster, CATALOG
 
 router = APIRouter()
 
-@router.get("/workshops", response_model=List[Workshop])
+# Tries at an update whose other text field keeps changing underneath it
+PREFIX_UPDATE_ATTEMPTS = 3
+
+@router.get("/workshops", response_model=Union[List[Workshop], List[WorkshopSummary]])
 async def get_workshops(
+    request: Request,
     skip: int = 0, 
     limit: int = 20,
     status: Optional[str] = None,
     grade: Optional[int] = None,
     featured: Optional[bool] = None,
-    search: Optional[str] = None
+    search: Optional[str] = None,
+    view: str = "full"
 ):
+    # view=summary leaves out the long description for cards and lists
+    if view not in ("full", "summary"):
+        raise HTTPException(status_code=400, detail="view must be full or summary")
+    summary = view == "summary"
+    
+    cache_key = ("list", skip, limit, status, grade, featured, search, view)
+    entry = catalog_cache.get(cache_key)
+    if entry is not None:
+        return cached_response(request, entry)
+    generation = current_generation()
+    
     # Build query filters
     query = {}
     if status:
@@ -27,40 +54,86 @@ async def get_workshops(
         query["eligible_grades"] = grade
     if featured is not None:
         query["featured"] = featured
+    
+    projection = model_projection(WorkshopSummary if summary else Workshop)
+    sort = [("start_date", 1)]
     if search:
-        query["$or"] = [
-            {"title": {"$regex": search, "$options": "i"}},
-            {"description": {"$regex": search, "$options": "i"}},
-        ]
+        search_filter = text_search_filter(search)
+        if search_filter is None:
+            return cached_response(request, cache_workshop_list(cache_key, [], generation, summary))
+        query.update(search_filter)
+        # Most relevant first, ties broken by date. MongoDB 4.4+ sorts on the
+        # text score without projecting it, so it never reaches the response
+        sort = [("score", {"$meta": "textScore"}), ("start_date", 1)]
 
     # Get workshops
-    cursor = workshops_collection.find(query).sort("start_date", 1).skip(skip).limit(limit)
-    workshops = await serialize_list(cursor)
-    return workshops
+    cursor = workshops_collection.find(query, projection).sort(sort).skip(skip).limit(limit)
+    workshops = await cursor.to_list(limit)
+    return cached_response(request, cache_workshop_list(cache_key, workshops, generation, summary))
+
+async def seat_event_response(key: str):
+    # Subscribe before reading the snapshot so no change falls in between
+    subscription = seat_broadcaster.subscribe(key)
+    if subscription is None:
+        raise HTTPException(status_code=503, detail="Too many live connections, poll instead")
+    try:
+        initial = await seat_broadcaster.snapshot(key)
+    except Exception:
+        seat_broadcaster.unsubscribe(subscription)
+        raise
+    if initial is None:
+        seat_broadcaster.unsubscribe(subscription)
+        raise HTTPException(status_code=404, detail="Workshop not found")
+    return StreamingResponse(
+        seat_broadcaster.stream(subscription, initial),
+        media_type="text/event-stream",
+        # Stop proxies from buffering the stream
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
+
+@router.get("/workshops/events")
+async def workshop_catalog_events():
+    """Server-sent events with the seat counts of every workshop whose seats change"""
+    return await seat_event_response(CATALOG)
+
+@router.get("/workshops/{workshop_id}/events")
+async def workshop_events(workshop_id: str):
+    """Server-sent events with one workshop's seat counts and status"""
+    if not serialize_id(workshop_id):
+        raise HTTPException(status_code=404, detail="Invalid workshop ID")
+    return await seat_event_response(workshop_id)
 
 @router.get("/workshops/{workshop_id}", response_model=Workshop)
-async def get_workshop(workshop_id: str):
+async def get_workshop(workshop_id: str, request: Request):
+    cache_key = ("workshop", workshop_id)
+    entry = catalog_cache.get(cache_key)
+    if entry is not None:
+        return cached_response(request, entry)
+    generation = current_generation()
+    
     obj_id = serialize_id(workshop_id)
     if not obj_id:
         raise HTTPException(status_code=404, detail="Invalid workshop ID")
     
-    workshop = await workshops_collection.find_one({"_id": obj_id})
+    workshop = await workshops_collection.find_one({"_id": obj_id}, model_projection(Workshop))
     
     if workshop is None:
         raise HTTPException(status_code=404, detail="Workshop not found")
     
-    return parse_mongo_doc(workshop)
+    return cached_response(request, cache_workshop(cache_key, workshop, generation))
 
 @router.post("/workshops", response_model=Workshop)
 async def create_workshop(workshop: WorkshopCreate, current_user: User = Depends(get_admin_user)):
     workshop_dict = workshop.model_dump()
     workshop_dict["created_at"] = datetime.utcnow()
     workshop_dict["registered_count"] = 0
+    workshop_dict["waitlist_count"] = 0
+    workshop_dict["search_prefixes"] = search_prefixes(workshop_dict)
     
-    result = await workshops_collection.insert_one(workshop_dict)
-    created_workshop = await workshops_collection.find_one({"_id": result.inserted_id})
+    created_workshop = await insert_document(workshops_collection, workshop_dict)
+    invalidate_catalog(created_workshop["_id"])
     
-    return parse_mongo_doc(created_workshop)
+    return created_workshop
 
 @router.put("/workshops/{workshop_id}", response_model=Workshop)
 async def update_workshop(workshop_id: str, workshop_update: WorkshopUpdate, current_user: User = Depends(get_admin_user)):
@@ -77,21 +150,48 @@ async def update_workshop(workshop_id: str, workshop_update: WorkshopUpdate, cur
             detail="No fields to update"
         )
     
-    # Update workshop
-    result = await workshops_collection.update_one(
-        {"_id": obj_id},
-        {"$set": update_data}
-    )
-    
-    if result.modified_count == 0:
+    # Prefix search is kept in sync in the same write. When only one of
+    # the text fields changes, the other is read first and the write only
+    # applies if it is still the same, so the prefixes never mix old and
+    # new text.
+    not_found = HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Workshop not found")
+    for _ in range(PREFIX_UPDATE_ATTEMPTS):
+        query = {"_id": obj_id}
+        if any(field in update_data for field in PREFIX_FIELDS):
+            text = {field: update_data[field] for field in PREFIX_FIELDS if field in update_data}
+            unchanged = [field for field in PREFIX_FIELDS if field not in update_data]
+            if unchanged:
+                current = await workshops_collection.find_one(query, {field: 1 for field in unchanged})
+                if current is None:
+                    raise not_found
+                for field in unchanged:
+                    text[field] = query[field] = current.get(field)
+            update_data["search_prefixes"] = search_prefixes(text)
+        
+        updated_workshop = await update_document(
+            workshops_collection,
+            query,
+            {"$set": update_data}
+        )
+        if updated_workshop is not None:
+            break
+        if len(query) == 1:
+            raise not_found
+    else:
         raise HTTPException(
-            status_code=status.HTTP_404_NOT_FOUND, 
-            detail="Workshop not found or no changes made"
+            status_code=status.HTTP_409_CONFLICT,
+            detail="The workshop was changed at the same time, please try again"
         )
     
-    # Get updated workshop
-    updated_workshop = await workshops_collection.find_one({"_id": obj_id})
-    return parse_mongo_doc(updated_workshop)
+    invalidate_catalog(obj_id)
+    
+    # Seats added to a full workshop go to its waitlist
+    if "max_participants" in update_data:
+        promoted = await promote_from_waitlist(obj_id)
+        updated_workshop["registered_count"] = updated_workshop.get("registered_count", 0) + len(promoted)
+        updated_workshop["waitlist_count"] = updated_workshop.get("waitlist_count", 0) - len(promoted)
+    
+    return updated_workshop
 
 @router.delete("/workshops/{workshop_id}", status_code=status.HTTP_204_NO_CONTENT)
 async def delete_workshop(workshop_id: str, current_user: User = Depends(get_admin_user)):
@@ -99,11 +199,6 @@ async def delete_workshop(workshop_id: str, current_user: User = Depends(get_adm
     if not obj_id:
         raise HTTPException(status_code=404, detail="Invalid workshop ID")
     
-    # Check if workshop exists
-    workshop = await workshops_collection.find_one({"_id": obj_id})
-    if not workshop:
-        raise HTTPException(status_code=404, detail="Workshop not found")
-    
     # Check if there are any registrations
     registrations = await registrations_collection.count_documents({"workshop_id": workshop_id})
     if registrations > 0:
@@ -114,5 +209,6 @@ async def delete_workshop(workshop_id: str, current_user: User = Depends(get_adm
     
     # Delete workshop
     result = await workshops_collection.delete_one({"_id": obj_id})
+    invalidate_catalog(obj_id)
     if result.deleted_count == 0:
         raise HTTPException(status_code=404, detail="Workshop not found")
\ No newline at end of file
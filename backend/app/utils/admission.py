@@ -0,0 +1,313 @@
+import os
+import hmac
+import json
+import math
+import time
+import bisect
+import asyncio
+import hashlib
+import secrets
+from bson import ObjectId
+from dotenv import load_dotenv
+
+from app.utils.auth import SECRET_KEY
+from app.utils.ratelimit import RATE_LIMIT_WORKERS, read_body
+from app.utils.metrics import admission_outcomes, admission_queue_length, admission_wait_duration
+
+load_dotenv()
+
+ADMISSION_ENABLED = os.getenv("ADMISSION_ENABLED", "true").lower() == "true"
+# Registrations for one workshop handled at once, across all workers;
+# like the rate limits, each worker admits its share
+ADMISSION_CONCURRENCY = int(os.getenv("ADMISSION_CONCURRENCY", "16"))
+ADMISSION_WORKER_CONCURRENCY = max(1, ADMISSION_CONCURRENCY // RATE_LIMIT_WORKERS)
+ADMISSION_MAX_QUEUE = int(os.getenv("ADMISSION_MAX_QUEUE", "5000"))
+# How long a request waits in line before it is answered with a queue token
+ADMISSION_HOLD_SECONDS = float(os.getenv("ADMISSION_HOLD_SECONDS", "5"))
+# How long a place is kept for a client that got a token and hasn't retried yet
+ADMISSION_TOKEN_TTL_SECONDS = float(os.getenv("ADMISSION_TOKEN_TTL_SECONDS", "30"))
+ADMISSION_MAX_RETRY_AFTER = int(os.getenv("ADMISSION_MAX_RETRY_AFTER", "10"))
+
+QUEUE_TOKEN_HEADER = b"x-queue-token"
+
+# acquire() results
+ADMITTED = "admitted"
+QUEUED = "queued"
+FULL = "full"
+
+def token_signature(payload: str) -> str:
+    return hmac.new(SECRET_KEY.encode("utf-8"), payload.encode("utf-8"), hashlib.sha256).hexdigest()[:32]
+
+def issue_token(workshop_id: str, arrived: float, place: str) -> str:
+    """
+    A signed queue token carrying the holder's arrival time, so any worker
+    can put a returning client back at its place in line. A fresh token
+    is issued with every queued response and is only good for
+    ADMISSION_TOKEN_TTL_SECONDS.
+    """
+    payload = f"{int(arrived * 1000)}.{int(time.time() * 1000)}.{workshop_id}.{place}"
+    return f"{payload}.{token_signature(payload)}"
+
+def parse_token(token: str, workshop_id: str):
+    """(arrival time, place id) of a valid, unexpired token for this workshop, or None"""
+    payload, _, signature = token.rpartition(".")
+    if not payload or not hmac.compare_digest(signature, token_signature(payload)):
+        return None
+    try:
+        arrived_ms, issued_ms, token_workshop, place = payload.split(".", 3)
+        arrived, issued = int(arrived_ms) / 1000, int(issued_ms) / 1000
+    except ValueError:
+        return None
+    if token_workshop != workshop_id or time.time() - issued > ADMISSION_TOKEN_TTL_SECONDS:
+        return None
+    return arrived, place
+
+class Ticket:
+    __slots__ = ("place", "arrived", "waiter", "last_seen", "reserved_until")
+
+    def __init__(self, place: str, arrived: float):
+        self.place = place
+        self.arrived = arrived
+        self.waiter = None
+        self.last_seen = time.monotonic()
+        self.reserved_until = None
+
+class WorkshopGate:
+    """
+    Admits at most `budget` registrations for one workshop at a time and
+    queues the rest in arrival order. When a slot frees up it goes to the
+    head of the line: straight to a request waiting in line, or held for
+    ADMISSION_TOKEN_TTL_SECONDS for a client that is between retries.
+    A place is used up once admitted; its tokens can't queue again.
+    """
+
+    def __init__(self, budget: int):
+        self.budget = budget
+        self.active = 0
+        self.queue = []  # (arrived, place), oldest first
+        self.tickets = {}
+        self.reserved = {}
+        self.spent = {}  # place -> when its last token expires
+        self.service_seconds = 0.5  # moving average, for wait estimates
+
+    def idle(self) -> bool:
+        self._expire_spent(time.monotonic())
+        return not self.active and not self.queue and not self.reserved and not self.spent
+
+    def position(self, ticket: Ticket) -> int:
+        return bisect.bisect_left(self.queue, (ticket.arrived, ticket.place)) + 1
+
+    def estimated_wait(self, position: int) -> float:
+        return math.ceil(position / self.budget) * self.service_seconds
+
+    def _remove(self, ticket: Ticket):
+        index = bisect.bisect_left(self.queue, (ticket.arrived, ticket.place))
+        if index < len(self.queue) and self.queue[index][1] == ticket.place:
+            del self.queue[index]
+        self.tickets.pop(ticket.place, None)
+
+    def _spend(self, place: str, now: float):
+        self.spent[place] = now + ADMISSION_TOKEN_TTL_SECONDS
+
+    def _expire_spent(self, now: float):
+        for place, until in list(self.spent.items()):
+            if until < now:
+                del self.spent[place]
+
+    def _pump(self):
+        now = time.monotonic()
+        self._expire_spent(now)
+        for place, ticket in list(self.reserved.items()):
+            if ticket.reserved_until < now:
+                del self.reserved[place]
+                self._spend(place, now)
+                self.active -= 1
+
+        while self.active < self.budget and self.queue:
+            _, place = self.queue.pop(0)
+            ticket = self.tickets.pop(place)
+            if ticket.waiter is not None and not ticket.waiter.done():
+                self.active += 1
+                self._spend(place, now)
+                ticket.waiter.set_result(True)
+            elif ticket.last_seen + ADMISSION_TOKEN_TTL_SECONDS >= now:
+                # Hold the slot until the client comes back with its token
+                self.active += 1
+                ticket.reserved_until = now + ADMISSION_TOKEN_TTL_SECONDS
+                self.reserved[place] = ticket
+            # otherwise the client gave up
+
+    async def acquire(self, workshop_id: str, token=None):
+        """
+        Returns (ADMITTED, None), (QUEUED, ticket) once the hold time runs
+        out, or (FULL, None) when the line is too long to join. Expired,
+        forged or already admitted tokens count as a new arrival.
+        """
+        self._pump()
+        parsed = parse_token(token, workshop_id) if token else None
+        ticket = None
+        if parsed is not None and parsed[1] not in self.spent:
+            arrived, place = parsed
+            held = self.reserved.pop(place, None)
+            if held is not None:
+                self._spend(place, time.monotonic())
+                return ADMITTED, None
+            # Unknown places were queued by another worker, or by this one before a restart
+            ticket = self.tickets.get(place) or Ticket(place, arrived)
+        if ticket is None:
+            if self.active < self.budget and not self.queue:
+                self.active += 1
+                return ADMITTED, None
+            if len(self.queue) >= ADMISSION_MAX_QUEUE:
+                return FULL, None
+            ticket = Ticket(secrets.token_hex(8), time.time())
+        if ticket.place not in self.tickets:
+            bisect.insort(self.queue, (ticket.arrived, ticket.place))
+            self.tickets[ticket.place] = ticket
+
+        ticket.last_seen = time.monotonic()
+        ticket.waiter = waiter = asyncio.get_running_loop().create_future()
+        self._pump()
+        try:
+            await asyncio.wait_for(asyncio.shield(waiter), ADMISSION_HOLD_SECONDS)
+        except asyncio.TimeoutError:
+            pass
+        except asyncio.CancelledError:
+            if waiter.done():
+                self.release(None)
+            else:
+                self._remove(ticket)
+            raise
+        if waiter.done():
+            return ADMITTED, None
+        ticket.waiter = None
+        ticket.last_seen = time.monotonic()
+        return QUEUED, ticket
+
+    def release(self, elapsed):
+        self.active -= 1
+        if elapsed is not None:
+            self.service_seconds = 0.8 * self.service_seconds + 0.2 * elapsed
+        self._pump()
+
+class AdmissionController:
+    """Per-workshop gates, created on first use and dropped when idle"""
+
+    def __init__(self, budget: int):
+        self.budget = budget
+        self.gates = {}
+        self.admitted = 0
+        self.queued = 0
+        self.rejected = 0
+
+    def gate(self, workshop_id: str) -> WorkshopGate:
+        gate = self.gates.get(workshop_id)
+        if gate is None:
+            gate = self.gates[workshop_id] = WorkshopGate(self.budget)
+        return gate
+
+    def discard_if_idle(self, workshop_id: str):
+        gate = self.gates.get(workshop_id)
+        if gate is not None and gate.idle():
+            del self.gates[workshop_id]
+
+    def stats(self):
+        return {
+            "budget_per_workshop": self.budget,
+            "admitted": self.admitted,
+            "queued": self.queued,
+            "rejected": self.rejected,
+            "workshops": {
+                workshop_id: {"active": gate.active, "queued": len(gate.queue), "reserved": len(gate.reserved)}
+                for workshop_id, gate in self.gates.items()
+            },
+        }
+
+admission_controller = AdmissionController(ADMISSION_WORKER_CONCURRENCY)
+
+def header_value(scope, header: bytes):
+    for name, value in scope.get("headers", []):
+        if name == header:
+            return value.decode("latin-1")
+    return None
+
+async def send_json(send, status_code: int, content: dict, retry_after: int):
+    body = json.dumps(content).encode("utf-8")
+    await send({
+        "type": "http.response.start",
+        "status": status_code,
+        "headers": [
+            (b"content-type", b"application/json"),
+            (b"content-length", str(len(body)).encode("latin-1")),
+            (b"retry-after", str(retry_after).encode("latin-1")),
+        ],
+    })
+    await send({"type": "http.response.body", "body": body})
+
+class AdmissionMiddleware:
+    """
+    Waiting room for POST /api/registrations. Each workshop admits
+    ADMISSION_CONCURRENCY registrations at a time; the rest wait in line
+    for up to ADMISSION_HOLD_SECONDS and then get 429 with a queue token,
+    their position and an estimated wait. Retrying with the token in the
+    X-Queue-Token header keeps the client's place, so registrations are
+    admitted first come, first served instead of timing out together.
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if (
+            not ADMISSION_ENABLED or scope["type"] != "http"
+            or scope["method"] != "POST" or scope["path"].rstrip("/") != "/api/registrations"
+        ):
+            return await self.app(scope, receive, send)
+
+        body, receive = await read_body(receive)
+        try:
+            workshop_id = json.loads(body).get("workshop_id")
+        except (ValueError, AttributeError):
+            workshop_id = None
+        if not isinstance(workshop_id, str) or not ObjectId.is_valid(workshop_id):
+            # Let validation reject it
+            return await self.app(scope, receive, send)
+
+        controller = admission_controller
+        gate = controller.gate(workshop_id)
+        started = time.monotonic()
+        try:
+            outcome, ticket = await gate.acquire(workshop_id, header_value(scope, QUEUE_TOKEN_HEADER))
+        except asyncio.CancelledError:
+            controller.discard_if_idle(workshop_id)
+            raise
+        admission_queue_length.set(value=sum(len(g.queue) for g in controller.gates.values()))
+
+        if outcome == FULL:
+            controller.rejected += 1
+            admission_outcomes.inc(FULL)
+            controller.discard_if_idle(workshop_id)
+            return await send_json(send, 503, {"detail": "Registration is very busy, please try again shortly"}, 5)
+
+        if outcome == QUEUED:
+            controller.queued += 1
+            admission_outcomes.inc(QUEUED)
+            position = gate.position(ticket)
+            wait = gate.estimated_wait(position)
+            retry_after = max(1, min(ADMISSION_MAX_RETRY_AFTER, math.ceil(wait)))
+            return await send_json(send, 429, {
+                "detail": "Registration is busy, you are in the queue",
+                "queue_token": issue_token(workshop_id, ticket.arrived, ticket.place),
+                "position": position,
+                "estimated_wait_seconds": round(wait, 1),
+            }, retry_after)
+
+        controller.admitted += 1
+        admission_outcomes.inc(ADMITTED)
+        admitted = time.monotonic()
+        admission_wait_duration.observe(value=admitted - started)
+        try:
+            await self.app(scope, receive, send)
+        finally:
+            gate.release(time.monotonic() - admitted)
+            controller.discard_if_idle(workshop_id)
@@ -4,31 +4,49 @@ from typing import Optional
 from fastapi import Depends, HTTPException, status
 from fastapi.security import OAuth2PasswordBearer
 from jose import JWTError, jwt
-from passlib.context import CryptContext
 from pydantic import BaseModel
 from dotenv import load_dotenv
 
-from app.models.user import UserInDB
-from app.utils.db import users_collection, parse_mongo_doc
+from app.models.user import User, UserInDB
+from app.utils.db import users_collection, parse_mongo_doc, model_projection
+from app.utils.hashing import password_hasher, hash_password, check_password
+from app.utils.cache import TTLCache
 
 load_dotenv()
 
 SECRET_KEY = os.getenv("JWT_SECRET")
 ALGORITHM = os.getenv("JWT_ALGORITHM")
 ACCESS_TOKEN_EXPIRE_MINUTES = int(os.getenv("JWT_EXPIRES_MINUTES"))
+PRINCIPAL_CACHE_TTL_SECONDS = float(os.getenv("PRINCIPAL_CACHE_TTL_SECONDS", "60"))
+PRINCIPAL_CACHE_SIZE = int(os.getenv("PRINCIPAL_CACHE_SIZE", "1024"))
+
+# Resolved users keyed by (email, token), so authenticated requests
+# don't each cost a users lookup. Each worker process has its own copy
+# and invalidate_principal() only clears the local one, so with several
+# workers a role or profile change can take up to the TTL to show up.
+principal_cache = TTLCache(PRINCIPAL_CACHE_SIZE, PRINCIPAL_CACHE_TTL_SECONDS)
 
-pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
 oauth2_scheme = OAuth2PasswordBearer(tokenUrl="api/auth/login")
+# For routes guests may use too; a missing token isn't an error
+optional_oauth2_scheme = OAuth2PasswordBearer(tokenUrl="api/auth/login", auto_error=False)
 
 class TokenData(BaseModel):
     username: Optional[str] = None
     role: Optional[str] = None
 
 def verify_password(plain_password, hashed_password):
-    return pwd_context.verify(plain_password, hashed_password)
+    return check_password(plain_password, hashed_password)
 
 def get_password_hash(password):
-    return pwd_context.hash(password)
+    return hash_password(password)
+
+async def verify_password_async(plain_password, hashed_password):
+    """Verify a password on the hashing worker pool"""
+    return await password_hasher.verify(plain_password, hashed_password)
+
+async def get_password_hash_async(password):
+    """Hash a password on the hashing worker pool"""
+    return await password_hasher.hash(password)
 
 def create_access_token(data: dict, expires_delta: Optional[timedelta] = None):
     to_encode = data.copy()
@@ -40,16 +58,16 @@ def create_access_token(data: dict, expires_delta: Optional[timedelta] = None):
     encoded_jwt = jwt.encode(to_encode, SECRET_KEY, algorithm=ALGORITHM)
     return encoded_jwt
 
-async def get_user(email: str):
-    user = await users_collection.find_one({"email": email})
+async def get_user(email: str, model=UserInDB):
+    user = await users_collection.find_one({"email": email}, model_projection(model))
     if user:
-        return UserInDB(**parse_mongo_doc(user))
+        return model(**parse_mongo_doc(user))
 
 async def authenticate_user(email: str, password: str):
     user = await get_user(email)
     if not user:
         return False
-    if not verify_password(password, user.password):
+    if not await verify_password_async(password, user.password):
         return False
     return user
 
@@ -68,11 +86,27 @@ async def get_current_user(token: str = Depends(oauth2_scheme)):
         token_data = TokenData(username=email, role=role)
     except JWTError:
         raise credentials_exception
-    user = await get_user(email=token_data.username)
+    cache_key = (token_data.username, token)
+    user = principal_cache.get(cache_key)
+    if user is not None:
+        return user
+    # Principals are resolved without the password hash
+    user = await get_user(email=token_data.username, model=User)
     if user is None:
         raise credentials_exception
+    principal_cache.set(cache_key, user)
     return user
 
+async def get_optional_user(token: Optional[str] = Depends(optional_oauth2_scheme)):
+    """The signed-in user, or None for a guest. A bad token is still rejected."""
+    if token is None:
+        return None
+    return await get_current_user(token)
+
+def invalidate_principal(email: str):
+    """Drop cached principals for a user after their document changes"""
+    principal_cache.discard_where(lambda key: key[0] == email)
+
 async def get_admin_user(current_user = Depends(get_current_user)):
     if current_user.role != "admin":
         raise HTTPException(
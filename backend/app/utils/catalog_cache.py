@@ -0,0 +1,96 @@
+import os
+import hashlib
+from typing import List
+from fastapi import Request, Response
+from pydantic import TypeAdapter
+from dotenv import load_dotenv
+
+from app.models.workshop import Workshop, WorkshopSummary
+from app.utils.cache import TTLCache
+from app.utils.db import parse_mongo_doc
+from app.utils.fastjson import FAST_JSON, dumps, with_defaults
+from app.utils.events import seat_broadcaster
+
+load_dotenv()
+
+CATALOG_CACHE_TTL_SECONDS = float(os.getenv("CATALOG_CACHE_TTL_SECONDS", "30"))
+CATALOG_CACHE_SIZE = int(os.getenv("CATALOG_CACHE_SIZE", "512"))
+
+# Serialized catalog responses, keyed by endpoint and query parameters.
+# Each worker process has its own copy, so writes handled by another
+# worker show up here once the TTL runs out.
+catalog_cache = TTLCache(CATALOG_CACHE_SIZE, CATALOG_CACHE_TTL_SECONDS)
+
+# Bumped by every invalidation. Readers take it before querying and only
+# cache what they read if it hasn't moved, so a read that overlapped a
+# write can't put the old body back for a whole TTL.
+catalog_generation = 0
+
+workshop_adapter = TypeAdapter(Workshop)
+workshop_list_adapter = TypeAdapter(List[Workshop])
+workshop_summary_list_adapter = TypeAdapter(List[WorkshopSummary])
+
+class CachedResponse:
+    """A serialized JSON body with its strong ETag"""
+
+    def __init__(self, body: bytes):
+        self.body = body
+        self.etag = '"' + hashlib.sha256(body).hexdigest() + '"'
+
+def current_generation() -> int:
+    return catalog_generation
+
+def store(key, entry: CachedResponse, generation: int):
+    if generation == catalog_generation:
+        catalog_cache.set(key, entry)
+
+def cache_workshop(key, workshop, generation: int) -> CachedResponse:
+    if FAST_JSON:
+        body = dumps(with_defaults(workshop, Workshop))
+    else:
+        body = workshop_adapter.dump_json(workshop_adapter.validate_python(parse_mongo_doc(workshop)), by_alias=True)
+    entry = CachedResponse(body)
+    store(key, entry, generation)
+    return entry
+
+def cache_workshop_list(key, workshops, generation: int, summary: bool = False) -> CachedResponse:
+    if FAST_JSON:
+        body = dumps(with_defaults(workshops, WorkshopSummary if summary else Workshop))
+    else:
+        adapter = workshop_summary_list_adapter if summary else workshop_list_adapter
+        body = adapter.dump_json(adapter.validate_python([parse_mongo_doc(w) for w in workshops]), by_alias=True)
+    entry = CachedResponse(body)
+    store(key, entry, generation)
+    return entry
+
+def etag_matches(request: Request, etag: str) -> bool:
+    if_none_match = request.headers.get("if-none-match")
+    if not if_none_match:
+        return False
+    candidates = [tag.strip() for tag in if_none_match.split(",")]
+    return "*" in candidates or etag in candidates
+
+def cached_response(request: Request, entry: CachedResponse) -> Response:
+    """
+    Send a cached body, or 304 Not Modified if the client already has it
+    """
+    headers = {"ETag": entry.etag, "Cache-Control": "no-cache"}
+    if etag_matches(request, entry.etag):
+        return Response(status_code=304, headers=headers)
+    return Response(content=entry.body, media_type="application/json", headers=headers)
+
+def invalidate_catalog(workshop_obj_id=None):
+    """
+    Drop the cached catalog responses a workshop or seat count change
+    affects, and tell the seat streams which workshop it was. That is the
+    workshop's own page and every list, since any list may include it;
+    other workshops' pages stay cached. Without an id everything goes.
+    """
+    global catalog_generation
+    catalog_generation += 1
+    if workshop_obj_id is None:
+        catalog_cache.clear()
+        return
+    workshop_key = ("workshop", str(workshop_obj_id))
+    catalog_cache.discard_where(lambda key: key[0] == "list" or key == workshop_key)
+    seat_broadcaster.publish(workshop_obj_id)
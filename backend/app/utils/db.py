@@ -1,28 +1,109 @@
 import os
+import asyncio
+from functools import lru_cache
 from bson import ObjectId
 from motor.motor_asyncio import AsyncIOMotorClient
+from pymongo import ReturnDocument
 from dotenv import load_dotenv
 from typing import List, Dict, Any
 
+from app.utils.indexes import apply_index_plan
+from app.utils.query_audit import QUERY_AUDIT, query_auditor
+from app.utils.metrics import mongo_listeners
+
 load_dotenv()
 
 mongodb_uri = os.getenv("MONGODB_URI")
 database_name = os.getenv("DATABASE_NAME")
 
-client = AsyncIOMotorClient(mongodb_uri)
-db = client[database_name]
+# Connection pool and timeouts
+MONGO_MAX_POOL_SIZE = int(os.getenv("MONGO_MAX_POOL_SIZE", "100"))
+MONGO_MIN_POOL_SIZE = int(os.getenv("MONGO_MIN_POOL_SIZE", "0"))
+MONGO_MAX_IDLE_TIME_MS = int(os.getenv("MONGO_MAX_IDLE_TIME_MS", "300000"))
+MONGO_CONNECT_TIMEOUT_MS = int(os.getenv("MONGO_CONNECT_TIMEOUT_MS", "5000"))
+MONGO_SERVER_SELECTION_TIMEOUT_MS = int(os.getenv("MONGO_SERVER_SELECTION_TIMEOUT_MS", "5000"))
+MONGO_SOCKET_TIMEOUT_MS = int(os.getenv("MONGO_SOCKET_TIMEOUT_MS", "0")) or None
+MONGO_WAIT_QUEUE_TIMEOUT_MS = int(os.getenv("MONGO_WAIT_QUEUE_TIMEOUT_MS", "0")) or None
+
+# Created by connect_db() when the app starts, not at import time
+client = None
+db = None
+
+def connect_db():
+    """Create the MongoDB client; it connects lazily on first use"""
+    global client, db
+    if client is None:
+        # The query auditor records query shapes so they can be explained in dev/test runs;
+        # the metrics listeners time commands and connection checkouts for /metrics
+        client = AsyncIOMotorClient(
+            mongodb_uri,
+            maxPoolSize=MONGO_MAX_POOL_SIZE,
+            minPoolSize=MONGO_MIN_POOL_SIZE,
+            maxIdleTimeMS=MONGO_MAX_IDLE_TIME_MS,
+            connectTimeoutMS=MONGO_CONNECT_TIMEOUT_MS,
+            serverSelectionTimeoutMS=MONGO_SERVER_SELECTION_TIMEOUT_MS,
+            socketTimeoutMS=MONGO_SOCKET_TIMEOUT_MS,
+            waitQueueTimeoutMS=MONGO_WAIT_QUEUE_TIMEOUT_MS,
+            event_listeners=([query_auditor] if QUERY_AUDIT else []) + mongo_listeners()
+        )
+        db = client[database_name]
+    return client
+
+def close_db():
+    global client, db
+    if client is not None:
+        client.close()
+        client = None
+        db = None
+
+def get_client():
+    if client is None:
+        raise RuntimeError("MongoDB client is not connected; call connect_db() first")
+    return client
+
+def get_database():
+    get_client()
+    return db
+
+class CollectionProxy:
+    """
+    Stands in for a collection at import time and forwards to the real
+    one once connect_db() has run, so modules can keep importing the
+    collections below.
+    """
+
+    def __init__(self, name: str):
+        self.name = name
+
+    def __getattr__(self, attr):
+        return getattr(get_database()[self.name], attr)
+
+    def __repr__(self):
+        return f"CollectionProxy({self.name!r})"
 
 # Collections
-users_collection = db.users
-workshops_collection = db.workshops
-registrations_collection = db.registrations
-testimonials_collection = db.testimonials
+users_collection = CollectionProxy("users")
+workshops_collection = CollectionProxy("workshops")
+registrations_collection = CollectionProxy("registrations")
+testimonials_collection = CollectionProxy("testimonials")
+email_outbox_collection = CollectionProxy("email_outbox")
+stats_snapshots_collection = CollectionProxy("stats_snapshots")
+ephemeral_tokens_collection = CollectionProxy("ephemeral_tokens")
+
+async def ping_db(timeout: float):
+    """True if MongoDB answers a ping within timeout seconds"""
+    try:
+        await asyncio.wait_for(get_database().command("ping"), timeout)
+        return True
+    except Exception:
+        return False
 
-async def init_db():
-    # Create indexes for performance
-    await users_collection.create_index("email", unique=True)
-    await workshops_collection.create_index("id", unique=True)
-    await registrations_collection.create_index([("user_id", 1), ("workshop_id", 1)], unique=True, sparse=True)
+async def init_db(force: bool = False):
+    """
+    Apply the index plan unless this database already has it; returns
+    True if anything had to be applied
+    """
+    return await apply_index_plan(get_database(), force=force)
 
 # Helper functions for ObjectId conversion
 def serialize_id(id_str):
@@ -45,6 +126,44 @@ async def serialize_list(cursor):
         result.append(parse_mongo_doc(doc))
     return result
 
+@lru_cache(maxsize=None)
+def model_projection(model) -> Dict[str, int]:
+    """
+    Projection that fetches only the fields a pydantic model reads, so
+    list endpoints don't transfer and decode fields the response drops
+    """
+    return {field.alias or name: 1 for name, field in model.model_fields.items()}
+
+@lru_cache(maxsize=None)
+def model_defaults(model) -> Dict[str, Any]:
+    """
+    Defaults for the optional fields in model_projection, so output that
+    skips validation still has them on older documents. Factory defaults
+    are left out: every insert sets created_at.
+    """
+    return {
+        field.alias or name: field.default
+        for name, field in model.model_fields.items()
+        if not field.is_required() and field.default_factory is None
+    }
+
+# Write helpers that return the written document without re-reading it
+async def insert_document(collection, document: Dict[str, Any]) -> Dict[str, Any]:
+    """Insert a document and return it with its new _id as a string"""
+    result = await collection.insert_one(document)
+    document["_id"] = str(result.inserted_id)
+    return document
+
+async def update_document(collection, query: Dict[str, Any], update: Dict[str, Any], projection=None):
+    """
+    Apply an update and return the updated document, or None if nothing
+    matched, in a single round trip
+    """
+    document = await collection.find_one_and_update(
+        query, update, projection=projection, return_document=ReturnDocument.AFTER
+    )
+    return parse_mongo_doc(document)
+
 # Additional helper function
 def convert_object_ids(data: Dict[str, Any]) -> Dict[str, Any]:
     """
@@ -1,21 +1,39 @@
 import os
+import asyncio
+import logging
 import smtplib
+import time
+import uuid
+from datetime import datetime, timedelta
 from email.mime.text import MIMEText
 from email.mime.multipart import MIMEMultipart
+from typing import List, Dict
+from pymongo import UpdateOne
 from dotenv import load_dotenv
 
+from app.utils.db import email_outbox_collection
+from app.utils.metrics import email_send_seconds, email_sends, email_send_duration
+
 load_dotenv()
 
+logger = logging.getLogger(__name__)
+
 SMTP_SERVER = os.getenv("SMTP_SERVER")
 SMTP_PORT = int(os.getenv("SMTP_PORT"))
 SMTP_USERNAME = os.getenv("SMTP_USERNAME")
 SMTP_PASSWORD = os.getenv("SMTP_PASSWORD")
+SMTP_STARTTLS = os.getenv("SMTP_STARTTLS", "true").lower() == "true"
 EMAIL_FROM = os.getenv("EMAIL_FROM")
 
-async def send_email(to_email: str, subject: str, html_content: str):
-    """
-    Sends an email using the configured SMTP server
-    """
+# Outbox delivery settings
+EMAIL_POOL_SIZE = int(os.getenv("EMAIL_POOL_SIZE", "2"))
+EMAIL_BATCH_SIZE = int(os.getenv("EMAIL_BATCH_SIZE", "20"))
+EMAIL_MAX_ATTEMPTS = int(os.getenv("EMAIL_MAX_ATTEMPTS", "5"))
+EMAIL_RETRY_BASE_SECONDS = int(os.getenv("EMAIL_RETRY_BASE_SECONDS", "30"))
+EMAIL_POLL_INTERVAL_SECONDS = float(os.getenv("EMAIL_POLL_INTERVAL_SECONDS", "2"))
+EMAIL_LEASE_SECONDS = int(os.getenv("EMAIL_LEASE_SECONDS", "300"))
+
+def build_message(to_email: str, subject: str, html_content: str):
     msg = MIMEMultipart()
     msg["From"] = EMAIL_FROM
     msg["To"] = to_email
@@ -23,18 +41,254 @@ async def send_email(to_email: str, subject: str, html_content: str):
     
     # Add HTML content
     msg.attach(MIMEText(html_content, "html"))
-    
+    return msg
+
+def outbox_document(to_email: str, subject: str, html_content: str):
+    """Build a pending outbox entry"""
+    now = datetime.utcnow()
+    return {
+        "to": to_email,
+        "subject": subject,
+        "html": html_content,
+        "status": "pending",  # pending, sending, sent, failed
+        "attempts": 0,
+        "created_at": now,
+        "next_attempt_at": now,
+        "last_error": None,
+    }
+
+async def enqueue_email(to_email: str, subject: str, html_content: str):
+    """
+    Queue an email for background delivery
+    """
+    await email_outbox_collection.insert_one(outbox_document(to_email, subject, html_content))
+    outbox_worker.wake()
+
+async def enqueue_emails(messages: List[Dict[str, str]]):
+    """
+    Queue several emails with a single insert. Each message needs
+    "to", "subject" and "html" keys.
+    """
+    if not messages:
+        return
+    await email_outbox_collection.insert_many([
+        outbox_document(m["to"], m["subject"], m["html"]) for m in messages
+    ])
+    outbox_worker.wake()
+
+async def send_email(to_email: str, subject: str, html_content: str):
+    """
+    Queues an email for delivery through the configured SMTP server.
+
+    Returns as soon as the message is in the outbox; the outbox worker
+    delivers it in the background so request handlers never wait on SMTP.
+    """
     try:
-        server = smtplib.SMTP(SMTP_SERVER, SMTP_PORT)
-        server.starttls()
-        server.login(SMTP_USERNAME, SMTP_PASSWORD)
-        server.send_message(msg)
-        server.quit()
+        await enqueue_email(to_email, subject, html_content)
         return True
     except Exception as e:
-        print(f"Failed to send email: {str(e)}")
+        logger.error("Failed to queue email: %s", e)
         return False
 
+class SMTPConnection:
+    """A reusable SMTP session, opened lazily and reopened after errors"""
+
+    def __init__(self):
+        self.server = None
+
+    def _connect(self):
+        server = smtplib.SMTP(SMTP_SERVER, SMTP_PORT, timeout=30)
+        if SMTP_STARTTLS:
+            server.starttls()
+        if SMTP_USERNAME:
+            server.login(SMTP_USERNAME, SMTP_PASSWORD)
+        self.server = server
+
+    def send(self, msg):
+        if self.server is None:
+            self._connect()
+        try:
+            self.server.send_message(msg)
+        except smtplib.SMTPServerDisconnected:
+            # Idle connections get dropped by the server; reconnect once
+            self.close()
+            self._connect()
+            self.server.send_message(msg)
+        except Exception:
+            self.close()
+            raise
+
+    def close(self):
+        if self.server is not None:
+            try:
+                self.server.quit()
+            except Exception:
+                pass
+            self.server = None
+
+class SMTPConnectionPool:
+    """
+    A small pool of SMTP sessions. Blocking smtplib calls run in worker
+    threads so the event loop is never held up by a slow SMTP server.
+    """
+
+    def __init__(self, size: int):
+        self.size = size
+        self._connections = None
+
+    def _ensure_pool(self):
+        if self._connections is None:
+            self._connections = asyncio.Queue()
+            for _ in range(self.size):
+                self._connections.put_nowait(SMTPConnection())
+
+    async def send(self, msg):
+        self._ensure_pool()
+        connection = await self._connections.get()
+        start = time.perf_counter()
+        outcome = "error"
+        try:
+            await asyncio.to_thread(connection.send, msg)
+            outcome = "sent"
+        finally:
+            elapsed = time.perf_counter() - start
+            email_send_seconds.inc(amount=elapsed)
+            email_send_duration.observe(value=elapsed)
+            email_sends.inc(outcome)
+            self._connections.put_nowait(connection)
+
+    async def close(self):
+        if self._connections is None:
+            return
+        while not self._connections.empty():
+            connection = self._connections.get_nowait()
+            await asyncio.to_thread(connection.close)
+        self._connections = None
+
+def retry_delay(attempts: int):
+    """Exponential backoff, capped at one hour"""
+    return timedelta(seconds=min(EMAIL_RETRY_BASE_SECONDS * 2 ** (attempts - 1), 3600))
+
+class EmailOutboxWorker:
+    """
+    Drains the email outbox in batches over a pool of SMTP connections.
+
+    Entries are leased with a claim id before sending, so several app
+    processes can run a worker against the same outbox without sending
+    a message twice. Leases left behind by a crashed worker expire after
+    EMAIL_LEASE_SECONDS and the entry is picked up again.
+    """
+
+    def __init__(self):
+        self.pool = SMTPConnectionPool(EMAIL_POOL_SIZE)
+        self._task = None
+        self._wake_event = None
+
+    def wake(self):
+        if self._wake_event is not None:
+            self._wake_event.set()
+
+    def start(self):
+        if self._task is None:
+            self._wake_event = asyncio.Event()
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+            self._wake_event = None
+        await self.pool.close()
+
+    async def _run(self):
+        while True:
+            try:
+                delivered = await self.process_batch()
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.exception("Email outbox batch failed: %s", e)
+                delivered = 0
+
+            # Keep draining while there is a backlog, otherwise wait to be woken
+            if delivered < EMAIL_BATCH_SIZE:
+                self._wake_event.clear()
+                try:
+                    await asyncio.wait_for(self._wake_event.wait(), EMAIL_POLL_INTERVAL_SECONDS)
+                except asyncio.TimeoutError:
+                    pass
+
+    async def claim_batch(self):
+        now = datetime.utcnow()
+        due = {
+            "$or": [
+                {"status": "pending", "next_attempt_at": {"$lte": now}},
+                {"status": "sending", "locked_until": {"$lt": now}},
+            ]
+        }
+        candidates = await email_outbox_collection.find(due, {"_id": 1}).sort(
+            "next_attempt_at", 1
+        ).limit(EMAIL_BATCH_SIZE).to_list(EMAIL_BATCH_SIZE)
+        if not candidates:
+            return []
+
+        claim_id = uuid.uuid4().hex
+        await email_outbox_collection.update_many(
+            {"_id": {"$in": [c["_id"] for c in candidates]}, **due},
+            {"$set": {
+                "status": "sending",
+                "claim_id": claim_id,
+                "locked_until": now + timedelta(seconds=EMAIL_LEASE_SECONDS),
+            }}
+        )
+        return await email_outbox_collection.find({"claim_id": claim_id}).to_list(EMAIL_BATCH_SIZE)
+
+    async def _deliver(self, entry):
+        try:
+            await self.pool.send(build_message(entry["to"], entry["subject"], entry["html"]))
+            return None
+        except Exception as e:
+            return str(e) or e.__class__.__name__
+
+    async def process_batch(self):
+        """Claim and send one batch of due emails; returns the batch size"""
+        batch = await self.claim_batch()
+        if not batch:
+            return 0
+
+        errors = await asyncio.gather(*[self._deliver(entry) for entry in batch])
+
+        now = datetime.utcnow()
+        updates = []
+        for entry, error in zip(batch, errors):
+            attempts = entry.get("attempts", 0) + 1
+            if error is None:
+                changes = {"status": "sent", "sent_at": now, "attempts": attempts, "last_error": None}
+            elif attempts >= EMAIL_MAX_ATTEMPTS:
+                logger.error("Giving up on email to %s after %d attempts: %s", entry["to"], attempts, error)
+                changes = {"status": "failed", "attempts": attempts, "last_error": error}
+            else:
+                logger.warning("Failed to send email to %s (attempt %d): %s", entry["to"], attempts, error)
+                changes = {
+                    "status": "pending",
+                    "attempts": attempts,
+                    "last_error": error,
+                    "next_attempt_at": now + retry_delay(attempts),
+                }
+            updates.append(UpdateOne(
+                {"_id": entry["_id"], "claim_id": entry["claim_id"]},
+                {"$set": changes, "$unset": {"claim_id": "", "locked_until": ""}}
+            ))
+
+        await email_outbox_collection.bulk_write(updates, ordered=False)
+        return len(batch)
+
+outbox_worker = EmailOutboxWorker()
+
 # Email templates
 async def send_registration_confirmation(to_email: str, user_name: str, workshop_name: str):
     subject = f"Registration Received: {workshop_name}"
@@ -51,7 +305,7 @@ async def send_registration_confirmation(to_email: str, user_name: str, workshop
     """
     return await send_email(to_email, subject, content)
 
-async def send_registration_approval(to_email: str, user_name: str, workshop_name: str, workshop_date: str):
+def registration_approval_message(to_email: str, user_name: str, workshop_name: str, workshop_date: str):
     subject = f"Registration Approved: {workshop_name}"
     content = f"""
     <html>
@@ -66,8 +320,44 @@ async def send_registration_approval(to_email: str, user_name: str, workshop_nam
     </body>
     </html>
     """
+    return {"to": to_email, "subject": subject, "html": content}
+
+async def send_registration_approval(to_email: str, user_name: str, workshop_name: str, workshop_date: str):
+    message = registration_approval_message(to_email, user_name, workshop_name, workshop_date)
+    return await send_email(message["to"], message["subject"], message["html"])
+
+async def send_waitlist_confirmation(to_email: str, user_name: str, workshop_name: str, position: int):
+    subject = f"Waitlisted: {workshop_name}"
+    content = f"""
+    <html>
+    <body>
+        <h2>You're on the Waitlist</h2>
+        <p>Dear {user_name},</p>
+        <p>The workshop <strong>{workshop_name}</strong> is currently full, so your registration has been added to the waitlist.</p>
+        <p>Your position on the waitlist: <strong>{position}</strong></p>
+        <p>If a seat opens up, you will be moved into it automatically and we will email you. There is no need to register again.</p>
+        <p>Best regards,<br>Jnana Prabodhini Vijnana Dals Team</p>
+    </body>
+    </html>
+    """
     return await send_email(to_email, subject, content)
 
+def waitlist_promotion_message(to_email: str, user_name: str, workshop_name: str, workshop_date: str):
+    subject = f"A Seat Opened Up: {workshop_name}"
+    content = f"""
+    <html>
+    <body>
+        <h2>You're Off the Waitlist</h2>
+        <p>Dear {user_name},</p>
+        <p>A seat opened up in the workshop <strong>{workshop_name}</strong> and your waitlisted registration has moved into it.</p>
+        <p>Workshop Date: {workshop_date}</p>
+        <p>Your registration is now being processed. You will receive another email once it's approved.</p>
+        <p>Best regards,<br>Jnana Prabodhini Vijnana Dals Team</p>
+    </body>
+    </html>
+    """
+    return {"to": to_email, "subject": subject, "html": content}
+
 async def send_otp_email(to_email: str, user_name: str, otp: str):
     subject = "Password Reset OTP"
     content = f"""
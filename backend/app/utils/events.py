@@ -0,0 +1,194 @@
+import os
+import json
+import asyncio
+import logging
+from dotenv import load_dotenv
+
+from app.utils.db import workshops_collection, serialize_id
+from app.utils.metrics import seat_event_subscribers, seat_event_publishes
+
+load_dotenv()
+
+logger = logging.getLogger(__name__)
+
+# Seat changes within this window go out as one event per workshop
+SEAT_EVENTS_DEBOUNCE_SECONDS = float(os.getenv("SEAT_EVENTS_DEBOUNCE_SECONDS", "0.5"))
+# Watched workshops are re-read this often, which picks up changes made
+# by other worker processes
+SEAT_EVENTS_RESYNC_SECONDS = float(os.getenv("SEAT_EVENTS_RESYNC_SECONDS", "5"))
+SEAT_EVENTS_HEARTBEAT_SECONDS = float(os.getenv("SEAT_EVENTS_HEARTBEAT_SECONDS", "15"))
+SEAT_EVENTS_MAX_SUBSCRIBERS = int(os.getenv("SEAT_EVENTS_MAX_SUBSCRIBERS", "5000"))
+
+CATALOG = "catalog"
+SEAT_FIELDS = {"registered_count": 1, "waitlist_count": 1, "max_participants": 1, "status": 1}
+
+def seat_state(workshop) -> dict:
+    registered = workshop.get("registered_count", 0)
+    capacity = workshop.get("max_participants", 0)
+    return {
+        "id": str(workshop["_id"]),
+        "registered_count": registered,
+        "max_participants": capacity,
+        "waitlist_count": workshop.get("waitlist_count", 0),
+        "seats_left": max(capacity - registered, 0),
+        "status": workshop.get("status"),
+    }
+
+def format_event(data, event: str = "seats") -> bytes:
+    return f"event: {event}\ndata: {json.dumps(data, separators=(',', ':'))}\n\n".encode()
+
+class Subscription:
+    """
+    One SSE client. Only the newest state matters, so a client that falls
+    behind loses the oldest queued events rather than blocking the fan-out.
+    """
+
+    def __init__(self, key: str, size: int = 8):
+        self.key = key
+        self.queue = asyncio.Queue(maxsize=size)
+
+    def push(self, data):
+        if self.queue.full():
+            self.queue.get_nowait()
+        self.queue.put_nowait(data)
+
+class SeatBroadcaster:
+    """
+    Fans seat counts out to SSE clients. Writers call publish(); changes
+    are coalesced for SEAT_EVENTS_DEBOUNCE_SECONDS and read back with one
+    query per flush, however many clients are watching. Only workshops
+    whose seat state actually changed are sent.
+    """
+
+    def __init__(self):
+        self._subscribers = {}
+        self._state = {}
+        self._dirty = set()
+        self._flush_handle = None
+        self._flushes = set()
+        self._task = None
+
+    def start(self):
+        if self._task is None:
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self):
+        if self._flush_handle is not None:
+            self._flush_handle.cancel()
+            self._flush_handle = None
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+    def subscriber_count(self) -> int:
+        return sum(len(subs) for subs in self._subscribers.values())
+
+    def subscribe(self, key: str):
+        """Register a client for one workshop id, or CATALOG; returns None when full"""
+        if self.subscriber_count() >= SEAT_EVENTS_MAX_SUBSCRIBERS:
+            return None
+        subscription = Subscription(key)
+        self._subscribers.setdefault(key, set()).add(subscription)
+        seat_event_subscribers.inc()
+        return subscription
+
+    def unsubscribe(self, subscription: Subscription):
+        subs = self._subscribers.get(subscription.key)
+        if subs and subscription in subs:
+            subs.discard(subscription)
+            seat_event_subscribers.dec()
+            if not subs:
+                del self._subscribers[subscription.key]
+                if subscription.key != CATALOG:
+                    self._state.pop(subscription.key, None)
+
+    def publish(self, workshop_obj_id):
+        """Note that a workshop's seats changed; nothing is read until the debounce fires"""
+        if not self._subscribers:
+            return
+        try:
+            loop = asyncio.get_running_loop()
+        except RuntimeError:
+            return
+        self._dirty.add(str(workshop_obj_id))
+        if self._flush_handle is None:
+            self._flush_handle = loop.call_later(SEAT_EVENTS_DEBOUNCE_SECONDS, self._schedule_flush)
+
+    def _schedule_flush(self):
+        self._flush_handle = None
+        ids, self._dirty = self._dirty, set()
+        task = asyncio.ensure_future(self._refresh_logged({"_id": {"$in": [serialize_id(i) for i in ids]}}, ids))
+        self._flushes.add(task)
+        task.add_done_callback(self._flushes.discard)
+
+    async def snapshot(self, key: str):
+        """Current seat state for a new client: one workshop's dict, or the catalog list"""
+        if key == CATALOG:
+            return [seat_state(w) async for w in workshops_collection.find({}, SEAT_FIELDS)]
+        workshop = await workshops_collection.find_one({"_id": serialize_id(key)}, SEAT_FIELDS)
+        return seat_state(workshop) if workshop else None
+
+    async def _refresh_logged(self, query, requested=()):
+        try:
+            await self.refresh(query, requested)
+        except Exception as e:
+            logger.warning("Seat event refresh failed: %s", e)
+
+    async def refresh(self, query, requested=()):
+        """Re-read the matching workshops and push the ones whose seats changed"""
+        changed = []
+        found = set()
+        async for workshop in workshops_collection.find(query, SEAT_FIELDS):
+            state = seat_state(workshop)
+            found.add(state["id"])
+            if self._state.get(state["id"]) != state:
+                self._state[state["id"]] = state
+                changed.append(state)
+        # Deleted workshops
+        for workshop_id in requested:
+            if workshop_id not in found and self._state.pop(workshop_id, None) is not None:
+                changed.append({"id": workshop_id, "status": "deleted"})
+        if changed:
+            self._send(changed)
+
+    def _send(self, changed):
+        seat_event_publishes.inc()
+        for state in changed:
+            for subscription in self._subscribers.get(state["id"], ()):
+                subscription.push(state)
+        for subscription in self._subscribers.get(CATALOG, ()):
+            subscription.push(changed)
+
+    async def _run(self):
+        while True:
+            await asyncio.sleep(SEAT_EVENTS_RESYNC_SECONDS)
+            if not self._subscribers:
+                continue
+            if CATALOG in self._subscribers:
+                query = {}
+            else:
+                query = {"_id": {"$in": [serialize_id(key) for key in self._subscribers]}}
+            await self._refresh_logged(query)
+
+    async def stream(self, subscription: Subscription, initial):
+        """Server-sent event bytes for one client: the snapshot, then changes and heartbeats"""
+        try:
+            if initial is not None:
+                for state in initial if subscription.key == CATALOG else [initial]:
+                    self._state.setdefault(state["id"], state)
+                yield format_event(initial)
+            while True:
+                try:
+                    data = await asyncio.wait_for(subscription.queue.get(), SEAT_EVENTS_HEARTBEAT_SECONDS)
+                except asyncio.TimeoutError:
+                    yield b": heartbeat\n\n"
+                    continue
+                yield format_event(data)
+        finally:
+            self.unsubscribe(subscription)
+
+seat_broadcaster = SeatBroadcaster()
@@ -0,0 +1,67 @@
+import os
+from typing import Any
+import orjson
+from bson import ObjectId
+from fastapi import Response
+from dotenv import load_dotenv
+
+from app.utils.db import model_defaults
+
+load_dotenv()
+
+# Opt-in: serialize trusted database output directly instead of
+# re-validating it through the route's response_model
+FAST_JSON = os.getenv("FAST_JSON", "false").lower() == "true"
+
+# Headers a route sets on its injected Response that a replacement
+# response must carry over
+_GENERATED_HEADERS = {"content-length", "content-type"}
+
+def bson_default(value: Any):
+    """Encode the BSON types orjson doesn't know natively"""
+    if isinstance(value, ObjectId):
+        return str(value)
+    raise TypeError(f"Type is not JSON serializable: {type(value).__name__}")
+
+def dumps(content: Any) -> bytes:
+    """
+    Serialize documents straight from MongoDB: ObjectIds become strings and
+    datetimes use the same ISO format as pydantic
+    """
+    return orjson.dumps(content, default=bson_default)
+
+def with_defaults(content: Any, model) -> Any:
+    """Fill in the model's defaults for fields a stored document lacks"""
+    defaults = model_defaults(model)
+    if not defaults:
+        return content
+    if isinstance(content, list):
+        return [{**defaults, **doc} for doc in content]
+    return {**defaults, **content}
+
+class FastJSONResponse(Response):
+    media_type = "application/json"
+
+    def render(self, content: Any) -> bytes:
+        return dumps(content)
+
+def trusted_response(content: Any, model, response: Response = None):
+    """
+    Return database output without validation when FAST_JSON is enabled,
+    filling in the model's defaults for fields older documents lack.
+
+    Only use this for documents fetched with the response model's
+    projection, so no extra fields can leak. With FAST_JSON off the
+    content is returned for the normal response_model path, with any
+    ObjectId _id values converted.
+    """
+    if FAST_JSON:
+        headers = None
+        if response is not None:
+            headers = {k: v for k, v in response.headers.items() if k not in _GENERATED_HEADERS}
+        return FastJSONResponse(with_defaults(content, model), headers=headers)
+
+    for doc in content if isinstance(content, list) else [content]:
+        if isinstance(doc, dict) and isinstance(doc.get("_id"), ObjectId):
+            doc["_id"] = str(doc["_id"])
+    return content
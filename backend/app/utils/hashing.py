@@ -0,0 +1,119 @@
+import os
+import asyncio
+import time
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor, ProcessPoolExecutor
+from fastapi import HTTPException, status
+from passlib.context import CryptContext
+from dotenv import load_dotenv
+
+from app.utils.metrics import (
+    password_hashing_seconds, password_hashing_operations, password_hashing_duration,
+    password_hashing_rejected
+)
+
+load_dotenv()
+
+HASH_EXECUTOR = os.getenv("HASH_EXECUTOR", "thread")  # thread, process
+HASH_WORKERS = int(os.getenv("HASH_WORKERS", str(min(4, os.cpu_count() or 1))))
+HASH_QUEUE_SIZE = int(os.getenv("HASH_QUEUE_SIZE", "64"))
+
+pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
+
+# Module-level so they can be pickled into a process pool
+def hash_password(password):
+    return pwd_context.hash(password)
+
+def check_password(plain_password, hashed_password):
+    return pwd_context.verify(plain_password, hashed_password)
+
+def timed_call(fn, *args):
+    """Run fn in the worker, returning its result and the time it took there"""
+    start = time.perf_counter()
+    result = fn(*args)
+    return result, time.perf_counter() - start
+
+class PasswordHasher:
+    """
+    Runs bcrypt on a bounded worker pool instead of the event loop thread.
+
+    At most `workers` hashes run at once and at most `queue_size` more may
+    wait for a worker; anything beyond that is rejected with a 503 so a
+    login storm cannot pile up unbounded work behind the rest of the API.
+    """
+
+    def __init__(self, workers: int, queue_size: int, kind: str = "thread"):
+        self.workers = workers
+        self.queue_size = queue_size
+        self.kind = kind
+        self._executor = None
+        self._pending = 0
+        self._completed = 0
+        self._rejected = 0
+        self._total_latency = 0.0
+        self._max_latency = 0.0
+        self._recent = deque(maxlen=1024)
+
+    def _get_executor(self):
+        if self._executor is None:
+            if self.kind == "process":
+                self._executor = ProcessPoolExecutor(max_workers=self.workers)
+            else:
+                self._executor = ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix="bcrypt")
+        return self._executor
+
+    async def _submit(self, operation, fn, *args):
+        if self._pending >= self.workers + self.queue_size:
+            self._rejected += 1
+            password_hashing_rejected.inc()
+            raise HTTPException(
+                status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+                detail="Authentication service is busy, please retry shortly",
+                headers={"Retry-After": "1"},
+            )
+
+        self._pending += 1
+        start = time.perf_counter()
+        try:
+            loop = asyncio.get_running_loop()
+            result, bcrypt_time = await loop.run_in_executor(self._get_executor(), timed_call, fn, *args)
+            password_hashing_seconds.inc(operation, amount=bcrypt_time)
+            password_hashing_operations.inc(operation)
+            return result
+        finally:
+            self._pending -= 1
+            elapsed = time.perf_counter() - start
+            self._completed += 1
+            self._total_latency += elapsed
+            self._max_latency = max(self._max_latency, elapsed)
+            self._recent.append(elapsed)
+            password_hashing_duration.observe(operation, value=elapsed)
+
+    async def hash(self, password):
+        return await self._submit("hash", hash_password, password)
+
+    async def verify(self, plain_password, hashed_password):
+        return await self._submit("verify", check_password, plain_password, hashed_password)
+
+    def stats(self):
+        recent = sorted(self._recent)
+        p95 = recent[int(len(recent) * 0.95) - 1] if recent else 0.0
+        return {
+            "executor": self.kind,
+            "workers": self.workers,
+            "queue_size": self.queue_size,
+            "in_flight": min(self._pending, self.workers),
+            "queue_depth": max(0, self._pending - self.workers),
+            "completed": self._completed,
+            "rejected": self._rejected,
+            "avg_latency_ms": round(self._total_latency / self._completed * 1000, 2) if self._completed else 0.0,
+            "p95_latency_ms": round(p95 * 1000, 2),
+            "max_latency_ms": round(self._max_latency * 1000, 2),
+        }
+
+    def shutdown(self):
+        if self._executor is not None:
+            self._executor.shutdown(wait=False, cancel_futures=True)
+            self._executor = None
+
+password_hasher = PasswordHasher(HASH_WORKERS, HASH_QUEUE_SIZE, HASH_EXECUTOR)
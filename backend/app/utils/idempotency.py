@@ -0,0 +1,195 @@
+import os
+import json
+import hashlib
+from datetime import datetime, timedelta
+from pymongo import ReturnDocument
+from pymongo.errors import DuplicateKeyError
+from dotenv import load_dotenv
+
+from app.utils.db import ephemeral_tokens_collection
+from app.utils.ratelimit import token_subject
+
+load_dotenv()
+
+IDEMPOTENCY_ENABLED = os.getenv("IDEMPOTENCY_ENABLED", "true").lower() == "true"
+# How long a completed response is replayed for
+IDEMPOTENCY_TTL_SECONDS = int(os.getenv("IDEMPOTENCY_TTL_SECONDS", "86400"))
+# How long a key stays locked by a request that never finished, e.g. after a crash
+IDEMPOTENCY_LOCK_SECONDS = int(os.getenv("IDEMPOTENCY_LOCK_SECONDS", "60"))
+MAX_KEY_LENGTH = 255
+
+# Writes that clients may safely retry with an Idempotency-Key header
+IDEMPOTENT_ROUTES = {
+    ("POST", "/api/auth/register"),
+    ("POST", "/api/workshops"),
+    ("POST", "/api/registrations"),
+}
+
+# Entry states
+IN_PROGRESS = "in_progress"
+COMPLETED = "completed"
+
+class IdempotencyStore:
+    """
+    Remembers the response to each (route, caller, key) in the ephemeral
+    tokens collection, whose TTL index removes entries once expires_at
+    passes. The first request with a key locks it; repeats get the stored
+    response, or 409 while the first is still running.
+    """
+
+    def __init__(self, collection):
+        self.collection = collection
+
+    async def begin(self, entry_id: str, fingerprint: str):
+        """
+        Lock a key for a new request. Returns None if the caller should go
+        ahead, otherwise the existing entry.
+        """
+        now = datetime.utcnow()
+        try:
+            await self.collection.insert_one({
+                "_id": entry_id,
+                "state": IN_PROGRESS,
+                "fingerprint": fingerprint,
+                "expires_at": now + timedelta(seconds=IDEMPOTENCY_LOCK_SECONDS),
+            })
+            return None
+        except DuplicateKeyError:
+            pass
+
+        # Take over a lock whose request died; the TTL monitor only runs about once a minute
+        taken = await self.collection.find_one_and_update(
+            {"_id": entry_id, "state": IN_PROGRESS, "expires_at": {"$lt": now}},
+            {"$set": {
+                "fingerprint": fingerprint,
+                "expires_at": now + timedelta(seconds=IDEMPOTENCY_LOCK_SECONDS),
+            }},
+            return_document=ReturnDocument.AFTER
+        )
+        if taken is not None:
+            return None
+        return await self.collection.find_one({"_id": entry_id}) or {"state": IN_PROGRESS, "fingerprint": fingerprint}
+
+    async def complete(self, entry_id: str, status_code: int, content_type: bytes, body: bytes):
+        await self.collection.update_one(
+            {"_id": entry_id},
+            {"$set": {
+                "state": COMPLETED,
+                "status_code": status_code,
+                "content_type": content_type.decode("latin-1"),
+                "body": body,
+                "expires_at": datetime.utcnow() + timedelta(seconds=IDEMPOTENCY_TTL_SECONDS),
+            }}
+        )
+
+    async def release(self, entry_id: str):
+        """Forget a key whose request failed, so a retry runs it again"""
+        await self.collection.delete_one({"_id": entry_id, "state": IN_PROGRESS})
+
+idempotency_store = IdempotencyStore(ephemeral_tokens_collection)
+
+def header_value(scope, header: bytes):
+    for name, value in scope.get("headers", []):
+        if name == header:
+            return value.decode("latin-1")
+    return None
+
+async def read_full_body(receive):
+    """Read the whole request body, returning it with a receive that replays it"""
+    chunks = []
+    while True:
+        message = await receive()
+        if message["type"] != "http.request":
+            break
+        chunks.append(message.get("body", b""))
+        if not message.get("more_body", False):
+            break
+    body = b"".join(chunks)
+    replayed = False
+
+    async def replay():
+        nonlocal replayed
+        if not replayed:
+            replayed = True
+            return {"type": "http.request", "body": body, "more_body": False}
+        return await receive()
+
+    return body, replay
+
+async def send_json(send, status_code: int, body: bytes, content_type: bytes = b"application/json", replayed: bool = False):
+    headers = [
+        (b"content-type", content_type),
+        (b"content-length", str(len(body)).encode("latin-1")),
+    ]
+    if replayed:
+        headers.append((b"idempotent-replayed", b"true"))
+    await send({"type": "http.response.start", "status": status_code, "headers": headers})
+    await send({"type": "http.response.body", "body": body})
+
+async def send_detail(send, status_code: int, detail: str):
+    await send_json(send, status_code, json.dumps({"detail": detail}).encode("utf-8"))
+
+class IdempotencyMiddleware:
+    """
+    Honours the Idempotency-Key header on IDEMPOTENT_ROUTES. A retried
+    request with the same key, caller and body gets the original
+    response back instead of running again; the same key with a
+    different body is rejected with 422. Only successful responses are
+    stored, so a request that failed can simply be retried.
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if not IDEMPOTENCY_ENABLED or scope["type"] != "http":
+            return await self.app(scope, receive, send)
+        route = (scope["method"], scope["path"].rstrip("/"))
+        key = header_value(scope, b"idempotency-key")
+        if route not in IDEMPOTENT_ROUTES or key is None:
+            return await self.app(scope, receive, send)
+        if not key or len(key) > MAX_KEY_LENGTH:
+            return await send_detail(send, 400, f"Idempotency-Key must be 1 to {MAX_KEY_LENGTH} characters")
+
+        body, receive = await read_full_body(receive)
+        # Keys are scoped to the route and the signed-in user, if any
+        caller = token_subject(scope) or ""
+        entry_id = "idempotency:" + hashlib.sha256(
+            "\n".join([route[0], route[1], caller, key]).encode("utf-8")
+        ).hexdigest()
+        fingerprint = hashlib.sha256(body).hexdigest()
+
+        entry = await idempotency_store.begin(entry_id, fingerprint)
+        if entry is not None:
+            if entry["fingerprint"] != fingerprint:
+                return await send_detail(send, 422, "Idempotency-Key was already used with a different request")
+            if entry["state"] == IN_PROGRESS:
+                return await send_detail(send, 409, "A request with this Idempotency-Key is still in progress")
+            return await send_json(
+                send, entry["status_code"], entry["body"],
+                entry["content_type"].encode("latin-1"), replayed=True
+            )
+
+        response = {"status": 500, "content_type": b"application/json", "body": []}
+
+        async def capture(message):
+            if message["type"] == "http.response.start":
+                response["status"] = message["status"]
+                for name, value in message.get("headers", []):
+                    if name == b"content-type":
+                        response["content_type"] = value
+            elif message["type"] == "http.response.body":
+                response["body"].append(message.get("body", b""))
+            await send(message)
+
+        try:
+            await self.app(scope, receive, capture)
+        except BaseException:
+            await idempotency_store.release(entry_id)
+            raise
+        if 200 <= response["status"] < 300:
+            await idempotency_store.complete(
+                entry_id, response["status"], response["content_type"], b"".join(response["body"])
+            )
+        else:
+            await idempotency_store.release(entry_id)
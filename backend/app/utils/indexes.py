@@ -0,0 +1,215 @@
+import os
+import json
+import hashlib
+import logging
+from datetime import datetime
+from pymongo import ASCENDING, DESCENDING, TEXT, IndexModel
+from pymongo.errors import OperationFailure
+from dotenv import load_dotenv
+
+load_dotenv()
+
+logger = logging.getLogger(__name__)
+
+# Skip index reconciliation entirely, e.g. when a deploy step has already run it
+SKIP_INDEX_BUILD = os.getenv("SKIP_INDEX_BUILD", "false").lower() == "true"
+
+# Where the fingerprint of the last applied plan is kept
+META_COLLECTION = "app_meta"
+INDEX_PLAN_META_ID = "index_plan"
+
+# Every index the application relies on, by collection. Each entry is
+# named so reconciliation can tell which ones already exist; change the
+# name when changing an index definition so the old one is replaced.
+INDEX_PLAN = {
+    "users": [
+        IndexModel([("email", ASCENDING)], name="email_1", unique=True),
+        # Admin user list filtered by role, newest first
+        IndexModel([("role", ASCENDING), ("_id", DESCENDING)], name="role_1__id_-1"),
+    ],
+    "workshops": [
+        # Catalog listing, optionally filtered, ordered by start date
+        IndexModel([("start_date", ASCENDING)], name="start_date_1"),
+        IndexModel([("status", ASCENDING), ("start_date", ASCENDING)], name="status_1_start_date_1"),
+        IndexModel([("featured", ASCENDING), ("start_date", ASCENDING)], name="featured_1_start_date_1"),
+        IndexModel([("eligible_grades", ASCENDING), ("start_date", ASCENDING)], name="eligible_grades_1_start_date_1"),
+        # Catalog search; search_prefixes holds word prefixes for prefix matching
+        IndexModel(
+            [("title", TEXT), ("short_description", TEXT), ("description", TEXT), ("search_prefixes", TEXT)],
+            name="workshop_search",
+            weights={"title": 10, "short_description": 5, "search_prefixes": 3, "description": 1},
+            default_language="none",
+        ),
+    ],
+    "registrations": [
+        # One registration per user and workshop; also serves /registrations/me.
+        # Guest registrations store user_id null and are left out.
+        IndexModel(
+            [("user_id", ASCENDING), ("workshop_id", ASCENDING)],
+            name="user_id_1_workshop_id_1_users",
+            unique=True,
+            partialFilterExpression={"user_id": {"$type": "string"}},
+        ),
+        # One guest registration per email and workshop. Signed-in users are
+        # left out: a parent may register several children with one email.
+        IndexModel(
+            [("workshop_id", ASCENDING), ("email", ASCENDING)],
+            name="workshop_id_1_email_1_guests",
+            unique=True,
+            partialFilterExpression={"user_id": {"$type": "null"}},
+        ),
+        # Per-workshop lookups (export, delete checks, admin filter), newest first
+        IndexModel([("workshop_id", ASCENDING), ("_id", DESCENDING)], name="workshop_id_1__id_-1"),
+        IndexModel([("registration_status", ASCENDING), ("_id", DESCENDING)], name="registration_status_1__id_-1"),
+        # Waitlist order within a workshop, oldest first
+        IndexModel(
+            [("workshop_id", ASCENDING), ("registration_status", ASCENDING), ("_id", ASCENDING)],
+            name="workshop_id_1_registration_status_1__id_1"
+        ),
+        IndexModel([("created_at", ASCENDING)], name="created_at_1"),
+    ],
+    "email_outbox": [
+        IndexModel([("status", ASCENDING), ("next_attempt_at", ASCENDING)], name="status_1_next_attempt_at_1"),
+        IndexModel([("claim_id", ASCENDING)], name="claim_id_1", sparse=True),
+    ],
+    "ephemeral_tokens": [
+        # Let MongoDB delete one-time codes once they expire
+        IndexModel([("expires_at", ASCENDING)], name="expires_at_ttl", expireAfterSeconds=0),
+    ],
+}
+
+# Indexes that earlier versions created and that nothing uses any more
+RETIRED_INDEXES = {
+    # workshops never had an "id" field; documents are keyed by _id
+    "workshops": ["id_1"],
+    "registrations": [
+        # Sparse, so it still indexed guest registrations' null user_id
+        "user_id_1_workshop_id_1",
+        # Also covered signed-in users, who may share one email
+        "workshop_id_1_email_1",
+    ],
+}
+
+# Duplicate groups listed when a unique index can't be built
+MAX_REPORTED_DUPLICATES = 20
+
+async def find_duplicates(collection, index: IndexModel):
+    """
+    Groups of documents that would violate a unique index, with their
+    _ids, so they can be resolved before the index is built
+    """
+    document = index.document
+    fields = list(document["key"])
+    pipeline = []
+    if "partialFilterExpression" in document:
+        pipeline.append({"$match": document["partialFilterExpression"]})
+    pipeline += [
+        {"$group": {
+            "_id": {field.replace(".", "_"): f"${field}" for field in fields},
+            "ids": {"$push": "$_id"},
+            "count": {"$sum": 1},
+        }},
+        {"$match": {"count": {"$gt": 1}}},
+        {"$limit": MAX_REPORTED_DUPLICATES},
+        {"$project": {"ids": {"$slice": ["$ids", 10]}, "count": 1}},
+    ]
+    return await collection.aggregate(pipeline, allowDiskUse=True).to_list(MAX_REPORTED_DUPLICATES)
+
+async def reconcile_indexes(database):
+    """
+    Bring the database's indexes in line with INDEX_PLAN.
+
+    Missing indexes are created and retired ones dropped; indexes that
+    already exist under a planned name are left alone, so this is cheap to
+    run when nothing has changed. A unique index is only built once its
+    collection has no duplicates; any found are logged and nothing on
+    that collection changes until they are resolved.
+    """
+    created, dropped = [], []
+    for collection_name in sorted(set(INDEX_PLAN) | set(RETIRED_INDEXES)):
+        collection = database[collection_name]
+        existing = await collection.index_information()
+
+        # Build replacements before dropping what they replace
+        missing = [
+            index for index in INDEX_PLAN.get(collection_name, [])
+            if index.document["name"] not in existing
+        ]
+        duplicates = {}
+        for index in missing:
+            if index.document.get("unique"):
+                groups = await find_duplicates(collection, index)
+                if groups:
+                    duplicates[index.document["name"]] = groups
+        if duplicates:
+            for name, groups in duplicates.items():
+                for group in groups:
+                    logger.error(
+                        "Duplicate %s for unique index %s.%s: %s, documents %s",
+                        group["_id"], collection_name, name, group["count"], group["ids"]
+                    )
+            raise RuntimeError(
+                f"Cannot build unique indexes {sorted(duplicates)} on {collection_name}: "
+                "duplicate documents were logged above, merge or remove them and restart"
+            )
+
+        if missing:
+            try:
+                await collection.create_indexes(missing)
+            except OperationFailure as e:
+                if e.code == 11000:
+                    raise RuntimeError(
+                        f"Cannot build a unique index on {collection_name}, "
+                        f"remove the duplicate documents first: {e}"
+                    ) from e
+                raise
+            created.extend(f"{collection_name}.{index.document['name']}" for index in missing)
+
+        for name in RETIRED_INDEXES.get(collection_name, []):
+            if name in existing:
+                await collection.drop_index(name)
+                dropped.append(f"{collection_name}.{name}")
+
+    if created or dropped:
+        logger.info("Index plan applied: created %s, dropped %s", created or "none", dropped or "none")
+    return {"created": created, "dropped": dropped}
+
+def index_plan_fingerprint():
+    """A hash of INDEX_PLAN and RETIRED_INDEXES that changes with any index definition"""
+    plan = {
+        "indexes": {
+            collection: [index.document for index in indexes]
+            for collection, indexes in INDEX_PLAN.items()
+        },
+        "retired": RETIRED_INDEXES,
+    }
+    encoded = json.dumps(plan, sort_keys=True, default=str).encode("utf-8")
+    return hashlib.sha256(encoded).hexdigest()
+
+async def apply_index_plan(database, force: bool = False):
+    """
+    Reconcile indexes only if the database hasn't recorded this plan yet.
+
+    Workers booting against an up-to-date database read a single meta
+    document instead of listing every collection's indexes; only the
+    first worker to start after the plan changes does the work. Returns
+    True if the plan was applied.
+    """
+    if SKIP_INDEX_BUILD and not force:
+        logger.info("Skipping index reconciliation (SKIP_INDEX_BUILD)")
+        return False
+
+    fingerprint = index_plan_fingerprint()
+    meta = database[META_COLLECTION]
+    if not force:
+        applied = await meta.find_one({"_id": INDEX_PLAN_META_ID}, {"fingerprint": 1})
+        if applied and applied.get("fingerprint") == fingerprint:
+            return False
+
+    await reconcile_indexes(database)
+    await meta.update_one(
+        {"_id": INDEX_PLAN_META_ID},
+        {"$set": {"fingerprint": fingerprint, "applied_at": datetime.utcnow()}},
+        upsert=True
+    )
+    return True
@@ -0,0 +1,322 @@
+import os
+import time
+import threading
+from bisect import bisect_left
+from pymongo import monitoring
+from dotenv import load_dotenv
+
+load_dotenv()
+
+METRICS_ENABLED = os.getenv("METRICS_ENABLED", "true").lower() == "true"
+
+# Latency buckets in seconds, from a fast index lookup up to a slow bcrypt
+# or SMTP call
+DEFAULT_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+def escape_label(value) -> str:
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+def format_labels(names, values, extra=None) -> str:
+    pairs = [f'{name}="{escape_label(value)}"' for name, value in zip(names, values)]
+    if extra:
+        pairs.append(extra)
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+def format_value(value) -> str:
+    if value == float("inf"):
+        return "+Inf"
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+class Metric:
+    """
+    Base for the metric types. Values are kept per label combination and
+    guarded by a lock, since MongoDB listeners run on driver threads.
+    """
+
+    kind = "untyped"
+
+    def __init__(self, name: str, help: str, labelnames=()):
+        self.name = name
+        self.help = help
+        self.labelnames = tuple(labelnames)
+        self._values = {}
+        self._lock = threading.Lock()
+        registry.append(self)
+
+    def _key(self, labels):
+        if len(labels) != len(self.labelnames):
+            raise ValueError(f"{self.name} expects labels {self.labelnames}")
+        return tuple(labels)
+
+    def samples(self):
+        """Yield (suffix, label string, value) for the exposition format"""
+        raise NotImplementedError
+
+    def render(self):
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} {self.kind}"]
+        for suffix, labels, value in self.samples():
+            lines.append(f"{self.name}{suffix}{labels} {format_value(value)}")
+        return "\n".join(lines)
+
+class Counter(Metric):
+    kind = "counter"
+
+    def inc(self, *labels, amount: float = 1):
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def samples(self):
+        with self._lock:
+            values = sorted(self._values.items())
+        for key, value in values:
+            yield "", format_labels(self.labelnames, key), value
+
+class Gauge(Metric):
+    kind = "gauge"
+
+    def set(self, *labels, value: float):
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = value
+
+    def inc(self, *labels, amount: float = 1):
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def dec(self, *labels, amount: float = 1):
+        self.inc(*labels, amount=-amount)
+
+    def samples(self):
+        with self._lock:
+            values = sorted(self._values.items())
+        for key, value in values:
+            yield "", format_labels(self.labelnames, key), value
+
+class Histogram(Metric):
+    kind = "histogram"
+
+    def __init__(self, name: str, help: str, labelnames=(), buckets=DEFAULT_BUCKETS):
+        super().__init__(name, help, labelnames)
+        self.buckets = tuple(sorted(buckets)) + (float("inf"),)
+
+    def observe(self, *labels, value: float):
+        key = self._key(labels)
+        index = bisect_left(self.buckets, value)
+        with self._lock:
+            entry = self._values.get(key)
+            if entry is None:
+                entry = self._values[key] = [[0] * len(self.buckets), 0.0, 0]
+            entry[0][index] += 1
+            entry[1] += value
+            entry[2] += 1
+
+    def samples(self):
+        with self._lock:
+            values = sorted((key, (list(counts), total, count)) for key, (counts, total, count) in self._values.items())
+        for key, (counts, total, count) in values:
+            cumulative = 0
+            for bound, bucket_count in zip(self.buckets, counts):
+                cumulative += bucket_count
+                le = f'le="{format_value(bound)}"'
+                yield "_bucket", format_labels(self.labelnames, key, le), cumulative
+            yield "_sum", format_labels(self.labelnames, key), total
+            yield "_count", format_labels(self.labelnames, key), count
+
+# Every metric defined below, in exposition order
+registry = []
+
+def render_metrics() -> str:
+    """All metrics in the Prometheus text exposition format"""
+    return "\n".join(metric.render() for metric in registry) + "\n"
+
+# HTTP
+http_requests = Counter(
+    "http_requests_total", "HTTP requests handled, by route template and status",
+    ("method", "route", "status")
+)
+http_request_duration = Histogram(
+    "http_request_duration_seconds", "HTTP request latency, by route template",
+    ("method", "route")
+)
+http_requests_in_flight = Gauge(
+    "http_requests_in_flight", "HTTP requests currently being handled", ("method",)
+)
+
+# MongoDB
+mongodb_command_duration = Histogram(
+    "mongodb_command_duration_seconds", "MongoDB command latency, by collection and command",
+    ("collection", "command")
+)
+mongodb_command_failures = Counter(
+    "mongodb_command_failures_total", "MongoDB commands that returned an error",
+    ("collection", "command")
+)
+mongodb_pool_checkout_wait = Histogram(
+    "mongodb_pool_checkout_wait_seconds", "Time spent waiting for a pooled MongoDB connection"
+)
+mongodb_pool_checkout_failures = Counter(
+    "mongodb_pool_checkout_failures_total", "Failed MongoDB connection checkouts, by reason", ("reason",)
+)
+mongodb_pool_checked_out = Gauge(
+    "mongodb_pool_connections_checked_out", "MongoDB connections currently in use"
+)
+
+# Password hashing
+password_hashing_seconds = Counter(
+    "password_hashing_seconds_total", "Time spent in bcrypt, by operation", ("operation",)
+)
+password_hashing_operations = Counter(
+    "password_hashing_operations_total", "bcrypt operations completed, by operation", ("operation",)
+)
+password_hashing_duration = Histogram(
+    "password_hashing_duration_seconds", "bcrypt latency including the wait for a worker, by operation",
+    ("operation",)
+)
+password_hashing_rejected = Counter(
+    "password_hashing_rejected_total", "bcrypt operations rejected because the queue was full"
+)
+
+# Email
+email_send_seconds = Counter(
+    "email_send_seconds_total", "Time spent sending email over SMTP"
+)
+email_sends = Counter(
+    "email_sends_total", "Emails sent over SMTP, by outcome", ("outcome",)
+)
+email_send_duration = Histogram(
+    "email_send_duration_seconds", "SMTP send latency per email"
+)
+
+# Seat events
+seat_event_subscribers = Gauge(
+    "seat_event_subscribers", "Clients connected to the seat availability streams"
+)
+seat_event_publishes = Counter(
+    "seat_event_publishes_total", "Batches of seat changes fanned out to the streams"
+)
+
+# Registration waiting room
+admission_outcomes = Counter(
+    "admission_requests_total", "Registration requests by waiting room outcome", ("outcome",)
+)
+admission_queue_length = Gauge(
+    "admission_queue_length", "Registration requests waiting in line, across workshops"
+)
+admission_wait_duration = Histogram(
+    "admission_wait_seconds", "Time admitted registrations spent waiting in line"
+)
+
+def route_label(scope) -> str:
+    """The matched route's path template, so ids don't become labels"""
+    route = scope.get("route")
+    path = getattr(route, "path_format", None) or getattr(route, "path", None)
+    return path or "unmatched"
+
+class MetricsMiddleware:
+    """Records latency, status and in-flight counts for every HTTP request"""
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if not METRICS_ENABLED or scope["type"] != "http":
+            return await self.app(scope, receive, send)
+
+        method = scope["method"]
+        status_code = 500
+
+        async def send_wrapper(message):
+            nonlocal status_code
+            if message["type"] == "http.response.start":
+                status_code = message["status"]
+            await send(message)
+
+        http_requests_in_flight.inc(method)
+        start = time.perf_counter()
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            elapsed = time.perf_counter() - start
+            http_requests_in_flight.dec(method)
+            route = route_label(scope)
+            http_request_duration.observe(method, route, value=elapsed)
+            http_requests.inc(method, route, str(status_code))
+
+class CommandMetrics(monitoring.CommandListener):
+    """Times every MongoDB command by collection and command name"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._collections = {}
+
+    def started(self, event):
+        collection = event.command.get(event.command_name)
+        if not isinstance(collection, str):
+            # getMore names the collection separately from the cursor id
+            collection = event.command.get("collection")
+        with self._lock:
+            self._collections[(event.connection_id, event.request_id)] = collection if isinstance(collection, str) else "-"
+
+    def _collection(self, event):
+        with self._lock:
+            return self._collections.pop((event.connection_id, event.request_id), "-")
+
+    def succeeded(self, event):
+        mongodb_command_duration.observe(
+            self._collection(event), event.command_name, value=event.duration_micros / 1e6
+        )
+
+    def failed(self, event):
+        collection = self._collection(event)
+        mongodb_command_duration.observe(collection, event.command_name, value=event.duration_micros / 1e6)
+        mongodb_command_failures.inc(collection, event.command_name)
+
+class PoolMetrics(monitoring.ConnectionPoolListener):
+    """Tracks how long requests wait to check out a pooled connection"""
+
+    def connection_checked_out(self, event):
+        mongodb_pool_checked_out.inc()
+        duration = getattr(event, "duration", None)
+        if duration is not None:
+            mongodb_pool_checkout_wait.observe(value=duration)
+
+    def connection_check_out_failed(self, event):
+        mongodb_pool_checkout_failures.inc(str(event.reason))
+        duration = getattr(event, "duration", None)
+        if duration is not None:
+            mongodb_pool_checkout_wait.observe(value=duration)
+
+    def connection_checked_in(self, event):
+        mongodb_pool_checked_out.dec()
+
+    def pool_created(self, event):
+        pass
+
+    def pool_ready(self, event):
+        pass
+
+    def pool_cleared(self, event):
+        pass
+
+    def pool_closed(self, event):
+        pass
+
+    def connection_created(self, event):
+        pass
+
+    def connection_ready(self, event):
+        pass
+
+    def connection_closed(self, event):
+        pass
+
+    def connection_check_out_started(self, event):
+        pass
+
+def mongo_listeners():
+    """Listeners to register on the MongoDB client"""
+    return [CommandMetrics(), PoolMetrics()] if METRICS_ENABLED else []
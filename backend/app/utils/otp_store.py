@@ -0,0 +1,166 @@
+import os
+import asyncio
+import hashlib
+import hmac
+import time
+from datetime import datetime, timedelta
+from pymongo import ReturnDocument
+from dotenv import load_dotenv
+
+from app.utils.db import ephemeral_tokens_collection
+
+load_dotenv()
+
+OTP_STORE_BACKEND = os.getenv("OTP_STORE", "mongo")  # mongo, memory
+OTP_MAX_ATTEMPTS = int(os.getenv("OTP_MAX_ATTEMPTS", "5"))
+OTP_SWEEP_INTERVAL_SECONDS = int(os.getenv("OTP_SWEEP_INTERVAL_SECONDS", "60"))
+
+# Codes are stored as keyed digests, never in plain text
+OTP_SECRET = (os.getenv("JWT_SECRET") or "").encode("utf-8")
+
+# verify() results
+OTP_VALID = "valid"
+OTP_INVALID = "invalid"
+OTP_EXPIRED = "expired"
+OTP_MISSING = "missing"
+OTP_LOCKED = "locked"
+
+def code_digest(key: str, code: str) -> str:
+    return hmac.new(OTP_SECRET, f"{key}:{code}".encode("utf-8"), hashlib.sha256).hexdigest()
+
+class MongoOTPStore:
+    """
+    Keeps codes in MongoDB so every worker process sees the same codes.
+    A TTL index on expires_at removes expired entries.
+    """
+
+    def __init__(self, collection, purpose: str):
+        self.collection = collection
+        self.purpose = purpose
+
+    def _id(self, key: str) -> str:
+        return f"{self.purpose}:{key}"
+
+    def start(self):
+        pass
+
+    async def stop(self):
+        pass
+
+    async def issue(self, key: str, code: str, ttl_seconds: int):
+        """Store a code for key, replacing any earlier one"""
+        await self.collection.replace_one(
+            {"_id": self._id(key)},
+            {
+                "digest": code_digest(key, code),
+                "attempts": 0,
+                "expires_at": datetime.utcnow() + timedelta(seconds=ttl_seconds),
+            },
+            upsert=True
+        )
+
+    async def verify(self, key: str, code: str) -> str:
+        """
+        Check a code, counting the attempt against OTP_MAX_ATTEMPTS. A
+        valid code is deleted in the same operation, so it can only be
+        used once even by concurrent requests.
+        """
+        now = datetime.utcnow()
+        consumed = await self.collection.find_one_and_delete({
+            "_id": self._id(key),
+            "digest": code_digest(key, code),
+            "attempts": {"$lt": OTP_MAX_ATTEMPTS},
+            "expires_at": {"$gt": now},
+        }, projection={"_id": 1})
+        if consumed is not None:
+            return OTP_VALID
+
+        entry = await self.collection.find_one_and_update(
+            {"_id": self._id(key), "attempts": {"$lt": OTP_MAX_ATTEMPTS}},
+            {"$inc": {"attempts": 1}},
+            return_document=ReturnDocument.AFTER
+        )
+        if entry is None:
+            exists = await self.collection.find_one({"_id": self._id(key)}, {"_id": 1})
+            return OTP_LOCKED if exists else OTP_MISSING
+
+        # The TTL monitor only runs about once a minute
+        if entry["expires_at"] <= now:
+            await self.discard(key)
+            return OTP_EXPIRED
+        return OTP_INVALID
+
+    async def discard(self, key: str):
+        await self.collection.delete_one({"_id": self._id(key)})
+
+class MemoryOTPStore:
+    """
+    Keeps codes in this process only, for single-worker and development
+    setups. A background sweeper drops expired entries.
+    """
+
+    def __init__(self, purpose: str):
+        self.purpose = purpose
+        self._entries = {}
+        self._task = None
+
+    def start(self):
+        if self._task is None:
+            self._task = asyncio.create_task(self._sweep())
+
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+    async def _sweep(self):
+        while True:
+            await asyncio.sleep(OTP_SWEEP_INTERVAL_SECONDS)
+            self.sweep()
+
+    def sweep(self):
+        now = time.monotonic()
+        expired = [key for key, entry in self._entries.items() if entry["expires_at"] <= now]
+        for key in expired:
+            del self._entries[key]
+
+    async def issue(self, key: str, code: str, ttl_seconds: int):
+        self._entries[key] = {
+            "digest": code_digest(key, code),
+            "attempts": 0,
+            "expires_at": time.monotonic() + ttl_seconds,
+        }
+
+    async def verify(self, key: str, code: str) -> str:
+        """Check a code as MongoOTPStore.verify does; a valid code is consumed"""
+        entry = self._entries.get(key)
+        if entry is None:
+            return OTP_MISSING
+        if entry["expires_at"] <= time.monotonic():
+            del self._entries[key]
+            return OTP_EXPIRED
+        if entry["attempts"] >= OTP_MAX_ATTEMPTS:
+            return OTP_LOCKED
+        entry["attempts"] += 1
+        if hmac.compare_digest(entry["digest"], code_digest(key, code)):
+            # Used up; nothing awaits between the check and here
+            self._entries.pop(key, None)
+            return OTP_VALID
+        return OTP_INVALID
+
+    async def discard(self, key: str):
+        self._entries.pop(key, None)
+
+def create_otp_store(purpose: str, backend: str = OTP_STORE_BACKEND):
+    if backend == "memory":
+        return MemoryOTPStore(purpose)
+    if backend == "mongo":
+        return MongoOTPStore(ephemeral_tokens_collection, purpose)
+    raise ValueError(f"Unknown OTP store backend: {backend}")
+
+# Password reset codes
+otp_store = create_otp_store("password_reset")
@@ -0,0 +1,91 @@
+import base64
+import binascii
+from datetime import datetime
+from typing import Any, Dict, Optional
+from bson import ObjectId
+from bson.errors import InvalidId
+from fastapi import HTTPException, Response
+
+DEFAULT_PAGE_SIZE = 50
+MAX_PAGE_SIZE = 1000
+
+# Filtered totals are counted up to this many documents
+COUNT_LIMIT = 10000
+
+def encode_cursor(doc_id: ObjectId) -> str:
+    """Opaque continuation token for the page after doc_id"""
+    return base64.urlsafe_b64encode(doc_id.binary).decode("ascii").rstrip("=")
+
+def decode_cursor(cursor: str) -> ObjectId:
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        return ObjectId(base64.urlsafe_b64decode(padded.encode("ascii")))
+    except (binascii.Error, InvalidId, TypeError, ValueError):
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+
+def id_range(
+    created_from: Optional[datetime] = None,
+    created_to: Optional[datetime] = None,
+    before: Optional[ObjectId] = None
+) -> Dict[str, Any]:
+    """
+    Build an _id condition for a creation-date range and keyset position.
+
+    ObjectIds embed their creation time, so a date range becomes an _id
+    range that the default _id index (or a compound index ending in _id)
+    can serve without an in-memory sort.
+    """
+    condition = {}
+    if created_from:
+        condition["$gte"] = ObjectId.from_datetime(created_from)
+    if created_to:
+        condition["$lt"] = ObjectId.from_datetime(created_to)
+    if before and ("$lt" not in condition or before < condition["$lt"]):
+        condition["$lt"] = before
+    return condition
+
+async def fetch_page(
+    collection,
+    query: Dict[str, Any],
+    response: Response,
+    cursor: Optional[str] = None,
+    limit: int = DEFAULT_PAGE_SIZE,
+    created_from: Optional[datetime] = None,
+    created_to: Optional[datetime] = None,
+    count: bool = False,
+    projection: Optional[Dict[str, Any]] = None
+):
+    """
+    Fetch one page of documents, newest first, using keyset pagination on _id.
+
+    The continuation token for the next page is returned in the
+    X-Next-Cursor header. Documents are returned as fetched, with ObjectId
+    _id values, ready for trusted_response. With count=True the total is returned in
+    X-Total-Count: an estimated count for unfiltered queries, otherwise a
+    count capped at COUNT_LIMIT.
+    """
+    limit = max(1, min(limit, MAX_PAGE_SIZE))
+
+    page_query = dict(query)
+    _id = id_range(created_from, created_to, decode_cursor(cursor) if cursor else None)
+    if _id:
+        page_query["_id"] = _id
+
+    docs = await collection.find(page_query, projection).sort("_id", -1).limit(limit + 1).to_list(limit + 1)
+
+    if len(docs) > limit:
+        docs = docs[:limit]
+        response.headers["X-Next-Cursor"] = encode_cursor(docs[-1]["_id"])
+
+    if count:
+        count_query = dict(query)
+        date_range = id_range(created_from, created_to)
+        if date_range:
+            count_query["_id"] = date_range
+        if count_query:
+            total = await collection.count_documents(count_query, limit=COUNT_LIMIT)
+        else:
+            total = await collection.estimated_document_count()
+        response.headers["X-Total-Count"] = str(total)
+
+    return docs
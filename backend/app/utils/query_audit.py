@@ -0,0 +1,152 @@
+import os
+import json
+import logging
+import threading
+from pymongo import monitoring
+from dotenv import load_dotenv
+
+load_dotenv()
+
+logger = logging.getLogger(__name__)
+
+# Enable in development and test runs only; it records every query shape
+QUERY_AUDIT = os.getenv("QUERY_AUDIT", "false").lower() == "true"
+
+AUDITED_COMMANDS = {"find", "aggregate", "count", "distinct", "findAndModify", "update", "delete"}
+
+# Driver-added fields that are not part of the query itself
+SESSION_FIELDS = {
+    "lsid", "$db", "$clusterTime", "$readPreference", "txnNumber",
+    "autocommit", "startTransaction", "readConcern", "writeConcern",
+    "apiVersion", "apiStrict", "apiDeprecationErrors",
+}
+
+# (collection, command, shape) of scans that are expected, registered
+# with expect_collscan(); e.g. the dashboard snapshot aggregates whole
+# collections in the background (see app/utils/stats.py)
+EXPECTED_COLLSCANS = set()
+
+def value_shape(value):
+    """Replace literal values with placeholders, keeping operators and field names"""
+    if isinstance(value, dict):
+        return {key: value_shape(item) for key, item in value.items()}
+    if isinstance(value, (list, tuple)):
+        return [value_shape(item) for item in value[:1]]
+    return "?"
+
+def command_shape(command_name, command):
+    """Shape of the parts of a command that decide which plan runs"""
+    if command_name == "find":
+        parts = {"filter": command.get("filter", {}), "sort": command.get("sort")}
+    elif command_name == "aggregate":
+        parts = {"pipeline": command.get("pipeline", [])}
+    elif command_name in ("count", "distinct"):
+        parts = {"query": command.get("query", {}), "key": command.get("key")}
+    elif command_name == "findAndModify":
+        parts = {"query": command.get("query", {}), "sort": command.get("sort")}
+    elif command_name == "update":
+        parts = {"q": [u.get("q", {}) for u in command.get("updates", [])[:1]]}
+    else:
+        parts = {"q": [d.get("q", {}) for d in command.get("deletes", [])[:1]]}
+    return json.dumps(value_shape(parts), sort_keys=True, default=str)
+
+def expect_collscan(collection, command_name, command):
+    """Exempt one query shape from the audit"""
+    EXPECTED_COLLSCANS.add((collection, command_name, command_shape(command_name, command)))
+
+def plan_stages(plan):
+    """Yield every stage name in an explain plan tree"""
+    if isinstance(plan, dict):
+        if "stage" in plan:
+            yield plan["stage"]
+        for key, value in plan.items():
+            if key in ("inputStage", "inputStages", "queryPlan"):
+                yield from plan_stages(value)
+    elif isinstance(plan, list):
+        for item in plan:
+            yield from plan_stages(item)
+
+def winning_plans(explain):
+    """Find the winning plans in find, aggregate and write explain output"""
+    planner = explain.get("queryPlanner")
+    if planner:
+        yield planner.get("winningPlan", {})
+    for stage in explain.get("stages", []):
+        cursor = stage.get("$cursor", {})
+        if "queryPlanner" in cursor:
+            yield cursor["queryPlanner"].get("winningPlan", {})
+    for shard in explain.get("shards", {}).values():
+        yield from winning_plans(shard)
+
+class QueryAuditor(monitoring.CommandListener):
+    """
+    Records each distinct query shape the application sends to MongoDB
+    and explains them on demand, reporting collection scans and in-memory
+    sorts. Register it on the client with event_listeners, exercise the
+    routes, then call audit() (or assert_indexed() from a test).
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.shapes = {}
+
+    def started(self, event):
+        if event.command_name not in AUDITED_COMMANDS:
+            return
+        command = {k: v for k, v in event.command.items() if k not in SESSION_FIELDS}
+        collection = command.get(event.command_name)
+        if not isinstance(collection, str):
+            return
+        key = (event.database_name, collection, event.command_name,
+               command_shape(event.command_name, command))
+        with self._lock:
+            self.shapes.setdefault(key, command)
+
+    def succeeded(self, event):
+        pass
+
+    def failed(self, event):
+        pass
+
+    def reset(self):
+        with self._lock:
+            self.shapes.clear()
+
+    async def audit(self, client):
+        """Explain every recorded shape and return the problem findings"""
+        with self._lock:
+            shapes = list(self.shapes.items())
+
+        findings = []
+        for (database_name, collection, command_name, shape), command in shapes:
+            if (collection, command_name, shape) in EXPECTED_COLLSCANS:
+                continue
+            try:
+                explain = await client[database_name].command(
+                    {"explain": command, "verbosity": "queryPlanner"}
+                )
+            except Exception as e:
+                logger.warning("Could not explain %s on %s: %s", command_name, collection, e)
+                continue
+
+            stages = set()
+            for plan in winning_plans(explain):
+                stages.update(plan_stages(plan))
+            problems = sorted(stages & {"COLLSCAN", "SORT"})
+            if problems:
+                findings.append({
+                    "collection": collection,
+                    "command": command_name,
+                    "shape": shape,
+                    "problems": problems,
+                })
+        return findings
+
+    async def assert_indexed(self, client):
+        """Raise AssertionError if any recorded query scans or sorts in memory"""
+        findings = await self.audit(client)
+        if findings:
+            lines = [f"{f['collection']}.{f['command']} {f['problems']}: {f['shape']}" for f in findings]
+            raise AssertionError("Unindexed query shapes:\n" + "\n".join(lines))
+
+query_auditor = QueryAuditor()
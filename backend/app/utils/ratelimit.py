@@ -0,0 +1,226 @@
+import os
+import json
+import math
+import time
+from collections import OrderedDict
+from jose import JWTError, jwt
+from dotenv import load_dotenv
+
+from app.utils.auth import SECRET_KEY, ALGORITHM
+
+load_dotenv()
+
+RATE_LIMIT_ENABLED = os.getenv("RATE_LIMIT_ENABLED", "true").lower() == "true"
+# Only trust X-Forwarded-For when the API runs behind a proxy that sets it
+RATE_LIMIT_TRUST_PROXY = os.getenv("RATE_LIMIT_TRUST_PROXY", "false").lower() == "true"
+RATE_LIMIT_MAX_KEYS = int(os.getenv("RATE_LIMIT_MAX_KEYS", "10000"))
+# Each worker process keeps its own buckets and connections are spread
+# across workers, so every worker enforces its share of the per-IP rates
+RATE_LIMIT_WORKERS = max(1, int(os.getenv("WEB_CONCURRENCY", "1") or "1"))
+
+# Largest request body read to find the account an auth request is for
+MAX_INSPECTED_BODY = 64 * 1024
+
+def parse_rate(value: str, workers: int = RATE_LIMIT_WORKERS):
+    """Parse "<requests>/<seconds>" into this worker's (capacity, tokens per second)"""
+    count, seconds = value.split("/")
+    share = int(count) / workers
+    return max(1, round(share)), share / float(seconds)
+
+class TokenBucket:
+    __slots__ = ("capacity", "rate", "tokens", "updated")
+
+    def __init__(self, capacity: int, rate: float, now: float):
+        self.capacity = capacity
+        self.rate = rate
+        self.tokens = float(capacity)
+        self.updated = now
+
+    def take(self, now: float) -> float:
+        """Take one token; returns 0 on success or the seconds until one is available"""
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+        if self.tokens >= 1:
+            self.tokens -= 1
+            return 0.0
+        return (1 - self.tokens) / self.rate
+
+class BucketTable:
+    """Token buckets per key, dropping the least recently used past max_keys"""
+
+    def __init__(self, rate: str, workers: int = RATE_LIMIT_WORKERS, max_keys: int = RATE_LIMIT_MAX_KEYS):
+        self.capacity, self.rate = parse_rate(rate, workers)
+        self.max_keys = max_keys
+        self._buckets = OrderedDict()
+
+    def take(self, key: str) -> float:
+        now = time.monotonic()
+        bucket = self._buckets.get(key)
+        if bucket is None:
+            bucket = TokenBucket(self.capacity, self.rate, now)
+            self._buckets[key] = bucket
+            if len(self._buckets) > self.max_keys:
+                self._buckets.popitem(last=False)
+        else:
+            self._buckets.move_to_end(key)
+        return bucket.take(now)
+
+class RouteGroup:
+    """
+    Limits shared by a group of expensive routes: a token bucket per client
+    IP, one per account, and a cap on requests in flight at once.
+    """
+
+    def __init__(self, name: str, per_ip: str, per_account: str, max_in_flight: int, account_source: str):
+        prefix = f"RATE_LIMIT_{name.upper()}"
+        self.name = name
+        self.ip_buckets = BucketTable(os.getenv(f"{prefix}_PER_IP", per_ip))
+        # Too small to split between workers, see RateLimitMiddleware
+        self.account_buckets = BucketTable(os.getenv(f"{prefix}_PER_ACCOUNT", per_account), workers=1)
+        self.max_in_flight = int(os.getenv(f"{prefix}_MAX_IN_FLIGHT", str(max_in_flight)))
+        self.account_source = account_source  # body_email, token_subject
+        self.in_flight = 0
+        self.throttled = 0
+        self.shed = 0
+
+    def stats(self):
+        return {
+            "in_flight": self.in_flight,
+            "max_in_flight": self.max_in_flight,
+            "throttled": self.throttled,
+            "shed": self.shed,
+        }
+
+ROUTE_GROUPS = {
+    "login": RouteGroup("login", "20/60", "5/60", 32, "body_email"),
+    "password_reset": RouteGroup("password_reset", "10/60", "3/300", 8, "body_email"),
+    "registration": RouteGroup("registration", "30/60", "10/60", 64, "token_subject"),
+}
+
+ROUTE_MAP = {
+    ("POST", "/api/auth/login"): ROUTE_GROUPS["login"],
+    ("POST", "/api/auth/forgot-password"): ROUTE_GROUPS["password_reset"],
+    ("POST", "/api/auth/reset-password"): ROUTE_GROUPS["password_reset"],
+    ("POST", "/api/registrations"): ROUTE_GROUPS["registration"],
+}
+
+def rate_limit_stats():
+    return {name: group.stats() for name, group in ROUTE_GROUPS.items()}
+
+def client_ip(scope) -> str:
+    if RATE_LIMIT_TRUST_PROXY:
+        for name, value in scope.get("headers", []):
+            if name == b"x-forwarded-for":
+                return value.decode("latin-1").split(",")[0].strip()
+    client = scope.get("client")
+    return client[0] if client else "unknown"
+
+def token_subject(scope):
+    for name, value in scope.get("headers", []):
+        if name == b"authorization":
+            scheme, _, token = value.decode("latin-1").partition(" ")
+            if scheme.lower() != "bearer":
+                return None
+            try:
+                return jwt.decode(token, SECRET_KEY, algorithms=[ALGORITHM]).get("sub")
+            except JWTError:
+                return None
+    return None
+
+async def read_body(receive):
+    """Read the whole request body, returning it with a receive that replays it"""
+    chunks = []
+    size = 0
+    more_body = True
+    while more_body:
+        message = await receive()
+        if message["type"] != "http.request":
+            break
+        chunk = message.get("body", b"")
+        chunks.append(chunk)
+        size += len(chunk)
+        more_body = message.get("more_body", False)
+        if size > MAX_INSPECTED_BODY:
+            break
+
+    body = b"".join(chunks)
+    replayed = False
+
+    async def replay():
+        nonlocal replayed
+        if not replayed:
+            replayed = True
+            return {"type": "http.request", "body": body, "more_body": more_body}
+        return await receive()
+
+    return body, replay
+
+async def send_error(send, status_code: int, detail: str, retry_after: float):
+    body = json.dumps({"detail": detail}).encode("utf-8")
+    await send({
+        "type": "http.response.start",
+        "status": status_code,
+        "headers": [
+            (b"content-type", b"application/json"),
+            (b"content-length", str(len(body)).encode("latin-1")),
+            (b"retry-after", str(max(1, math.ceil(retry_after))).encode("latin-1")),
+        ],
+    })
+    await send({"type": "http.response.body", "body": body})
+
+class RateLimitMiddleware:
+    """
+    Sheds excess traffic on the login, password reset and registration
+    routes before it reaches bcrypt, SMTP or MongoDB. Over-rate clients
+    get 429 and requests beyond the group's in-flight cap get 503, both
+    with Retry-After.
+
+    Limits are kept per process. With several workers each enforces
+    1/WEB_CONCURRENCY of the per-IP rates. Per-account limits are only a
+    few requests per window, and a share of them would round down to one
+    request per much longer window. So every worker enforces the full
+    per-account count, and an account may get up to WEB_CONCURRENCY times
+    that across the workers.
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if not RATE_LIMIT_ENABLED or scope["type"] != "http":
+            return await self.app(scope, receive, send)
+
+        group = ROUTE_MAP.get((scope["method"], scope["path"].rstrip("/")))
+        if group is None:
+            return await self.app(scope, receive, send)
+
+        wait = group.ip_buckets.take(client_ip(scope))
+        if wait:
+            group.throttled += 1
+            return await send_error(send, 429, "Too many requests, please slow down", wait)
+
+        account = None
+        if group.account_source == "body_email":
+            body, receive = await read_body(receive)
+            try:
+                account = json.loads(body).get("email")
+            except (ValueError, AttributeError):
+                account = None
+        elif group.account_source == "token_subject":
+            account = token_subject(scope)
+
+        if isinstance(account, str) and account:
+            wait = group.account_buckets.take(account.lower())
+            if wait:
+                group.throttled += 1
+                return await send_error(send, 429, "Too many attempts for this account, please wait", wait)
+
+        if group.in_flight >= group.max_in_flight:
+            group.shed += 1
+            return await send_error(send, 503, "Server is busy, please retry shortly", 1)
+
+        group.in_flight += 1
+        try:
+            await self.app(scope, receive, send)
+        finally:
+            group.in_flight -= 1
@@ -0,0 +1,54 @@
+import re
+from typing import Any, Dict, List, Optional
+
+from app.utils.db import workshops_collection
+
+# Fields whose words can be matched by prefix ("chem" finds "chemistry")
+PREFIX_FIELDS = ("title", "short_description")
+MIN_PREFIX_LENGTH = 2
+MAX_PREFIX_LENGTH = 15
+
+_WORD_RE = re.compile(r"\w+", re.UNICODE)
+
+def tokenize(text: Optional[str]) -> List[str]:
+    """Split text into lowercase words, dropping punctuation and operators"""
+    return _WORD_RE.findall(text.lower()) if text else []
+
+def search_prefixes(workshop: Dict[str, Any]) -> List[str]:
+    """
+    Build the prefixes stored on a workshop for prefix matching.
+
+    The list is covered by the workshop text index, so a query word that
+    is only the beginning of a title word still matches and is ranked
+    alongside full-word matches.
+    """
+    prefixes = set()
+    for field in PREFIX_FIELDS:
+        for word in tokenize(workshop.get(field)):
+            for length in range(MIN_PREFIX_LENGTH, min(len(word), MAX_PREFIX_LENGTH) + 1):
+                prefixes.add(word[:length])
+    return sorted(prefixes)
+
+def text_search_filter(search: str) -> Optional[Dict[str, Any]]:
+    """
+    Build a $text filter from user input, or None if it has no words.
+
+    Only plain words are passed on, so quotes and "-" negation in the
+    input cannot change the meaning of the search.
+    """
+    words = tokenize(search)
+    if not words:
+        return None
+    return {"$text": {"$search": " ".join(words)}}
+
+async def backfill_search_prefixes():
+    """Add search prefixes to workshops created before search was indexed"""
+    cursor = workshops_collection.find(
+        {"search_prefixes": {"$exists": False}},
+        {field: 1 for field in PREFIX_FIELDS}
+    )
+    async for workshop in cursor:
+        await workshops_collection.update_one(
+            {"_id": workshop["_id"]},
+            {"$set": {"search_prefixes": search_prefixes(workshop)}}
+        )
@@ -0,0 +1,210 @@
+import os
+from datetime import datetime
+from fastapi import HTTPException
+from pymongo import ReturnDocument
+from dotenv import load_dotenv
+
+from app.utils.db import workshops_collection, registrations_collection
+from app.utils.catalog_cache import invalidate_catalog
+from app.utils.email import waitlist_promotion_message, enqueue_emails
+
+load_dotenv()
+
+# Full workshops put new registrations on a waitlist instead of refusing them
+WAITLIST_ENABLED = os.getenv("WAITLIST_ENABLED", "true").lower() == "true"
+
+# Workshop statuses that accept new registrations
+OPEN_STATUSES = ["upcoming", "ongoing"]
+
+# Registration statuses that hold one of the workshop's seats
+SEAT_STATUSES = {"pending", "approved"}
+WAITLISTED = "waitlisted"
+
+# Workshop fields the registration path needs after a seat is claimed
+RESERVATION_PROJECTION = {"title": 1, "fee": 1, "start_date": 1}
+
+async def backfill_waitlist_count():
+    """Give workshops created before the waitlist an explicit waitlist_count"""
+    await workshops_collection.update_many(
+        {"waitlist_count": {"$exists": False}},
+        {"$set": {"waitlist_count": 0}}
+    )
+
+async def reserve_seat(workshop_obj_id):
+    """
+    Atomically claim one seat in a workshop.
+
+    The capacity, deadline and status checks are part of the update filter,
+    so concurrent callers can never push registered_count past
+    max_participants. Nobody gets a seat ahead of a non-empty waitlist.
+    Returns the projected workshop document, or None if no seat could be
+    claimed.
+    """
+    workshop = await workshops_collection.find_one_and_update(
+        {
+            "_id": workshop_obj_id,
+            "status": {"$in": OPEN_STATUSES},
+            "registration_deadline": {"$gte": datetime.utcnow()},
+            "waitlist_count": {"$not": {"$gt": 0}},
+            "$expr": {"$lt": ["$registered_count", "$max_participants"]},
+        },
+        {"$inc": {"registered_count": 1}},
+        projection=RESERVATION_PROJECTION,
+        return_document=ReturnDocument.AFTER,
+    )
+    if workshop:
+        invalidate_catalog(workshop_obj_id)
+    return workshop
+
+async def release_seat(workshop_obj_id, count: int = 1):
+    """Give back seats and hand them to the waitlist; returns the promoted registrations"""
+    await workshops_collection.update_one(
+        {"_id": workshop_obj_id, "registered_count": {"$gte": count}},
+        {"$inc": {"registered_count": -count}}
+    )
+    invalidate_catalog(workshop_obj_id)
+    return await promote_from_waitlist(workshop_obj_id)
+
+async def claim_seat(workshop_obj_id, from_waitlist: bool = False):
+    """
+    Take a seat for an existing registration an admin moves back to
+    pending or approved. Only capacity is checked; a registration leaving
+    the waitlist also takes itself off the waitlist count.
+    """
+    update = {"registered_count": 1}
+    if from_waitlist:
+        update["waitlist_count"] = -1
+    result = await workshops_collection.update_one(
+        {"_id": workshop_obj_id, "$expr": {"$lt": ["$registered_count", "$max_participants"]}},
+        {"$inc": update}
+    )
+    if result.modified_count:
+        invalidate_catalog(workshop_obj_id)
+    return bool(result.modified_count)
+
+async def change_waitlist_count(workshop_obj_id, delta: int):
+    query = {"_id": workshop_obj_id}
+    if delta < 0:
+        query["waitlist_count"] = {"$gte": -delta}
+    await workshops_collection.update_one(query, {"$inc": {"waitlist_count": delta}})
+    invalidate_catalog(workshop_obj_id)
+
+async def promote_from_waitlist(workshop_obj_id):
+    """
+    Move the oldest waitlisted registrations into free seats, one seat at
+    a time, and email them. Each seat is claimed atomically before a
+    registration is promoted, so concurrent promoters never overfill the
+    workshop or promote the same registration twice.
+    """
+    promoted = []
+    workshop = None
+    while True:
+        claimed = await workshops_collection.find_one_and_update(
+            {
+                "_id": workshop_obj_id,
+                "waitlist_count": {"$gt": 0},
+                "$expr": {"$lt": ["$registered_count", "$max_participants"]},
+            },
+            {"$inc": {"registered_count": 1, "waitlist_count": -1}},
+            projection={"title": 1, "start_date": 1},
+        )
+        if not claimed:
+            break
+        workshop = claimed
+
+        registration = await registrations_collection.find_one_and_update(
+            {"workshop_id": str(workshop_obj_id), "registration_status": WAITLISTED},
+            {"$set": {"registration_status": "pending", "promoted_at": datetime.utcnow()}},
+            sort=[("_id", 1)],
+            projection={"email": 1, "full_name": 1},
+        )
+        if registration is None:
+            # waitlist_count ran ahead of the waitlist; it has been corrected,
+            # give the seat back
+            await workshops_collection.update_one(
+                {"_id": workshop_obj_id, "registered_count": {"$gt": 0}},
+                {"$inc": {"registered_count": -1}}
+            )
+            break
+        promoted.append(registration)
+
+    if workshop is not None:
+        invalidate_catalog(workshop_obj_id)
+    if promoted:
+        await enqueue_emails([
+            waitlist_promotion_message(
+                registration["email"],
+                registration["full_name"],
+                workshop["title"],
+                workshop["start_date"].strftime("%Y-%m-%d %H:%M")
+            )
+            for registration in promoted
+        ])
+    return promoted
+
+async def change_seat(workshop_obj_id, old_status: str, new_status: str, count: int = 1):
+    """
+    Update a workshop's seat and waitlist counts for `count` registrations
+    moving from old_status to new_status. Returns False, changing nothing,
+    if they need a seat and none is free (only supported for count=1).
+    """
+    held, holds = old_status in SEAT_STATUSES, new_status in SEAT_STATUSES
+    if held and holds:
+        return True
+    if not held and holds:
+        return await claim_seat(workshop_obj_id, from_waitlist=old_status == WAITLISTED)
+    if held:
+        if new_status == WAITLISTED:
+            await change_waitlist_count(workshop_obj_id, count)
+        await release_seat(workshop_obj_id, count)
+        return True
+    if old_status == WAITLISTED and new_status != WAITLISTED:
+        await change_waitlist_count(workshop_obj_id, -count)
+    elif new_status == WAITLISTED and old_status != WAITLISTED:
+        await change_waitlist_count(workshop_obj_id, count)
+    return True
+
+async def join_waitlist(workshop_obj_id):
+    """
+    Count a just-inserted waitlisted registration and fill any seat that
+    opened up meanwhile. The registration is inserted first, so a
+    promoter that sees the new count always finds it.
+    """
+    await change_waitlist_count(workshop_obj_id, 1)
+    return await promote_from_waitlist(workshop_obj_id)
+
+async def waitlist_position(registration):
+    """1-based place of a waitlisted registration in its workshop's queue"""
+    ahead = await registrations_collection.count_documents({
+        "workshop_id": registration["workshop_id"],
+        "registration_status": WAITLISTED,
+        "_id": {"$lt": registration["_id"]},
+    })
+    return ahead + 1
+
+async def raise_reservation_error(workshop_obj_id, allow_waitlist: bool = False):
+    """
+    Explain why reserve_seat returned None.
+
+    Only runs on the rejection path, so the extra read never costs anything
+    for registrations that succeed. With allow_waitlist, returns instead
+    of raising when the only problem is that the workshop is full.
+    """
+    workshop = await workshops_collection.find_one(
+        {"_id": workshop_obj_id},
+        {"registration_deadline": 1, "status": 1, "registered_count": 1, "max_participants": 1}
+    )
+
+    if not workshop:
+        raise HTTPException(status_code=404, detail="Workshop not found")
+
+    if workshop["registration_deadline"] < datetime.utcnow():
+        raise HTTPException(status_code=400, detail="Registration deadline has passed")
+
+    if workshop["status"] not in OPEN_STATUSES:
+        raise HTTPException(status_code=400, detail="Workshop is not open for registration")
+
+    if allow_waitlist and WAITLIST_ENABLED:
+        return
+
+    raise HTTPException(status_code=400, detail="Workshop is already full")
@@ -0,0 +1,144 @@
+import os
+import asyncio
+import logging
+from datetime import datetime, timedelta
+from dotenv import load_dotenv
+
+from app.utils.db import (
+    workshops_collection,
+    registrations_collection,
+    users_collection,
+    stats_snapshots_collection
+)
+from app.utils.query_audit import expect_collscan
+
+load_dotenv()
+
+logger = logging.getLogger(__name__)
+
+# Day ranges the dashboard can show; the snapshot always covers the longest
+DASHBOARD_RANGES = (7, 30, 90)
+DASHBOARD_REFRESH_SECONDS = int(os.getenv("DASHBOARD_REFRESH_SECONDS", "60"))
+DASHBOARD_SNAPSHOT_ID = "admin_dashboard"
+
+def _facet_count(result, name):
+    values = result.get(name) or []
+    return values[0]["n"] if values else 0
+
+def registrations_dashboard_pipeline(first_day):
+    return [{"$facet": {
+        "total": [{"$count": "n"}],
+        "pending": [{"$match": {"registration_status": "pending"}}, {"$count": "n"}],
+        "daily": [
+            {"$match": {"created_at": {"$gte": first_day}}},
+            {"$group": {
+                "_id": {"$dateToString": {"format": "%Y-%m-%d", "date": "$created_at"}},
+                "count": {"$sum": 1}
+            }},
+        ],
+    }}]
+
+def workshops_dashboard_pipeline(now):
+    return [{"$facet": {
+        "total": [{"$count": "n"}],
+        "upcoming": [{"$match": {"start_date": {"$gt": now}}}, {"$count": "n"}],
+    }}]
+
+# These run in the background on a timer and read whole collections on purpose
+expect_collscan("registrations", "aggregate", {"pipeline": registrations_dashboard_pipeline(datetime.utcnow())})
+expect_collscan("workshops", "aggregate", {"pipeline": workshops_dashboard_pipeline(datetime.utcnow())})
+
+async def compute_dashboard_stats():
+    """
+    Build the dashboard statistics with one aggregation per collection
+    """
+    now = datetime.utcnow()
+    today = now.replace(hour=0, minute=0, second=0, microsecond=0)
+    first_day = today - timedelta(days=max(DASHBOARD_RANGES) - 1)
+
+    registrations_pipeline = registrations_dashboard_pipeline(first_day)
+    workshops_pipeline = workshops_dashboard_pipeline(now)
+
+    registration_stats, workshop_stats, total_users = await asyncio.gather(
+        registrations_collection.aggregate(registrations_pipeline).to_list(1),
+        workshops_collection.aggregate(workshops_pipeline).to_list(1),
+        users_collection.estimated_document_count(),
+    )
+    registration_stats = registration_stats[0] if registration_stats else {}
+    workshop_stats = workshop_stats[0] if workshop_stats else {}
+
+    # Fill in days without registrations
+    counts_by_day = {day["_id"]: day["count"] for day in registration_stats.get("daily", [])}
+    daily_registrations = []
+    for i in range(max(DASHBOARD_RANGES)):
+        date = (first_day + timedelta(days=i)).strftime("%Y-%m-%d")
+        daily_registrations.append({"date": date, "count": counts_by_day.get(date, 0)})
+
+    return {
+        "total_workshops": _facet_count(workshop_stats, "total"),
+        "total_users": total_users,
+        "total_registrations": _facet_count(registration_stats, "total"),
+        "upcoming_workshops": _facet_count(workshop_stats, "upcoming"),
+        "pending_registrations": _facet_count(registration_stats, "pending"),
+        "daily_registrations": daily_registrations,
+        "generated_at": now,
+    }
+
+async def refresh_dashboard_snapshot(force: bool = False):
+    """
+    Recompute the stored snapshot unless another process refreshed it
+    within the refresh interval
+    """
+    if not force:
+        current = await stats_snapshots_collection.find_one(
+            {"_id": DASHBOARD_SNAPSHOT_ID}, {"generated_at": 1}
+        )
+        if current and current["generated_at"] > datetime.utcnow() - timedelta(seconds=DASHBOARD_REFRESH_SECONDS):
+            return
+
+    stats = await compute_dashboard_stats()
+    await stats_snapshots_collection.replace_one(
+        {"_id": DASHBOARD_SNAPSHOT_ID}, stats, upsert=True
+    )
+    return stats
+
+async def get_dashboard_snapshot():
+    """
+    Return the latest dashboard snapshot, computing it on first use
+    """
+    snapshot = await stats_snapshots_collection.find_one({"_id": DASHBOARD_SNAPSHOT_ID})
+    if snapshot is None:
+        snapshot = await refresh_dashboard_snapshot(force=True)
+    snapshot.pop("_id", None)
+    return snapshot
+
+class StatsRefresher:
+    """Periodically refreshes the dashboard snapshot in the background"""
+
+    def __init__(self):
+        self._task = None
+
+    def start(self):
+        if self._task is None:
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+    async def _run(self):
+        while True:
+            try:
+                await refresh_dashboard_snapshot()
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.exception("Dashboard snapshot refresh failed: %s", e)
+            await asyncio.sleep(DASHBOARD_REFRESH_SECONDS)
+
+stats_refresher = StatsRefresher()
@@ -0,0 +1,81 @@
+"""
+Per-request costs of the helpers in app/utils and app/models, measured
+without a database. Each entry is a zero-argument callable; setup runs
+once when benchmarks() is called.
+"""
+import asyncio
+from datetime import datetime, timedelta
+from bson import ObjectId
+
+def user_doc():
+    return {
+        "_id": ObjectId(), "email": "student@example.com", "full_name": "Student Name",
+        "password": "$2b$12$" + "x" * 53, "role": "user", "is_active": True,
+        "created_at": datetime(2025, 1, 1), "grade": 9, "school": "Example High School",
+        "phone": "9000000000", "parent_name": "Parent Name", "parent_phone": "9000000001",
+    }
+
+def workshop_doc():
+    start = datetime(2025, 6, 1, 9, 30)
+    return {
+        "_id": ObjectId(), "title": "Rocketry Lab", "description": "A hands-on session. " * 40,
+        "short_description": "A hands-on session", "image_url": "https://example.com/1.jpg",
+        "start_date": start, "end_date": start + timedelta(hours=3),
+        "registration_deadline": start - timedelta(days=2), "location": "Main hall",
+        "max_participants": 40, "fee": 250.0, "eligible_grades": [8, 9, 10],
+        "featured": True, "status": "upcoming", "created_at": start - timedelta(days=30),
+        "registered_count": 12, "waitlist_count": 0,
+    }
+
+def registration_doc():
+    return {
+        "_id": ObjectId(), "workshop_id": str(ObjectId()), "user_id": str(ObjectId()),
+        "email": "student@example.com", "full_name": "Student Name", "grade": 9,
+        "school": "Example High School", "phone": "9000000000", "parent_name": "Parent Name",
+        "parent_phone": "9000000001", "payment_status": "pending", "registration_status": "approved",
+        "created_at": datetime(2025, 5, 20, 14, 5), "amount_paid": 250.0,
+    }
+
+async def cursor_of(docs):
+    for doc in docs:
+        yield dict(doc)
+
+def benchmarks():
+    from app.models.user import UserInDB
+    from app.models.workshop import Workshop
+    from app.models.registration import Registration
+    from app.utils.auth import (
+        verify_password, get_password_hash, create_access_token, get_current_user,
+        principal_cache, SECRET_KEY, ALGORITHM
+    )
+    from app.utils.db import parse_mongo_doc, serialize_list, convert_object_ids
+    from app.routes.admin import registration_csv_row
+    from jose import jwt
+
+    loop = asyncio.new_event_loop()
+    password_hash = get_password_hash("correct horse")
+    token = create_access_token({"sub": "student@example.com", "role": "user"})
+    user, workshop, registration = user_doc(), workshop_doc(), registration_doc()
+    parsed_user = parse_mongo_doc(dict(user))
+    parsed_workshop = parse_mongo_doc(dict(workshop))
+    parsed_registration = parse_mongo_doc(dict(registration))
+    registrations = [registration_doc() for _ in range(100)]
+    string_ids = {"_id": str(ObjectId()), "workshop_id": str(ObjectId()), "user_id": str(ObjectId()), "email": "a@b.c"}
+
+    # get_current_user with the principal already cached: JWT decode plus a cache hit
+    principal_cache.set(("student@example.com", token), object())
+
+    return {
+        "auth.get_password_hash": lambda: get_password_hash("correct horse"),
+        "auth.verify_password": lambda: verify_password("correct horse", password_hash),
+        "auth.create_access_token": lambda: create_access_token({"sub": "student@example.com", "role": "user"}),
+        "auth.jwt_decode": lambda: jwt.decode(token, SECRET_KEY, algorithms=[ALGORITHM]),
+        "auth.get_current_user_cached": lambda: loop.run_until_complete(get_current_user(token)),
+        "db.parse_mongo_doc": lambda: parse_mongo_doc(dict(workshop)),
+        "db.serialize_list_100": lambda: loop.run_until_complete(serialize_list(cursor_of(registrations))),
+        "db.convert_object_ids": lambda: convert_object_ids(string_ids),
+        "models.UserInDB": lambda: UserInDB(**parsed_user),
+        "models.Workshop": lambda: Workshop(**parsed_workshop),
+        "models.Registration": lambda: Registration(**parsed_registration),
+        "export.registration_csv_row_100": lambda: [registration_csv_row(reg) for reg in registrations],
+    }
@@ -0,0 +1,88 @@
+"""
+Compare serializing a page of workshops through the response model with
+the FAST_JSON path.
+
+Run from backend/: python -m benchmarks.bench_serialization [items] [rounds]
+"""
+import sys
+import json
+import timeit
+from datetime import datetime, timedelta
+from typing import List
+from bson import ObjectId
+from pydantic import TypeAdapter
+
+try:
+    from benchmarks import harness  # puts backend/ on sys.path
+except ImportError:  # run as a script from benchmarks/
+    import harness
+
+from app.models.workshop import Workshop
+from app.utils.fastjson import dumps, with_defaults
+
+# Fields that documents written before they existed don't have
+OPTIONAL_FIELDS = ("featured", "status", "registered_count", "waitlist_count")
+
+def make_workshops(count: int):
+    start = datetime(2025, 6, 1, 9, 30)
+    docs = [
+        {
+            "_id": ObjectId(),
+            "title": f"Workshop {i}",
+            "description": "A hands-on session covering the basics. " * 20,
+            "short_description": "A hands-on session",
+            "image_url": f"https://example.com/images/{i}.jpg",
+            "start_date": start + timedelta(days=i),
+            "end_date": start + timedelta(days=i, hours=3),
+            "registration_deadline": start + timedelta(days=i - 2),
+            "location": "Main hall",
+            "max_participants": 40,
+            "fee": 250.0,
+            "eligible_grades": [8, 9, 10],
+            "featured": i % 10 == 0,
+            "status": "upcoming",
+            "created_at": start - timedelta(days=30),
+            "registered_count": i % 40,
+            "waitlist_count": 0,
+        }
+        for i in range(count)
+    ]
+    for doc in docs[1::10]:
+        for field in OPTIONAL_FIELDS:
+            del doc[field]
+    return docs
+
+adapter = TypeAdapter(List[Workshop])
+
+def model_path(docs):
+    """What a response_model route does: convert ids, validate, dump, encode"""
+    parsed = [dict(doc, _id=str(doc["_id"])) for doc in docs]
+    return json.dumps(adapter.dump_python(adapter.validate_python(parsed), mode="json", by_alias=True)).encode("utf-8")
+
+def fast_path(docs):
+    return dumps(with_defaults(docs, Workshop))
+
+def benchmarks():
+    docs = make_workshops(1000)
+    return {
+        "serialize.response_model_1000": lambda: model_path(docs),
+        "serialize.fast_json_1000": lambda: fast_path(docs),
+    }
+
+def main():
+    items = int(sys.argv[1]) if len(sys.argv) > 1 else 1000
+    rounds = int(sys.argv[2]) if len(sys.argv) > 2 else 50
+    docs = make_workshops(items)
+
+    # Both paths must produce the same document
+    assert json.loads(model_path(docs)) == json.loads(fast_path(docs))
+
+    results = {}
+    for name, fn in (("response_model", model_path), ("fast_json", fast_path)):
+        best = min(timeit.repeat(lambda: fn(docs), number=rounds, repeat=5)) / rounds
+        results[name] = best
+        print(f"{name:>15}: {best * 1000:8.3f} ms per {items} workshops")
+    print(f"{'speedup':>15}: {results['response_model'] / results['fast_json']:8.1f}x")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,123 @@
+"""
+Compare throughput of the production server with one worker and with
+several, on the catalog and login endpoints.
+
+Needs a local mongod; the database given by --database is dropped and
+re-seeded. Run from backend/:
+
+  python -m benchmarks.bench_workers --workers 1,4 --seconds 15
+"""
+import os
+import sys
+import json
+import time
+import random
+import asyncio
+import argparse
+import subprocess
+import httpx
+
+try:
+    from benchmarks import harness  # puts backend/ on sys.path
+except ImportError:  # run as a script from benchmarks/
+    import harness
+
+from loadtest.seed import seed, student_email, PASSWORD
+from loadtest.scenarios import Recorder
+from main import available_cores
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Single vs multi-worker throughput")
+    parser.add_argument("--workers", default=f"1,{available_cores()}", help="comma-separated worker counts")
+    parser.add_argument("--mongodb-uri", default="mongodb://127.0.0.1:27017")
+    parser.add_argument("--database", default="shibir_bench_workers")
+    parser.add_argument("--port", type=int, default=8766)
+    parser.add_argument("--students", type=int, default=200)
+    parser.add_argument("--seconds", type=float, default=15.0, help="duration of each endpoint run")
+    parser.add_argument("--concurrency", type=int, default=64)
+    parser.add_argument("--output", help="write results as JSON")
+    return parser.parse_args(argv)
+
+def start_server(args, workers: int):
+    env = dict(os.environ)
+    env.update(harness.BENCHMARK_ENV)
+    env.update({
+        "MONGODB_URI": args.mongodb_uri,
+        "DATABASE_NAME": args.database,
+        "PORT": str(args.port),
+        "HOST": "127.0.0.1",
+        "WEB_CONCURRENCY": str(workers),
+        "RATE_LIMIT_ENABLED": "false",
+    })
+    return subprocess.Popen([sys.executable, "main.py"], cwd=harness.BACKEND_DIR, env=env)
+
+async def wait_until_ready(client, timeout: float = 60.0):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        try:
+            if (await client.get("/readyz")).status_code == 200:
+                return
+        except httpx.TransportError:
+            pass
+        await asyncio.sleep(0.2)
+    raise RuntimeError("server did not become ready")
+
+async def drive(client, operation, make_request, seconds: float, concurrency: int):
+    recorder = Recorder()
+    deadline = time.monotonic() + seconds
+
+    async def loop(rng):
+        while time.monotonic() < deadline:
+            await recorder.call(operation, make_request(rng))
+
+    await asyncio.gather(*[loop(random.Random(i)) for i in range(concurrency)])
+    recorder.finish()
+    return recorder.summary()["operations"][operation]
+
+async def measure(args, workers: int):
+    server = start_server(args, workers)
+    limits = httpx.Limits(max_connections=args.concurrency)
+    try:
+        async with httpx.AsyncClient(base_url=f"http://127.0.0.1:{args.port}", timeout=60.0, limits=limits) as client:
+            await wait_until_ready(client)
+            catalog = await drive(
+                client, "catalog",
+                lambda rng: client.get("/api/workshops", params={"view": "summary", "limit": 20}),
+                args.seconds, args.concurrency
+            )
+            login = await drive(
+                client, "login",
+                lambda rng: client.post("/api/auth/login", json={
+                    "email": student_email(rng.randrange(args.students)), "password": PASSWORD
+                }),
+                args.seconds, args.concurrency
+            )
+        return {"catalog": catalog, "login": login}
+    finally:
+        server.terminate()
+        server.wait(timeout=60)
+
+def main(argv=None):
+    args = parse_args(argv)
+    counts = [int(n) for n in args.workers.split(",")]
+    seed(args.mongodb_uri, args.database, args.students, 40, 60)
+
+    results = {}
+    for workers in counts:
+        print(f"Measuring {workers} worker(s)...", flush=True)
+        results[workers] = asyncio.run(measure(args, workers))
+
+    base = results[counts[0]]
+    print(f"\n{'workers':>8}{'endpoint':>10}{'req/s':>10}{'p50 ms':>10}{'p95 ms':>10}{'errors':>8}{'speedup':>9}")
+    for workers, endpoints in results.items():
+        for endpoint, stats in endpoints.items():
+            speedup = stats["throughput_rps"] / base[endpoint]["throughput_rps"] if base[endpoint]["throughput_rps"] else 0
+            print(f"{workers:>8}{endpoint:>10}{stats['throughput_rps']:>10}{stats['p50_ms']:>10}"
+                  f"{stats['p95_ms']:>10}{stats['errors']:>8}{speedup:>8.2f}x")
+
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump({"machine": harness.machine(), "config": vars(args), "results": results}, f, indent=2)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,75 @@
+import os
+import sys
+import json
+import platform
+import timeit
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if BACKEND_DIR not in sys.path:
+    sys.path.insert(0, BACKEND_DIR)
+
+# Settings the app reads at import time. The Motor client connects
+# lazily, so nothing here needs a running database.
+BENCHMARK_ENV = {
+    "MONGODB_URI": "mongodb://127.0.0.1:27017",
+    "DATABASE_NAME": "shibir_benchmarks",
+    "JWT_SECRET": "benchmark-secret",
+    "JWT_ALGORITHM": "HS256",
+    "JWT_EXPIRES_MINUTES": "60",
+    "SMTP_SERVER": "127.0.0.1",
+    "SMTP_PORT": "2525",
+    "EMAIL_FROM": "noreply@example.com",
+    "METRICS_ENABLED": "false",
+}
+
+# Best of this many timing runs; more runs make the minimum steadier
+DEFAULT_REPEAT = 9
+# Benchmarks faster than this are dominated by timer and scheduling noise
+NOISE_FLOOR_SECONDS = 10e-6
+
+def configure_env():
+    for key, value in BENCHMARK_ENV.items():
+        os.environ.setdefault(key, value)
+
+def measure(fn, repeat: int = DEFAULT_REPEAT) -> float:
+    """Best time per call in seconds, over `repeat` runs of at least 0.2s each"""
+    timer = timeit.Timer(fn)
+    number, _ = timer.autorange()
+    return min(timer.repeat(repeat=repeat, number=number)) / number
+
+def machine():
+    return {
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "processor": platform.processor() or platform.machine(),
+    }
+
+def load_baseline(path: str):
+    if not os.path.exists(path):
+        return None
+    with open(path) as f:
+        return json.load(f)
+
+def save_baseline(path: str, results):
+    with open(path, "w") as f:
+        json.dump({"machine": machine(), "results": results}, f, indent=2, sort_keys=True)
+        f.write("\n")
+
+def compare(results, baseline, threshold: float, noise_floor: float = 0.0, noisy_threshold: float = None):
+    """
+    Return (name, before, after, ratio) for every benchmark slower than
+    threshold x baseline. Benchmarks whose baseline is under noise_floor
+    are held to noisy_threshold instead.
+    """
+    regressions = []
+    before_results = (baseline or {}).get("results", {})
+    for name, after in results.items():
+        before = before_results.get(name)
+        if not before:
+            continue
+        limit = threshold
+        if before < noise_floor and noisy_threshold is not None:
+            limit = max(threshold, noisy_threshold)
+        if after / before > limit:
+            regressions.append((name, before, after, after / before))
+    return regressions
@@ -0,0 +1,83 @@
+"""
+Run the micro-benchmarks and compare them with the committed baseline.
+
+  python -m benchmarks.run                 # compare with baseline.json
+  python -m benchmarks.run -k auth         # only benchmarks matching "auth"
+  python -m benchmarks.run --save          # record a new baseline
+
+(python benchmarks/run.py works too.) Exits non-zero when a benchmark
+is slower than --threshold times its baseline. Benchmarks whose
+baseline is under --noise-floor take only a few microseconds, where
+timer and CPU frequency noise alone can exceed 1.5x, so they are held
+to the looser --noisy-threshold instead. Baselines are
+machine-specific; re-record one on the machine you compare on before
+reading much into small differences.
+"""
+import os
+import sys
+import argparse
+
+try:
+    from benchmarks import harness
+except ImportError:  # run as a script from benchmarks/
+    import harness
+
+harness.configure_env()
+
+from benchmarks import bench_helpers, bench_serialization
+
+SUITES = [bench_helpers, bench_serialization]
+DEFAULT_BASELINE = os.path.join(os.path.dirname(os.path.abspath(__file__)), "baseline.json")
+
+def format_time(seconds: float) -> str:
+    if seconds >= 1e-3:
+        return f"{seconds * 1e3:9.3f} ms"
+    return f"{seconds * 1e6:9.2f} us"
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Backend micro-benchmarks")
+    parser.add_argument("-k", dest="keyword", help="only run benchmarks whose name contains this")
+    parser.add_argument("--baseline", default=DEFAULT_BASELINE)
+    parser.add_argument("--save", action="store_true", help="write the results as the new baseline")
+    parser.add_argument("--threshold", type=float, default=1.5, help="slowdown ratio counted as a regression")
+    parser.add_argument("--noise-floor", type=float, default=harness.NOISE_FLOOR_SECONDS,
+                        help="baseline time in seconds below which --noisy-threshold applies")
+    parser.add_argument("--noisy-threshold", type=float, default=3.0,
+                        help="slowdown ratio counted as a regression for benchmarks under the noise floor")
+    parser.add_argument("--repeat", type=int, default=harness.DEFAULT_REPEAT)
+    args = parser.parse_args(argv)
+
+    baseline = harness.load_baseline(args.baseline)
+    before = (baseline or {}).get("results", {})
+
+    results = {}
+    for suite in SUITES:
+        for name, fn in suite.benchmarks().items():
+            if args.keyword and args.keyword not in name:
+                continue
+            results[name] = harness.measure(fn, args.repeat)
+            line = f"{name:<36}{format_time(results[name])}"
+            if name in before:
+                line += f"   {results[name] / before[name]:5.2f}x baseline"
+                if before[name] < args.noise_floor:
+                    line += f" (noisy, gated at {args.noisy_threshold}x)"
+            print(line, flush=True)
+
+    if args.save:
+        if args.keyword:
+            # Keep the benchmarks that were not re-run
+            results = {**before, **results}
+        harness.save_baseline(args.baseline, results)
+        print(f"Saved baseline to {args.baseline}")
+        return 0
+
+    regressions = harness.compare(
+        results, baseline, args.threshold,
+        noise_floor=args.noise_floor, noisy_threshold=args.noisy_threshold
+    )
+    for name, old, new, ratio in regressions:
+        print(f"REGRESSION {name}: {format_time(old).strip()} -> {format_time(new).strip()} ({ratio:.2f}x)")
+    return 1 if regressions else 0
+
+if __name__ == "__main__":
+    sys.exit(main())
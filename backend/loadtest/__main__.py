@@ -0,0 +1,242 @@
+"""
+Load test for a registration-opening surge.
+
+Seeds a throwaway database, starts an SMTP sink and the API (unless
+--base-url points at one already running), then runs:
+
+  browse   catalog browsing on its own, as a baseline
+  surge    browsing and dashboard polling continue while every student
+           logs in at once and then registers for the same small workshop
+
+It reports p50/p95/p99 latency and throughput per operation, and checks
+that the workshop was not oversold, the rest were waitlisted, nobody
+holds two registrations and a confirmation email went out for each one.
+
+Run from backend/ with a local mongod:
+
+  pip install -r requirements-dev.txt
+  python -m loadtest --students 500 --capacity 100 --output run.json
+  python -m loadtest --students 500 --capacity 100 --compare run.json
+"""
+import argparse
+import asyncio
+import json
+import os
+import random
+import subprocess
+import sys
+import time
+import httpx
+from bson import ObjectId
+from pymongo import MongoClient
+
+from loadtest.seed import ADMIN_EMAIL, seed
+from loadtest.smtp_sink import SMTPSink
+from loadtest.scenarios import (
+    Recorder, browse, poll_dashboard, login, login_storm, registration_burst
+)
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(prog="python -m loadtest", description="Registration surge load test")
+    parser.add_argument("--mongodb-uri", default="mongodb://127.0.0.1:27017")
+    parser.add_argument("--database", default="shibir_loadtest", help="dropped and re-seeded on every run")
+    parser.add_argument("--base-url", help="test an API that is already running instead of starting one")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--workers", type=int, default=1, help="uvicorn workers for the started API")
+    parser.add_argument("--smtp-port", type=int, default=2525)
+    parser.add_argument("--students", type=int, default=500)
+    parser.add_argument("--capacity", type=int, default=100, help="seats in the contested workshop")
+    parser.add_argument("--catalog", type=int, default=60, help="other workshops in the catalog")
+    parser.add_argument("--browsers", type=int, default=20, help="concurrent catalog visitors")
+    parser.add_argument("--think-seconds", type=float, default=0.05, help="mean pause between a visitor's requests")
+    parser.add_argument("--dashboards", type=int, default=2, help="admins polling the dashboard")
+    parser.add_argument("--dashboard-interval", type=float, default=2.0)
+    parser.add_argument("--concurrency", type=int, default=200, help="max concurrent logins/registrations")
+    parser.add_argument("--repeats", type=int, default=2, help="registration submits per student")
+    parser.add_argument("--browse-seconds", type=float, default=10.0)
+    parser.add_argument("--email-timeout", type=float, default=60.0)
+    parser.add_argument("--rate-limits", action="store_true", help="keep the API's rate limits on")
+    parser.add_argument("--random-seed", type=int, default=1)
+    parser.add_argument("--output", help="write the report as JSON")
+    parser.add_argument("--compare", help="earlier JSON report to compare against")
+    return parser.parse_args(argv)
+
+def start_api(args):
+    """Start the API with uvicorn against the load-test database and SMTP sink"""
+    env = dict(os.environ)
+    env.update({
+        "MONGODB_URI": args.mongodb_uri,
+        "DATABASE_NAME": args.database,
+        "SMTP_SERVER": "127.0.0.1",
+        "SMTP_PORT": str(args.smtp_port),
+        "SMTP_STARTTLS": "false",
+        "SMTP_USERNAME": "",
+        "SMTP_PASSWORD": "",
+        "EMAIL_FROM": "noreply@loadtest.example.com",
+        "EMAIL_POLL_INTERVAL_SECONDS": "0.5",
+    })
+    env.setdefault("JWT_SECRET", "loadtest-secret")
+    env.setdefault("JWT_ALGORITHM", "HS256")
+    env.setdefault("JWT_EXPIRES_MINUTES", "60")
+    if not args.rate_limits:
+        # Every simulated client shares one IP
+        env["RATE_LIMIT_ENABLED"] = "false"
+    return subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", "main:app", "--host", "127.0.0.1", "--port", str(args.port),
+         "--workers", str(args.workers), "--log-level", "warning"],
+        env=env,
+    )
+
+async def wait_until_up(client, timeout: float = 30.0):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        try:
+            if (await client.get("/readyz")).status_code == 200:
+                return
+        except httpx.TransportError:
+            pass
+        await asyncio.sleep(0.2)
+    raise RuntimeError("API did not come up")
+
+async def run_background(client, recorder, args, workshop_ids, admin_token, stop, rng):
+    tasks = [
+        asyncio.create_task(browse(client, recorder, workshop_ids, stop, random.Random(rng.random()), args.think_seconds))
+        for _ in range(args.browsers)
+    ]
+    if admin_token:
+        tasks += [
+            asyncio.create_task(poll_dashboard(client, recorder, admin_token, stop, args.dashboard_interval))
+            for _ in range(args.dashboards)
+        ]
+    return tasks
+
+def check_consistency(args, hot_id: str, registered: int):
+    """Compare what the database holds with what the API reported"""
+    client = MongoClient(args.mongodb_uri)
+    db = client[args.database]
+    workshop = db.workshops.find_one({"_id": ObjectId(hot_id)})
+    seated = db.registrations.count_documents(
+        {"workshop_id": hot_id, "registration_status": {"$in": ["pending", "approved"]}}
+    )
+    waitlisted = db.registrations.count_documents({"workshop_id": hot_id, "registration_status": "waitlisted"})
+    duplicates = list(db.registrations.aggregate([
+        {"$match": {"workshop_id": hot_id}},
+        {"$group": {"_id": "$email", "count": {"$sum": 1}}},
+        {"$match": {"count": {"$gt": 1}}},
+    ]))
+    client.close()
+
+    expected = min(args.students, args.capacity)
+    checks = {
+        "not_oversold": seated <= workshop["max_participants"],
+        "seat_count_matches": workshop["registered_count"] == seated,
+        "waitlist_count_matches": workshop.get("waitlist_count", 0) == waitlisted,
+        "no_duplicates": not duplicates,
+        "responses_match_database": registered == seated + waitlisted,
+        "workshop_filled": seated == expected,
+    }
+    details = {
+        "capacity": workshop["max_participants"],
+        "registered_count": workshop["registered_count"],
+        "waitlist_count": workshop.get("waitlist_count", 0),
+        "seated": seated,
+        "waitlisted": waitlisted,
+        "successful_responses": registered,
+        "duplicate_emails": len(duplicates),
+    }
+    return checks, details
+
+async def wait_for_emails(sink: SMTPSink, expected: int, timeout: float):
+    deadline = time.monotonic() + timeout
+    while sink.messages < expected and time.monotonic() < deadline:
+        await asyncio.sleep(0.5)
+    return sink.messages
+
+async def run(args):
+    rng = random.Random(args.random_seed)
+    print(f"Seeding {args.database}: {args.students} students, {args.capacity} seats, {args.catalog} other workshops")
+    hot_id = seed(args.mongodb_uri, args.database, args.students, args.capacity, args.catalog)
+
+    sink = SMTPSink(port=args.smtp_port)
+    await sink.start()
+    server = None if args.base_url else start_api(args)
+    base_url = args.base_url or f"http://127.0.0.1:{args.port}"
+
+    limits = httpx.Limits(max_connections=args.concurrency + args.browsers + args.dashboards)
+    report = {"config": vars(args), "phases": {}}
+    try:
+        async with httpx.AsyncClient(base_url=base_url, timeout=60.0, limits=limits) as client:
+            await wait_until_up(client)
+            catalog = (await client.get("/api/workshops", params={"limit": 1000, "view": "summary"})).json()
+            workshop_ids = [w["_id"] for w in catalog]
+            admin_token = await login(client, Recorder(), ADMIN_EMAIL)
+
+            print(f"Phase browse: {args.browsers} visitors for {args.browse_seconds:g}s")
+            recorder = Recorder()
+            stop = asyncio.Event()
+            tasks = await run_background(client, recorder, args, workshop_ids, None, stop, rng)
+            await asyncio.sleep(args.browse_seconds)
+            stop.set()
+            await asyncio.gather(*tasks)
+            recorder.finish()
+            report["phases"]["browse"] = recorder.summary()
+
+            print(f"Phase surge: {args.students} logins, then {args.students * args.repeats} registration submits")
+            recorder = Recorder()
+            stop = asyncio.Event()
+            tasks = await run_background(client, recorder, args, workshop_ids, admin_token, stop, rng)
+            tokens = await login_storm(client, recorder, args.students, args.concurrency)
+            registered = await registration_burst(client, recorder, tokens, hot_id, args.concurrency, args.repeats)
+            stop.set()
+            await asyncio.gather(*tasks)
+            recorder.finish()
+            report["phases"]["surge"] = recorder.summary()
+
+        checks, details = check_consistency(args, hot_id, registered)
+        emails = await wait_for_emails(sink, registered, args.email_timeout)
+        checks["confirmation_emails_sent"] = emails >= registered
+        details["emails_received"] = emails
+        report["checks"] = checks
+        report["check_details"] = details
+        report["passed"] = all(checks.values())
+    finally:
+        if server is not None:
+            server.terminate()
+            server.wait(timeout=30)
+        await sink.stop()
+    return report
+
+def print_report(report, baseline=None):
+    for phase, summary in report["phases"].items():
+        print(f"\n{phase} ({summary['elapsed_seconds']}s)")
+        print(f"  {'operation':<18}{'count':>7}{'errors':>8}{'p50 ms':>10}{'p95 ms':>10}{'p99 ms':>10}{'req/s':>9}")
+        for operation, stats in summary["operations"].items():
+            line = (f"  {operation:<18}{stats['count']:>7}{stats['errors']:>8}{stats['p50_ms']:>10}"
+                    f"{stats['p95_ms']:>10}{stats['p99_ms']:>10}{stats['throughput_rps']:>9}")
+            before = (baseline or {}).get("phases", {}).get(phase, {}).get("operations", {}).get(operation)
+            if before and before["p95_ms"]:
+                change = (stats["p95_ms"] - before["p95_ms"]) / before["p95_ms"] * 100
+                line += f"   p95 {change:+.1f}% vs baseline"
+            print(line)
+
+    print("\nchecks")
+    for name, ok in report["checks"].items():
+        print(f"  {'PASS' if ok else 'FAIL'}  {name}")
+    print(f"  {report['check_details']}")
+
+def main(argv=None):
+    args = parse_args(argv)
+    baseline = None
+    if args.compare:
+        with open(args.compare) as f:
+            baseline = json.load(f)
+
+    report = asyncio.run(run(args))
+    print_report(report, baseline)
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(report, f, indent=2)
+    return 0 if report["passed"] else 1
+
+if __name__ == "__main__":
+    sys.exit(main())
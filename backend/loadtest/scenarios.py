@@ -0,0 +1,160 @@
+import asyncio
+import random
+import time
+from collections import defaultdict
+
+from loadtest.seed import PASSWORD, student_email
+
+def percentile(sorted_values, fraction: float) -> float:
+    if not sorted_values:
+        return 0.0
+    index = min(len(sorted_values) - 1, max(0, int(round(fraction * len(sorted_values))) - 1))
+    return sorted_values[index]
+
+class Recorder:
+    """Latencies and status codes per operation for one phase of a run"""
+
+    def __init__(self):
+        self.latencies = defaultdict(list)
+        self.statuses = defaultdict(lambda: defaultdict(int))
+        self.started = time.perf_counter()
+        self.finished = None
+
+    async def call(self, operation: str, request):
+        """Await an httpx request, recording its latency and status"""
+        start = time.perf_counter()
+        try:
+            response = await request
+            status = str(response.status_code)
+        except Exception as e:
+            response = None
+            status = e.__class__.__name__
+        self.record(operation, time.perf_counter() - start, status)
+        return response
+
+    def record(self, operation: str, seconds: float, status: str):
+        self.latencies[operation].append(seconds)
+        self.statuses[operation][status] += 1
+
+    def finish(self):
+        self.finished = time.perf_counter()
+
+    def summary(self):
+        elapsed = (self.finished or time.perf_counter()) - self.started
+        report = {}
+        for operation, values in sorted(self.latencies.items()):
+            values = sorted(values)
+            statuses = dict(self.statuses[operation])
+            errors = sum(count for status, count in statuses.items() if not status.startswith(("2", "3")))
+            report[operation] = {
+                "count": len(values),
+                "errors": errors,
+                "statuses": statuses,
+                "p50_ms": round(percentile(values, 0.50) * 1000, 2),
+                "p95_ms": round(percentile(values, 0.95) * 1000, 2),
+                "p99_ms": round(percentile(values, 0.99) * 1000, 2),
+                "max_ms": round(values[-1] * 1000, 2),
+                "throughput_rps": round(len(values) / elapsed, 2) if elapsed else 0.0,
+            }
+        return {"elapsed_seconds": round(elapsed, 2), "operations": report}
+
+def auth_header(token: str):
+    return {"Authorization": f"Bearer {token}"}
+
+async def browse(client, recorder: Recorder, workshop_ids, stop: asyncio.Event, rng: random.Random,
+                 think_seconds: float = 0.05):
+    """A visitor paging through the catalog, opening workshops and searching"""
+    while not stop.is_set():
+        await asyncio.sleep(rng.uniform(0, 2 * think_seconds))
+        choice = rng.random()
+        if choice < 0.4:
+            await recorder.call("catalog_list", client.get(
+                "/api/workshops", params={"view": "summary", "limit": 20, "skip": rng.choice([0, 20, 40])}
+            ))
+        elif choice < 0.55:
+            await recorder.call("catalog_featured", client.get(
+                "/api/workshops", params={"view": "summary", "featured": "true", "limit": 6}
+            ))
+        elif choice < 0.9:
+            await recorder.call("workshop_detail", client.get(f"/api/workshops/{rng.choice(workshop_ids)}"))
+        else:
+            await recorder.call("catalog_search", client.get(
+                "/api/workshops", params={"view": "summary", "search": rng.choice(["robo", "astro", "chem", "rocket"])}
+            ))
+
+async def poll_dashboard(client, recorder: Recorder, admin_token: str, stop: asyncio.Event, interval: float):
+    """An admin keeping the dashboard open"""
+    while not stop.is_set():
+        await recorder.call("admin_dashboard", client.get(
+            "/api/admin/dashboard", params={"days": 30}, headers=auth_header(admin_token)
+        ))
+        try:
+            await asyncio.wait_for(stop.wait(), interval)
+        except asyncio.TimeoutError:
+            pass
+
+async def login(client, recorder: Recorder, email: str):
+    response = await recorder.call("login", client.post(
+        "/api/auth/login", json={"email": email, "password": PASSWORD}
+    ))
+    if response is not None and response.status_code == 200:
+        return response.json()["access_token"]
+    return None
+
+async def login_storm(client, recorder: Recorder, students: int, concurrency: int):
+    """Every student logs in at once; returns (student index, token) for the ones that got in"""
+    semaphore = asyncio.Semaphore(concurrency)
+
+    async def one(i):
+        async with semaphore:
+            return i, await login(client, recorder, student_email(i))
+
+    results = await asyncio.gather(*[one(i) for i in range(students)])
+    return [(i, token) for i, token in results if token]
+
+def registration_body(i: int, workshop_id: str):
+    return {
+        "workshop_id": workshop_id,
+        "email": student_email(i),
+        "full_name": f"Student {i}",
+        "grade": 8 + i % 3,
+        "school": "Load Test School",
+        "phone": "9000000000",
+        "parent_name": f"Parent {i}",
+        "parent_phone": "9000000001",
+    }
+
+async def registration_burst(client, recorder: Recorder, tokens, workshop_id: str, concurrency: int, repeats: int):
+    """
+    Every logged-in student registers for the same workshop at the same
+    moment, each submitting `repeats` times to mimic double clicks.
+    Students sent to the waiting room retry with their queue token after
+    Retry-After, like the frontend does. "register" records each
+    submission end to end, "register_attempt" every request it took.
+    Returns the number of successful registrations.
+    """
+    semaphore = asyncio.Semaphore(concurrency)
+    start = asyncio.Event()
+
+    async def one(i, token):
+        await start.wait()
+        began = time.perf_counter()
+        headers = auth_header(token)
+        while True:
+            async with semaphore:
+                response = await recorder.call("register_attempt", client.post(
+                    "/api/registrations", json=registration_body(i, workshop_id), headers=headers
+                ))
+            queue_token = response is not None and response.status_code == 429 and response.json().get("queue_token")
+            if not queue_token:
+                break
+            headers = {**auth_header(token), "X-Queue-Token": queue_token}
+            await asyncio.sleep(float(response.headers.get("retry-after", "1")))
+        status = str(response.status_code) if response is not None else "error"
+        recorder.record("register", time.perf_counter() - began, status)
+        return response is not None and response.status_code == 200
+
+    tasks = [asyncio.create_task(one(i, token)) for i, token in tokens for _ in range(repeats)]
+    await asyncio.sleep(0)
+    start.set()
+    return sum(await asyncio.gather(*tasks))
@@ -0,0 +1,70 @@
+from datetime import datetime, timedelta
+from passlib.context import CryptContext
+from pymongo import MongoClient
+
+PASSWORD = "loadtest-password"
+ADMIN_EMAIL = "admin@loadtest.example.com"
+
+def student_email(i: int) -> str:
+    return f"student{i:05d}@loadtest.example.com"
+
+def seed(mongodb_uri: str, database_name: str, students: int, hot_capacity: int, catalog_size: int):
+    """
+    Reset the load-test database: one admin, `students` students sharing a
+    password, one "hot" workshop with hot_capacity seats and catalog_size
+    other workshops. Returns the hot workshop's id.
+    """
+    client = MongoClient(mongodb_uri)
+    if database_name in ("", None):
+        raise ValueError("A database name is required")
+    client.drop_database(database_name)
+    db = client[database_name]
+
+    # Every account shares one hash so seeding doesn't spend minutes in bcrypt
+    password_hash = CryptContext(schemes=["bcrypt"]).hash(PASSWORD)
+    now = datetime.utcnow()
+
+    db.users.insert_one({
+        "email": ADMIN_EMAIL, "full_name": "Load Test Admin", "password": password_hash,
+        "role": "admin", "is_active": True, "created_at": now,
+    })
+    db.users.insert_many([
+        {
+            "email": student_email(i), "full_name": f"Student {i}", "password": password_hash,
+            "role": "user", "is_active": True, "created_at": now,
+            "grade": 8 + i % 3, "school": "Load Test School", "phone": "9000000000",
+            "parent_name": f"Parent {i}", "parent_phone": "9000000001",
+        }
+        for i in range(students)
+    ])
+
+    def workshop(title: str, capacity: int, days_ahead: int, featured: bool = False):
+        start = now + timedelta(days=days_ahead)
+        return {
+            "title": title,
+            "description": f"{title}: a hands-on science session. " * 10,
+            "short_description": f"{title} for grades 8 to 10",
+            "image_url": "https://example.com/workshop.jpg",
+            "start_date": start,
+            "end_date": start + timedelta(hours=3),
+            "registration_deadline": start - timedelta(days=1),
+            "location": "Main hall",
+            "max_participants": capacity,
+            "fee": 250.0,
+            "eligible_grades": [8, 9, 10],
+            "featured": featured,
+            "status": "upcoming",
+            "created_at": now,
+            "registered_count": 0,
+        }
+
+    hot = db.workshops.insert_one(workshop("Rocketry Lab", hot_capacity, 14, featured=True))
+    if catalog_size:
+        topics = ["Astronomy", "Robotics", "Chemistry", "Botany", "Electronics", "Geology"]
+        db.workshops.insert_many([
+            workshop(f"{topics[i % len(topics)]} Workshop {i}", 40, 7 + i, featured=i % 5 == 0)
+            for i in range(catalog_size)
+        ])
+
+    client.close()
+    return str(hot.inserted_id)
@@ -0,0 +1,78 @@
+import asyncio
+
+class SMTPSink:
+    """
+    A minimal SMTP server that accepts and counts every message, for
+    pointing the API's outbox at during load tests. Plain SMTP only; run
+    the API with SMTP_STARTTLS=false. Set refuse to reject every
+    recipient, as a server with a full mailbox would.
+    """
+
+    def __init__(self, host: str = "127.0.0.1", port: int = 2525):
+        self.host = host
+        self.port = port
+        self.messages = 0
+        self.recipients = []
+        self.refuse = False
+        self._server = None
+
+    async def start(self):
+        self._server = await asyncio.start_server(self._handle, self.host, self.port)
+        # Port 0 picks a free one
+        self.port = self._server.sockets[0].getsockname()[1]
+
+    async def stop(self):
+        if self._server is not None:
+            self._server.close()
+            await self._server.wait_closed()
+            self._server = None
+
+    async def _handle(self, reader, writer):
+        async def reply(line: str):
+            writer.write(line.encode("ascii") + b"\r\n")
+            await writer.drain()
+
+        recipients = []
+        try:
+            await reply("220 loadtest sink ready")
+            while True:
+                line = await reader.readline()
+                if not line:
+                    break
+                command = line.decode("latin-1").strip()
+                verb = command.split(" ", 1)[0].upper()
+
+                if verb == "EHLO":
+                    await reply("250-loadtest")
+                    await reply("250 AUTH PLAIN LOGIN")
+                elif verb == "AUTH":
+                    await reply("235 Authentication successful")
+                elif verb == "MAIL":
+                    recipients = []
+                    await reply("250 OK")
+                elif verb == "RCPT":
+                    if self.refuse:
+                        await reply("550 Mailbox unavailable")
+                        continue
+                    recipients.append(command.split(":", 1)[-1].strip(" <>"))
+                    await reply("250 OK")
+                elif verb == "DATA":
+                    await reply("354 End data with <CR><LF>.<CR><LF>")
+                    while True:
+                        data = await reader.readline()
+                        if not data or data in (b".\r\n", b".\n"):
+                            break
+                    self.messages += 1
+                    self.recipients.extend(recipients)
+                    await reply("250 OK")
+                elif verb == "QUIT":
+                    await reply("221 Bye")
+                    break
+                elif verb in ("HELO", "RSET", "NOOP"):
+                    await reply("250 OK")
+                else:
+                    await reply("502 Command not implemented")
+        except ConnectionError:
+            pass
+        finally:
+            writer.close()
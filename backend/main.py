@@ -1,15 +1,121 @@
+import os
+import asyncio
+import logging
+from contextlib import asynccontextmanager
 import uvicorn
 from fastapi import FastAPI
+from fastapi.responses import PlainTextResponse, JSONResponse
 from fastapi.middleware.cors import CORSMiddleware
+from dotenv import load_dotenv
 from app.routes import workshops, users, registrations, admin, auth
-from app.utils.db import init_db
+from app.utils.db import connect_db, close_db, init_db, ping_db
+from app.utils.email import outbox_worker
+from app.utils.hashing import password_hasher
+from app.utils.stats import stats_refresher
+from app.utils.search import backfill_search_prefixes
+from app.utils.seats import backfill_waitlist_count
+from app.utils.otp_store import otp_store
+from app.utils.events import seat_broadcaster
+from app.utils.ratelimit import RateLimitMiddleware
+from app.utils.idempotency import IdempotencyMiddleware
+from app.utils.admission import AdmissionMiddleware
+from app.utils.metrics import MetricsMiddleware, render_metrics, CONTENT_TYPE
+
+load_dotenv()
+
+logger = logging.getLogger(__name__)
+
+READINESS_TIMEOUT_SECONDS = float(os.getenv("READINESS_TIMEOUT_SECONDS", "2"))
+DB_SETUP_RETRY_SECONDS = float(os.getenv("DB_SETUP_RETRY_SECONDS", "5"))
+
+def available_cores():
+    try:
+        return len(os.sched_getaffinity(0))
+    except AttributeError:
+        return os.cpu_count() or 1
+
+# Server settings for `python main.py`
+HOST = os.getenv("HOST", "0.0.0.0")
+PORT = int(os.getenv("PORT", "8000"))
+RELOAD = os.getenv("RELOAD", "false").lower() == "true"
+WEB_CONCURRENCY = int(os.getenv("WEB_CONCURRENCY", "0")) or available_cores()
+SERVER_LOOP = os.getenv("SERVER_LOOP", "auto")  # auto picks uvloop when installed
+SERVER_HTTP = os.getenv("SERVER_HTTP", "auto")  # auto picks httptools when installed
+# Longer than a typical load balancer's 60s idle timeout, so the proxy closes idle connections first
+KEEP_ALIVE_SECONDS = int(os.getenv("KEEP_ALIVE_SECONDS", "75"))
+BACKLOG = int(os.getenv("BACKLOG", "2048"))
+GRACEFUL_SHUTDOWN_SECONDS = int(os.getenv("GRACEFUL_SHUTDOWN_SECONDS", "30"))
+LIMIT_CONCURRENCY = int(os.getenv("LIMIT_CONCURRENCY", "0")) or None
+FORWARDED_ALLOW_IPS = os.getenv("FORWARDED_ALLOW_IPS", "127.0.0.1")
+ACCESS_LOG = os.getenv("ACCESS_LOG", "false").lower() == "true"
+
+async def prepare_database(app: FastAPI):
+    """
+    Apply the index plan and one-off backfills, retrying until MongoDB is
+    reachable. /readyz reports not ready until this has finished.
+    """
+    while True:
+        try:
+            if await init_db():
+                await backfill_search_prefixes()
+                await backfill_waitlist_count()
+            app.state.db_ready = True
+            return
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            logger.warning("Database setup failed, retrying in %ss: %s", DB_SETUP_RETRY_SECONDS, e)
+            await asyncio.sleep(DB_SETUP_RETRY_SECONDS)
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    connect_db()
+    app.state.db_ready = False
+    setup_task = asyncio.create_task(prepare_database(app))
+    outbox_worker.start()
+    stats_refresher.start()
+    otp_store.start()
+    seat_broadcaster.start()
+    try:
+        yield
+    finally:
+        setup_task.cancel()
+        try:
+            await setup_task
+        except asyncio.CancelledError:
+            pass
+        await outbox_worker.stop()
+        await stats_refresher.stop()
+        await otp_store.stop()
+        await seat_broadcaster.stop()
+        password_hasher.shutdown()
+        close_db()
 
 app = FastAPI(
     title="Science Workshop Registration Portal",
     description="API for Jnana Prabodhini's Vijnana Dals program",
     version="1.0.0",
+    lifespan=lifespan,
 )
 
+# Load shedding for the expensive routes; added before CORS so that
+# CORS headers are still set on 429/503 responses
+app.add_middleware(RateLimitMiddleware)
+
+# Replays retried writes that carry an Idempotency-Key; outside the rate
+# limiter so a replay doesn't use up the caller's allowance
+app.add_middleware(IdempotencyMiddleware)
+
+# Queues registrations for a workshop beyond its concurrency budget.
+# Outermost of the three, so queued retries are answered before any
+# idempotency-key reads or writes, and clients waiting in line don't
+# hold the rate limiter's in-flight slots
+app.add_middleware(AdmissionMiddleware)
+
+# Request latency and in-flight counts; outside the rate limiter so shed
+# requests are counted too
+app.add_middleware(MetricsMiddleware)
+
 # CORS configuration
 app.add_middleware(
     CORSMiddleware,
@@ -17,6 +123,7 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=["X-Next-Cursor", "X-Total-Count", "Idempotent-Replayed"],
 )
 
 # Include all route modules
@@ -26,13 +133,94 @@ app.include_router(workshops.router, tags=["Workshops"], prefix="/api")
 app.include_router(registrations.router, tags=["Registrations"], prefix="/api")
 app.include_router(admin.router, tags=["Admin"], prefix="/api/admin")
 
-@app.on_event("startup")
-async def startup_event():
-    await init_db()
-
 @app.get("/")
 def read_root():
     return {"message": "Welcome to Science Workshop Registration Portal API"}
 
+@app.get("/healthz", include_in_schema=False)
+def healthz():
+    """Liveness: the process is up and serving requests"""
+    return {"status": "ok"}
+
+@app.get("/readyz", include_in_schema=False)
+async def readyz():
+    """Readiness: database setup has finished and MongoDB answers a ping"""
+    if not getattr(app.state, "db_ready", False):
+        return JSONResponse({"status": "starting"}, status_code=503)
+    if not await ping_db(READINESS_TIMEOUT_SECONDS):
+        return JSONResponse({"status": "database unreachable"}, status_code=503)
+    return {"status": "ready"}
+
+@app.get("/metrics", include_in_schema=False)
+def metrics():
+    """Counters and latency histograms for this process, for Prometheus to scrape"""
+    return PlainTextResponse(render_metrics(), media_type=CONTENT_TYPE)
+
+def setup_database_once():
+    """
+    Apply the index plan in the supervisor before the workers start, so
+    they don't all race to do it. Returns False if MongoDB wasn't
+    reachable; the workers then retry on their own.
+    """
+    async def run():
+        connect_db()
+        try:
+            if await init_db():
+                await backfill_search_prefixes()
+                await backfill_waitlist_count()
+        finally:
+            close_db()
+
+    try:
+        asyncio.run(run())
+        return True
+    except Exception as e:
+        logger.warning("Database setup before starting workers failed, workers will retry: %s", e)
+        return False
+
+def check_multiprocess_settings(workers: int):
+    """Refuse settings that keep state in a single process when running several"""
+    if workers > 1 and os.getenv("OTP_STORE", "mongo") == "memory":
+        raise SystemExit(
+            "OTP_STORE=memory keeps password reset codes in one process; "
+            "use OTP_STORE=mongo or WEB_CONCURRENCY=1"
+        )
+
+def serve():
+    """
+    Run the API. RELOAD=true runs a single auto-reloading development
+    process; otherwise WEB_CONCURRENCY worker processes (default: one
+    per available core) serve behind one listening socket.
+    """
+    if RELOAD:
+        uvicorn.run("main:app", host=HOST, port=PORT, reload=True)
+        return
+
+    workers = WEB_CONCURRENCY
+    check_multiprocess_settings(workers)
+    # Read by the workers when they import the app
+    os.environ["WEB_CONCURRENCY"] = str(workers)
+    if workers > 1:
+        if setup_database_once():
+            os.environ["SKIP_INDEX_BUILD"] = "true"
+        # Share the cores between the workers' bcrypt pools
+        os.environ.setdefault("HASH_WORKERS", str(max(1, available_cores() // workers)))
+
+    uvicorn.run(
+        "main:app",
+        host=HOST,
+        port=PORT,
+        workers=workers,
+        loop=SERVER_LOOP,
+        http=SERVER_HTTP,
+        backlog=BACKLOG,
+        timeout_keep_alive=KEEP_ALIVE_SECONDS,
+        timeout_graceful_shutdown=GRACEFUL_SHUTDOWN_SECONDS,
+        limit_concurrency=LIMIT_CONCURRENCY,
+        proxy_headers=True,
+        forwarded_allow_ips=FORWARDED_ALLOW_IPS,
+        access_log=ACCESS_LOG,
+    )
+
 if __name__ == "__main__":
-    uvicorn.run("main:app", host="0.0.0.0", port=8000, reload=True)
\ No newline at end of file
+    serve()
\ No newline at end of file
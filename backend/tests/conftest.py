@@ -0,0 +1,124 @@
+import os
+import sys
+from datetime import datetime, timedelta
+
+import httpx
+import pytest
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if BACKEND_DIR not in sys.path:
+    sys.path.insert(0, BACKEND_DIR)
+
+# Settings the app reads at import time. Tests run against mongomock, so
+# nothing here needs a running database or SMTP server.
+TEST_ENV = {
+    "MONGODB_URI": "mongodb://127.0.0.1:27017",
+    "DATABASE_NAME": "shibir_tests",
+    "JWT_SECRET": "test-secret",
+    "JWT_ALGORITHM": "HS256",
+    "JWT_EXPIRES_MINUTES": "60",
+    "SMTP_SERVER": "127.0.0.1",
+    "SMTP_PORT": "2525",
+    "EMAIL_FROM": "noreply@example.com",
+    "RATE_LIMIT_ENABLED": "false",
+}
+for key, value in TEST_ENV.items():
+    os.environ.setdefault(key, value)
+
+@pytest.fixture
+def anyio_backend():
+    return "asyncio"
+
+@pytest.fixture
+def database(monkeypatch):
+    """A fresh in-memory database behind the app's collection proxies"""
+    from mongomock_motor import AsyncMongoMockClient
+    from app.utils import db
+    from app.utils.auth import principal_cache
+    from app.utils.catalog_cache import catalog_cache
+
+    client = AsyncMongoMockClient()
+    monkeypatch.setattr(db, "client", client)
+    monkeypatch.setattr(db, "db", client[TEST_ENV["DATABASE_NAME"]])
+    principal_cache.clear()
+    catalog_cache.clear()
+    return db.db
+
+@pytest.fixture
+async def api(database):
+    """An HTTP client for the app; the lifespan isn't run, so no background workers start"""
+    from main import app
+    async with httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url="http://test") as client:
+        yield client
+
+class SequentialBulkWrites:
+    """
+    A collection whose bulk_write applies each UpdateOne with update_one,
+    since mongomock's bulk_write doesn't accept pymongo's operations. An
+    optional race coroutine runs first, standing in for another writer.
+    """
+
+    def __init__(self, collection, race=None):
+        self.collection = collection
+        self.race = race
+
+    def __getattr__(self, name):
+        return getattr(self.collection, name)
+
+    async def bulk_write(self, operations, ordered=True):
+        from types import SimpleNamespace
+
+        if self.race is not None:
+            await self.race()
+        matched = 0
+        for op in operations:
+            result = await self.collection.update_one(op._filter, op._doc)
+            matched += result.matched_count
+        return SimpleNamespace(matched_count=matched)
+
+async def create_workshop(database, max_participants: int, **fields):
+    start = datetime.utcnow() + timedelta(days=7)
+    workshop = {
+        "title": "Rocketry Lab",
+        "description": "A hands-on session",
+        "short_description": "Hands-on",
+        "start_date": start,
+        "end_date": start + timedelta(hours=3),
+        "registration_deadline": start - timedelta(days=1),
+        "location": "Main hall",
+        "max_participants": max_participants,
+        "fee": 250.0,
+        "eligible_grades": [8, 9, 10],
+        "status": "upcoming",
+        "created_at": datetime.utcnow(),
+        "registered_count": 0,
+        "waitlist_count": 0,
+        **fields,
+    }
+    result = await database.workshops.insert_one(workshop)
+    return str(result.inserted_id)
+
+async def create_student(database, i: int, role: str = "user"):
+    """Insert a user and return (user id, bearer headers)"""
+    from app.utils.auth import create_access_token
+
+    email = f"student{i}@example.com"
+    result = await database.users.insert_one({
+        "email": email, "full_name": f"Student {i}", "password": "unused", "role": role,
+        "is_active": True, "created_at": datetime.utcnow(), "grade": 9, "school": "Test School",
+        "phone": "9000000000", "parent_name": "Parent", "parent_phone": "9000000001",
+    })
+    token = create_access_token({"sub": email, "role": role})
+    return str(result.inserted_id), {"Authorization": f"Bearer {token}"}
+
+def registration_body(i: int, workshop_id: str):
+    return {
+        "workshop_id": workshop_id,
+        "email": f"student{i}@example.com",
+        "full_name": f"Student {i}",
+        "grade": 9,
+        "school": "Test School",
+        "phone": "9000000000",
+        "parent_name": "Parent",
+        "parent_phone": "9000000001",
+    }
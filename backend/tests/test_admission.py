@@ -0,0 +1,57 @@
+import time
+
+import pytest
+
+from app.utils import admission
+from app.utils.admission import WorkshopGate, ADMITTED, QUEUED, issue_token, parse_token
+
+pytestmark = pytest.mark.anyio
+
+WORKSHOP_ID = "0" * 24
+
+@pytest.fixture(autouse=True)
+def short_hold(monkeypatch):
+    monkeypatch.setattr(admission, "ADMISSION_HOLD_SECONDS", 0.01)
+
+async def queue_behind_full_gate(gate):
+    assert (await gate.acquire(WORKSHOP_ID))[0] == ADMITTED
+    outcome, ticket = await gate.acquire(WORKSHOP_ID)
+    assert outcome == QUEUED
+    return ticket
+
+async def test_token_keeps_place_and_is_single_use():
+    gate = WorkshopGate(1)
+    first = await queue_behind_full_gate(gate)
+    token = issue_token(WORKSHOP_ID, first.arrived, first.place)
+    _, later = await gate.acquire(WORKSHOP_ID)
+    assert gate.position(first) == 1 and gate.position(later) == 2
+
+    # The slot is held for the first in line until it comes back
+    gate.release(0.1)
+    assert await gate.acquire(WORKSHOP_ID, token) == (ADMITTED, None)
+    gate.release(0.1)
+
+    # Reusing the admitted token joins the back of the line like anyone else
+    outcome, again = await gate.acquire(WORKSHOP_ID, token)
+    assert outcome == QUEUED
+    assert again.place != first.place
+    assert again.arrived > later.arrived
+
+async def test_expired_token_joins_the_back_of_the_line(monkeypatch):
+    gate = WorkshopGate(1)
+    await queue_behind_full_gate(gate)
+    early = issue_token(WORKSHOP_ID, time.time() - 60, "abc")
+    monkeypatch.setattr(admission, "ADMISSION_TOKEN_TTL_SECONDS", -1)
+    outcome, ticket = await gate.acquire(WORKSHOP_ID, early)
+    assert outcome == QUEUED
+    assert ticket.place != "abc"
+    assert gate.position(ticket) == 2
+
+def test_tokens_expire_after_ttl(monkeypatch):
+    token = issue_token(WORKSHOP_ID, time.time(), "abc")
+    assert parse_token(token, WORKSHOP_ID)[1] == "abc"
+    assert parse_token(token, "1" * 24) is None
+    forged = token[:-1] + ("1" if token[-1] == "0" else "0")
+    assert parse_token(forged, WORKSHOP_ID) is None
+    monkeypatch.setattr(admission, "ADMISSION_TOKEN_TTL_SECONDS", -1)
+    assert parse_token(token, WORKSHOP_ID) is None
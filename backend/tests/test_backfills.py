@@ -0,0 +1,14 @@
+import pytest
+
+from app.utils.seats import backfill_waitlist_count
+
+pytestmark = pytest.mark.anyio
+
+async def test_backfill_waitlist_count_only_fills_missing(database):
+    await database.workshops.insert_many([
+        {"title": "Old", "registered_count": 3},
+        {"title": "Current", "registered_count": 3, "waitlist_count": 2},
+    ])
+    await backfill_waitlist_count()
+    counts = {w["title"]: w["waitlist_count"] async for w in database.workshops.find()}
+    assert counts == {"Old": 0, "Current": 2}
@@ -0,0 +1,86 @@
+import pytest
+from bson import ObjectId
+
+from app.routes import registrations as registration_routes
+from tests.conftest import SequentialBulkWrites, create_workshop, create_student, registration_body
+
+pytestmark = pytest.mark.anyio
+
+async def add_registration(database, workshop_id, i, status):
+    result = await database.registrations.insert_one({
+        "workshop_id": workshop_id, "user_id": str(ObjectId()), "email": f"s{i}@example.com",
+        "full_name": f"Student {i}", "registration_status": status, "payment_status": "pending",
+    })
+    return result.inserted_id
+
+async def test_bulk_update_skips_registrations_changed_meanwhile(api, database, monkeypatch):
+    workshop_id = await create_workshop(database, max_participants=3, registered_count=1)
+    approved = await add_registration(database, workshop_id, 0, "pending")
+    rejected = [await add_registration(database, workshop_id, i, "rejected") for i in (1, 2)]
+    _, admin_headers = await create_student(database, 99, role="admin")
+
+    async def cancel_one():
+        # Another admin cancels a registration the bulk update moves from rejected to pending
+        await database.registrations.update_one({"_id": rejected[0]}, {"$set": {"registration_status": "cancelled"}})
+
+    monkeypatch.setattr(
+        registration_routes, "registrations_collection", SequentialBulkWrites(database.registrations, cancel_one)
+    )
+    response = await api.post("/api/registrations/bulk-status", headers=admin_headers, json={
+        "ids": [str(approved)] + [str(r) for r in rejected], "registration_status": "pending"
+    })
+
+    assert response.status_code == 200
+    statuses = {item["id"]: item["status"] for item in response.json()["results"]}
+    assert statuses == {str(approved): "unchanged", str(rejected[0]): "conflict", str(rejected[1]): "updated"}
+    workshop = await database.workshops.find_one({"_id": ObjectId(workshop_id)})
+    assert workshop["registered_count"] == 2
+    lost = await database.registrations.find_one({"_id": rejected[0]})
+    assert lost["registration_status"] == "cancelled"
+
+async def test_bulk_update_rejects_filters_over_the_limit(api, database, monkeypatch):
+    monkeypatch.setattr(registration_routes, "MAX_BULK_UPDATE", 2)
+    workshop_id = await create_workshop(database, max_participants=10)
+    for i in range(3):
+        await add_registration(database, workshop_id, i, "pending")
+    _, admin_headers = await create_student(database, 99, role="admin")
+
+    response = await api.post("/api/registrations/bulk-status", headers=admin_headers, json={
+        "filter": {"workshop_id": workshop_id}, "registration_status": "approved"
+    })
+    assert response.status_code == 400
+    assert await database.registrations.count_documents({"registration_status": "approved"}) == 0
+
+@pytest.mark.parametrize("status", ["confirmed", "waitlisted"])
+async def test_unknown_or_waitlisted_status_is_refused(api, database, status):
+    workshop_id = await create_workshop(database, max_participants=3, registered_count=1)
+    registration = await add_registration(database, workshop_id, 0, "pending")
+    _, admin_headers = await create_student(database, 99, role="admin")
+
+    bulk = await api.post("/api/registrations/bulk-status", json={
+        "ids": [str(registration)], "registration_status": status,
+    }, headers=admin_headers)
+    single = await api.put(
+        f"/api/registrations/{registration}", json={"registration_status": status}, headers=admin_headers
+    )
+    assert (bulk.status_code, single.status_code) == (422, 422)
+
+    workshop = await database.workshops.find_one()
+    assert workshop["registered_count"] == 1
+    assert (await database.registrations.find_one())["registration_status"] == "pending"
+
+async def test_waitlisted_is_a_valid_filter(api, database):
+    workshop_id = await create_workshop(database, max_participants=3)
+    await database.registrations.insert_one({
+        **registration_body(0, workshop_id), "registration_status": "waitlisted", "payment_status": "pending",
+    })
+    _, admin_headers = await create_student(database, 99, role="admin")
+
+    response = await api.get(
+        "/api/admin/registrations", params={"registration_status": "waitlisted"}, headers=admin_headers
+    )
+    assert response.status_code == 200
+    assert len(response.json()) == 1
+    assert (await api.get(
+        "/api/admin/registrations", params={"registration_status": "confirmed"}, headers=admin_headers
+    )).status_code == 422
@@ -0,0 +1,49 @@
+import pytest
+
+from app.routes import workshops as workshop_routes
+from app.utils.catalog_cache import catalog_cache, invalidate_catalog
+from tests.conftest import create_workshop, create_student, registration_body
+
+pytestmark = pytest.mark.anyio
+
+# GET /api/workshops with no parameters
+DEFAULT_LIST_KEY = ("list", 0, 20, None, None, None, None, "full")
+
+async def test_seat_change_only_drops_that_workshops_entries(api, database):
+    first = await create_workshop(database, 5, image_url="https://example.com/rocket.png")
+    second = await create_workshop(database, 5, image_url="https://example.com/rocket.png")
+    for path in ("/api/workshops", f"/api/workshops/{first}", f"/api/workshops/{second}"):
+        assert (await api.get(path)).status_code == 200
+    assert catalog_cache.get(DEFAULT_LIST_KEY) is not None
+    assert catalog_cache.get(("workshop", second)) is not None
+
+    _, headers = await create_student(database, 1)
+    response = await api.post("/api/registrations", json=registration_body(1, first), headers=headers)
+    assert response.status_code == 200, response.text
+
+    assert catalog_cache.get(("workshop", first)) is None
+    assert catalog_cache.get(DEFAULT_LIST_KEY) is None
+    assert catalog_cache.get(("workshop", second)) is not None
+    detail = await api.get(f"/api/workshops/{first}")
+    assert detail.json()["registered_count"] == 1
+
+class RacingWorkshops:
+    """The workshops collection, with a seat change landing during each detail read"""
+
+    def __init__(self, collection):
+        self.collection = collection
+
+    def __getattr__(self, name):
+        return getattr(self.collection, name)
+
+    async def find_one(self, *args, **kwargs):
+        workshop = await self.collection.find_one(*args, **kwargs)
+        invalidate_catalog(workshop["_id"])
+        return workshop
+
+async def test_read_overlapping_an_invalidation_is_not_cached(api, database, monkeypatch):
+    workshop_id = await create_workshop(database, 5, image_url="https://example.com/rocket.png")
+    monkeypatch.setattr(workshop_routes, "workshops_collection", RacingWorkshops(workshop_routes.workshops_collection))
+
+    assert (await api.get(f"/api/workshops/{workshop_id}")).status_code == 200
+    assert catalog_cache.get(("workshop", workshop_id)) is None
@@ -0,0 +1,100 @@
+from datetime import datetime, timedelta
+
+import pytest
+
+from app.utils import email as email_module
+from app.utils.email import EmailOutboxWorker, enqueue_emails, retry_delay
+from loadtest.smtp_sink import SMTPSink
+from tests.conftest import SequentialBulkWrites
+
+pytestmark = pytest.mark.anyio
+
+@pytest.fixture
+async def sink(monkeypatch):
+    """A local SMTP server that the outbox delivers to"""
+    sink = SMTPSink(port=0)
+    await sink.start()
+    monkeypatch.setattr(email_module, "SMTP_SERVER", sink.host)
+    monkeypatch.setattr(email_module, "SMTP_PORT", sink.port)
+    monkeypatch.setattr(email_module, "SMTP_STARTTLS", False)
+    monkeypatch.setattr(email_module, "SMTP_USERNAME", None)
+    yield sink
+    await sink.stop()
+
+@pytest.fixture
+async def outbox(database, monkeypatch):
+    collection = SequentialBulkWrites(email_module.email_outbox_collection)
+    monkeypatch.setattr(email_module, "email_outbox_collection", collection)
+    return collection
+
+@pytest.fixture
+async def worker():
+    worker = EmailOutboxWorker()
+    yield worker
+    await worker.pool.close()
+
+def messages(count: int):
+    return [{"to": f"student{i}@example.com", "subject": "Hello", "html": "<p>Hi</p>"} for i in range(count)]
+
+async def test_queued_emails_are_delivered_and_marked_sent(sink, outbox, worker, database):
+    await enqueue_emails(messages(3))
+
+    assert await worker.process_batch() == 3
+    assert sink.messages == 3
+    assert sorted(sink.recipients) == [f"student{i}@example.com" for i in range(3)]
+    async for entry in database.email_outbox.find():
+        assert (entry["status"], entry["attempts"], entry["last_error"]) == ("sent", 1, None)
+        assert "claim_id" not in entry and "locked_until" not in entry
+    assert await worker.process_batch() == 0
+
+async def test_refused_email_backs_off_then_fails(sink, outbox, worker, database, monkeypatch):
+    monkeypatch.setattr(email_module, "EMAIL_MAX_ATTEMPTS", 2)
+    sink.refuse = True
+    await enqueue_emails(messages(1))
+
+    before = datetime.utcnow()
+    assert await worker.process_batch() == 1
+    entry = await database.email_outbox.find_one()
+    assert (entry["status"], entry["attempts"]) == ("pending", 1)
+    assert "550" in entry["last_error"]
+    assert entry["next_attempt_at"] >= before + retry_delay(1)
+    # Not due again until the backoff has passed
+    assert await worker.process_batch() == 0
+
+    await database.email_outbox.update_one({}, {"$set": {"next_attempt_at": datetime.utcnow()}})
+    assert await worker.process_batch() == 1
+    entry = await database.email_outbox.find_one()
+    assert (entry["status"], entry["attempts"]) == ("failed", 2)
+    assert sink.messages == 0
+
+    await database.email_outbox.update_one({}, {"$set": {"next_attempt_at": datetime.utcnow()}})
+    assert await worker.process_batch() == 0
+
+async def test_expired_leases_are_reclaimed(sink, outbox, worker, database):
+    await enqueue_emails(messages(2))
+    now = datetime.utcnow()
+    await database.email_outbox.update_one(
+        {"to": "student0@example.com"},
+        {"$set": {"status": "sending", "claim_id": "crashed", "locked_until": now - timedelta(seconds=1)}}
+    )
+    await database.email_outbox.update_one(
+        {"to": "student1@example.com"},
+        {"$set": {"status": "sending", "claim_id": "busy", "locked_until": now + timedelta(minutes=5)}}
+    )
+
+    assert await worker.process_batch() == 1
+    assert sink.recipients == ["student0@example.com"]
+    busy = await database.email_outbox.find_one({"to": "student1@example.com"})
+    assert (busy["status"], busy["claim_id"]) == ("sending", "busy")
+
+async def test_results_are_only_written_by_the_claim_owner(sink, outbox, worker, database):
+    await enqueue_emails(messages(1))
+
+    async def reclaimed():
+        # The lease ran out mid-send and another worker claimed the entry
+        await database.email_outbox.update_one({}, {"$set": {"claim_id": "other-worker"}})
+
+    outbox.race = reclaimed
+    assert await worker.process_batch() == 1
+    entry = await database.email_outbox.find_one()
+    assert (entry["status"], entry["claim_id"], entry["attempts"]) == ("sending", "other-worker", 0)
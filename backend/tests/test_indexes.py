@@ -0,0 +1,31 @@
+import pytest
+
+from app.utils.indexes import INDEX_PLAN, RETIRED_INDEXES, find_duplicates, reconcile_indexes
+
+pytestmark = pytest.mark.anyio
+
+def planned_index(collection_name: str, name: str):
+    return next(i for i in INDEX_PLAN[collection_name] if i.document["name"] == name)
+
+def test_guest_email_index_leaves_out_signed_in_users():
+    # A parent may register several children from one account and email
+    document = planned_index("registrations", "workshop_id_1_email_1_guests").document
+    assert document["unique"]
+    assert document["partialFilterExpression"] == {"user_id": {"$type": "null"}}
+    assert "workshop_id_1_email_1" in RETIRED_INDEXES["registrations"]
+
+async def test_duplicates_are_reported_before_building(database):
+    # mongomock can't evaluate $type: null, so this uses the users email index
+    await database.users.insert_many([
+        {"email": "parent@example.com", "full_name": "First"},
+        {"email": "parent@example.com", "full_name": "Second"},
+        {"email": "other@example.com", "full_name": "Other"},
+    ])
+    groups = await find_duplicates(database.users, planned_index("users", "email_1"))
+    assert [(g["_id"], g["count"], len(g["ids"])) for g in groups] == [
+        ({"email": "parent@example.com"}, 2, 2)
+    ]
+
+    with pytest.raises(RuntimeError, match="email_1"):
+        await reconcile_indexes(database)
+    assert "email_1" not in await database.users.index_information()
@@ -0,0 +1,35 @@
+import asyncio
+
+import pytest
+
+from app.utils.otp_store import (
+    MemoryOTPStore, OTP_VALID, OTP_INVALID, OTP_MISSING, otp_store,
+)
+from tests.conftest import create_student
+
+pytestmark = pytest.mark.anyio
+
+async def test_concurrent_resets_use_the_code_once(api, database):
+    await create_student(database, 1)
+    email = "student1@example.com"
+    await otp_store.issue(email, "123456", 600)
+
+    responses = await asyncio.gather(*[
+        api.post("/api/auth/reset-password", json={"email": email, "otp": "123456", "new_password": f"new-password-{i}"})
+        for i in range(5)
+    ])
+    assert sorted(r.status_code for r in responses) == [200, 400, 400, 400, 400]
+    assert await otp_store.verify(email, "123456") == OTP_MISSING
+
+async def test_wrong_code_leaves_the_code_usable(database):
+    await otp_store.issue("a@example.com", "123456", 600)
+    assert await otp_store.verify("a@example.com", "000000") == OTP_INVALID
+    assert await otp_store.verify("a@example.com", "123456") == OTP_VALID
+    assert await otp_store.verify("a@example.com", "123456") == OTP_MISSING
+
+async def test_memory_store_consumes_valid_codes():
+    store = MemoryOTPStore("test")
+    await store.issue("a@example.com", "123456", 600)
+    assert await store.verify("a@example.com", "000000") == OTP_INVALID
+    assert await store.verify("a@example.com", "123456") == OTP_VALID
+    assert await store.verify("a@example.com", "123456") == OTP_MISSING
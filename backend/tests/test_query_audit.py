@@ -0,0 +1,76 @@
+import os
+import uuid
+
+import httpx
+import pytest
+
+from tests.conftest import create_workshop, create_student, registration_body
+
+# Explain plans need a real server; mongomock has no query planner
+TEST_MONGODB_URI = os.getenv("TEST_MONGODB_URI")
+
+pytestmark = [
+    pytest.mark.anyio,
+    pytest.mark.skipif(not TEST_MONGODB_URI, reason="set TEST_MONGODB_URI to a MongoDB server to run the query audit"),
+]
+
+@pytest.fixture
+async def audited_database(monkeypatch):
+    """A throwaway database on a real server, with every command recorded"""
+    from motor.motor_asyncio import AsyncIOMotorClient
+    from app.utils import db
+    from app.utils.auth import principal_cache
+    from app.utils.catalog_cache import catalog_cache
+    from app.utils.indexes import apply_index_plan
+    from app.utils.query_audit import query_auditor
+
+    client = AsyncIOMotorClient(TEST_MONGODB_URI, event_listeners=[query_auditor])
+    database = client[f"shibir_audit_{uuid.uuid4().hex[:8]}"]
+    monkeypatch.setattr(db, "client", client)
+    monkeypatch.setattr(db, "db", database)
+    principal_cache.clear()
+    catalog_cache.clear()
+    await apply_index_plan(database, force=True)
+    query_auditor.reset()
+    try:
+        yield client, database
+    finally:
+        await client.drop_database(database.name)
+        client.close()
+
+async def test_main_routes_use_indexes(audited_database):
+    from main import app
+    from app.utils.query_audit import query_auditor
+
+    client, database = audited_database
+    workshop_id = await create_workshop(database, 5)
+    await create_workshop(database, 5, featured=True)
+    _, admin_headers = await create_student(database, 0, role="admin")
+    students = [await create_student(database, i) for i in range(1, 4)]
+
+    async with httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url="http://test") as api:
+        for i, (_, headers) in enumerate(students, start=1):
+            response = await api.post("/api/registrations", json=registration_body(i, workshop_id), headers=headers)
+            assert response.status_code == 200, response.text
+
+        for params in (
+            {}, {"view": "summary"}, {"status": "upcoming"}, {"grade": 9},
+            {"featured": "true"}, {"search": "rocket"},
+        ):
+            assert (await api.get("/api/workshops", params=params)).status_code == 200
+        assert (await api.get(f"/api/workshops/{workshop_id}")).status_code == 200
+        assert (await api.get("/api/registrations/me", headers=students[0][1])).status_code == 200
+
+        for params in ({}, {"workshop_id": workshop_id}, {"registration_status": "pending", "count": "true"}):
+            assert (await api.get("/api/admin/registrations", params=params, headers=admin_headers)).status_code == 200
+        assert (await api.get("/api/admin/users", headers=admin_headers)).status_code == 200
+        response = await api.post(f"/api/admin/export/registrations/{workshop_id}", headers=admin_headers)
+        assert response.status_code == 200
+
+        response = await api.post("/api/registrations/bulk-status", json={
+            "filter": {"workshop_id": workshop_id, "registration_status": "pending"},
+            "registration_status": "approved",
+        }, headers=admin_headers)
+        assert response.status_code == 200, response.text
+
+    await query_auditor.assert_indexed(client)
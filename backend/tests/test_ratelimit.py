@@ -0,0 +1,9 @@
+from app.utils.ratelimit import BucketTable
+
+def test_per_ip_rates_are_shared_between_workers():
+    table = BucketTable("20/60", workers=4)
+    assert table.capacity == 5
+
+def test_per_account_rates_keep_the_full_count():
+    table = BucketTable("3/300", workers=1)
+    assert [table.take("parent@example.com") == 0 for _ in range(4)] == [True, True, True, False]
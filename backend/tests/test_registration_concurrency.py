@@ -0,0 +1,47 @@
+import asyncio
+
+import pytest
+from bson import ObjectId
+
+from tests.conftest import create_workshop, create_student, registration_body
+
+pytestmark = pytest.mark.anyio
+
+SEATS = 5
+STUDENTS = 20
+
+async def test_concurrent_registrations_never_oversell(api, database):
+    workshop_id = await create_workshop(database, max_participants=SEATS)
+    students = [await create_student(database, i) for i in range(STUDENTS)]
+
+    responses = await asyncio.gather(*[
+        api.post("/api/registrations", json=registration_body(i, workshop_id), headers=headers)
+        for i, (_, headers) in enumerate(students)
+    ])
+
+    assert [r.status_code for r in responses] == [200] * STUDENTS
+    workshop = await database.workshops.find_one({"_id": ObjectId(workshop_id)})
+    assert workshop["registered_count"] == SEATS
+    assert workshop["waitlist_count"] == STUDENTS - SEATS
+
+    statuses = [r["registration_status"] async for r in database.registrations.find({"workshop_id": workshop_id})]
+    assert len(statuses) == STUDENTS
+    assert statuses.count("pending") == SEATS
+    assert statuses.count("waitlisted") == STUDENTS - SEATS
+
+async def test_cancelling_a_seat_promotes_the_oldest_waitlisted(api, database):
+    workshop_id = await create_workshop(database, max_participants=1)
+    students = [await create_student(database, i) for i in range(3)]
+    created = []
+    for i, (_, headers) in enumerate(students):
+        response = await api.post("/api/registrations", json=registration_body(i, workshop_id), headers=headers)
+        created.append(response.json())
+    assert [r["registration_status"] for r in created] == ["pending", "waitlisted", "waitlisted"]
+
+    response = await api.delete(f"/api/registrations/{created[0]['_id']}", headers=students[0][1])
+    assert response.status_code in (200, 204)
+
+    workshop = await database.workshops.find_one({"_id": ObjectId(workshop_id)})
+    assert (workshop["registered_count"], workshop["waitlist_count"]) == (1, 1)
+    promoted = await database.registrations.find_one({"_id": ObjectId(created[1]["_id"])})
+    assert promoted["registration_status"] == "pending"
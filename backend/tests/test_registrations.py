@@ -0,0 +1,72 @@
+from datetime import datetime
+
+import pytest
+
+from app.utils import fastjson
+from app.utils.indexes import INDEX_PLAN
+from tests.conftest import create_workshop, create_student, registration_body
+
+pytestmark = pytest.mark.anyio
+
+def planned_index(name: str):
+    return next(i.document for i in INDEX_PLAN["registrations"] if i.document["name"] == name)
+
+async def create_unique_index(database, name: str, partial: bool = True):
+    index = planned_index(name)
+    options = {"partialFilterExpression": index["partialFilterExpression"]} if partial else {}
+    await database.registrations.create_index(list(index["key"].items()), name=name, unique=True, **options)
+
+async def test_guest_can_register_once_per_email(api, database):
+    # mongomock can't evaluate $type: null; every registration here is a guest's
+    await create_unique_index(database, "workshop_id_1_email_1_guests", partial=False)
+    workshop_id = await create_workshop(database, 5)
+
+    first = await api.post("/api/registrations", json=registration_body(1, workshop_id))
+    assert first.status_code == 200, first.text
+    assert first.json()["user_id"] is None
+
+    second = await api.post("/api/registrations", json=registration_body(1, workshop_id))
+    assert second.status_code == 400
+    assert second.json()["detail"] == "This email is already registered for this workshop"
+    workshop = await database.workshops.find_one()
+    assert workshop["registered_count"] == 1
+
+async def test_signed_in_users_may_share_an_email(api, database):
+    await create_unique_index(database, "user_id_1_workshop_id_1_users")
+    workshop_id = await create_workshop(database, 5)
+    _, first_child = await create_student(database, 1)
+    _, second_child = await create_student(database, 2)
+
+    # A parent registering two children with the parent's email
+    for headers in (first_child, second_child):
+        response = await api.post("/api/registrations", json=registration_body(1, workshop_id), headers=headers)
+        assert response.status_code == 200, response.text
+
+    again = await api.post("/api/registrations", json=registration_body(1, workshop_id), headers=first_child)
+    assert again.status_code == 400
+    assert again.json()["detail"] == "You have already registered for this workshop"
+
+async def test_bad_token_is_not_treated_as_a_guest(api, database):
+    workshop_id = await create_workshop(database, 5)
+    response = await api.post(
+        "/api/registrations", json=registration_body(1, workshop_id),
+        headers={"Authorization": "Bearer not-a-token"}
+    )
+    assert response.status_code == 401
+
+@pytest.mark.parametrize("fast_json", [False, True])
+async def test_older_registrations_get_model_defaults(api, database, monkeypatch, fast_json):
+    monkeypatch.setattr(fastjson, "FAST_JSON", fast_json)
+    workshop_id = await create_workshop(database, 5)
+    user_id, headers = await create_student(database, 1)
+    # Written before payment and status fields existed
+    await database.registrations.insert_one(
+        dict(registration_body(1, workshop_id), user_id=user_id, created_at=datetime(2024, 1, 1))
+    )
+
+    response = await api.get("/api/registrations/me", headers=headers)
+    assert response.status_code == 200, response.text
+    [registration] = response.json()
+    assert registration["payment_status"] == "pending"
+    assert registration["registration_status"] == "pending"
+    assert (registration["payment_id"], registration["notes"], registration["amount_paid"]) == (None, None, None)
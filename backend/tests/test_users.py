@@ -0,0 +1,37 @@
+import pytest
+
+from tests.conftest import create_student
+
+pytestmark = pytest.mark.anyio
+
+@pytest.mark.parametrize("params", [{}, {"skip": 1}])
+async def test_admin_lists_users(api, database, params):
+    _, admin_headers = await create_student(database, 0, role="admin")
+    for i in range(1, 4):
+        await create_student(database, i)
+
+    response = await api.get("/api/users", params=params, headers=admin_headers)
+    assert response.status_code == 200, response.text
+    users = response.json()
+    assert len(users) == 4 - params.get("skip", 0)
+    assert all(isinstance(user["_id"], str) for user in users)
+
+async def test_admin_user_pages_follow_the_cursor(api, database):
+    from app.utils.pagination import DEFAULT_PAGE_SIZE
+
+    _, admin_headers = await create_student(database, 0, role="admin")
+    for i in range(1, DEFAULT_PAGE_SIZE + 10):
+        await create_student(database, i)
+
+    first = await api.get("/api/admin/users", params={"role": "user", "count": "true"}, headers=admin_headers)
+    assert len(first.json()) == DEFAULT_PAGE_SIZE
+    assert first.headers["X-Total-Count"] == str(DEFAULT_PAGE_SIZE + 9)
+
+    second = await api.get(
+        "/api/admin/users", params={"role": "user", "cursor": first.headers["X-Next-Cursor"]},
+        headers=admin_headers
+    )
+    assert len(second.json()) == 9
+    assert "X-Next-Cursor" not in second.headers
+    seen = {user["_id"] for user in first.json() + second.json()}
+    assert len(seen) == DEFAULT_PAGE_SIZE + 9
@@ -0,0 +1,60 @@
+import pytest
+
+from app.routes import workshops as workshop_routes
+from tests.conftest import create_workshop, create_student
+
+pytestmark = pytest.mark.anyio
+
+class CountingWorkshops:
+    """The workshops collection, counting writes and optionally changing a field before the first one"""
+
+    def __init__(self, collection, race=None):
+        self.collection = collection
+        self.race = race
+        self.writes = 0
+
+    def __getattr__(self, name):
+        return getattr(self.collection, name)
+
+    async def find_one_and_update(self, *args, **kwargs):
+        if self.race is not None:
+            race, self.race = self.race, None
+            await race()
+        self.writes += 1
+        return await self.collection.find_one_and_update(*args, **kwargs)
+
+    async def update_one(self, *args, **kwargs):
+        self.writes += 1
+        return await self.collection.update_one(*args, **kwargs)
+
+async def update(api, database, workshop_id, payload):
+    _, admin_headers = await create_student(database, 0, role="admin")
+    return await api.put(f"/api/workshops/{workshop_id}", json=payload, headers=admin_headers)
+
+async def test_title_change_updates_prefixes_in_the_same_write(api, database, monkeypatch):
+    workshop_id = await create_workshop(database, 5, image_url="https://example.com/a.png", short_description="Hands-on")
+    workshops = CountingWorkshops(workshop_routes.workshops_collection)
+    monkeypatch.setattr(workshop_routes, "workshops_collection", workshops)
+
+    response = await update(api, database, workshop_id, {"title": "Chemistry"})
+    assert response.status_code == 200, response.text
+    assert workshops.writes == 1
+    stored = await database.workshops.find_one()
+    assert {"ch", "chemistry", "ha", "hands", "on"} <= set(stored["search_prefixes"])
+    assert "rocketry" not in stored["search_prefixes"]
+
+async def test_prefixes_follow_a_concurrent_change_to_the_other_field(api, database, monkeypatch):
+    workshop_id = await create_workshop(database, 5, image_url="https://example.com/a.png", short_description="Hands-on")
+
+    async def edit_description():
+        await database.workshops.update_one({}, {"$set": {"short_description": "Microscopes"}})
+
+    workshops = CountingWorkshops(workshop_routes.workshops_collection, race=edit_description)
+    monkeypatch.setattr(workshop_routes, "workshops_collection", workshops)
+
+    response = await update(api, database, workshop_id, {"title": "Chemistry"})
+    assert response.status_code == 200, response.text
+    stored = await database.workshops.find_one()
+    assert stored["short_description"] == "Microscopes"
+    assert {"chemistry", "microscopes"} <= set(stored["search_prefixes"])
+    assert "hands" not in stored["search_prefixes"]
@@ -2,6 +2,7 @@ import { createContext, useContext, useState, useEffect } from 'react';
 import axios from 'axios';
 import { useNavigate } from 'react-router-dom';
 import { useSnackbar } from './SnackbarContext';
+import { idempotencyHeaders } from '../services/api';
 
 const AuthContext = createContext({
   user: null,
@@ -88,7 +89,9 @@ export const AuthProvider = ({ children }) => {
 
   const register = async (userData) => {
     try {
-      await axios.post('/api/auth/register', userData);
+      await axios.post('/api/auth/register', userData, {
+        headers: idempotencyHeaders('/auth/register', userData),
+      });
       showMessage('Registration successful! Please log in.', 'success');
       navigate('/login');
       return true;
@@ -34,11 +34,11 @@ const Home = () => {
     const loadWorkshops = async () => {
       try {
         // Load featured workshops
-        const featured = await getWorkshops({ featured: true, limit: 5 });
+        const featured = await getWorkshops({ featured: true, limit: 5, view: 'summary' });
         setFeaturedWorkshops(featured);
         
         // Load upcoming workshops
-        const upcoming = await getWorkshops({ status: 'upcoming', limit: 3 });
+        const upcoming = await getWorkshops({ status: 'upcoming', limit: 3, view: 'summary' });
         setUpcomingWorkshops(upcoming);
         
         setLoading(false);
@@ -96,7 +96,13 @@ const Registration = () => {
         user_id: isAuthenticated ? user.id : undefined
       };
       console.log(registrationData)
-      await registerForWorkshop(registrationData);
+      await registerForWorkshop(registrationData, (queue) => {
+        showMessage(
+          `Many students are registering right now. You are number ${queue.position} in line ` +
+          `(about ${Math.ceil(queue.estimated_wait_seconds)}s); please keep this page open.`,
+          'info'
+        );
+      });
       
       showMessage('Registration submitted successfully!', 'success');
       navigate(isAuthenticated ? '/dashboard/registrations' : '/');
@@ -28,7 +28,7 @@ import {
 import { useAuth } from '../contexts/AuthContext';
 import LoadingSpinner from '../components/common/LoadingSpinner';
 import ErrorMessage from '../components/common/ErrorMessage';
-import { getWorkshopById } from '../services/api';
+import { getWorkshopById, subscribeToWorkshopSeats } from '../services/api';
 
 const WorkshopDetail = () => {
   const { id } = useParams();
@@ -55,6 +55,21 @@ const WorkshopDetail = () => {
     loadWorkshop();
   }, [id]);
   
+  // Keep the seat counts current without re-fetching the workshop
+  useEffect(() => {
+    const unsubscribe = subscribeToWorkshopSeats(id, (seats) => {
+      if (seats.status === 'deleted') return;
+      setWorkshop((current) => current && {
+        ...current,
+        registered_count: seats.registered_count,
+        max_participants: seats.max_participants,
+        waitlist_count: seats.waitlist_count,
+        status: seats.status,
+      });
+    });
+    return unsubscribe;
+  }, [id]);
+  
   const handleRegisterClick = () => {
     navigate(`/registration/${workshop._id}`);
   };
@@ -107,14 +122,14 @@ const WorkshopDetail = () => {
       return false;
     }
     
-    // Check if workshop is full
-    if (workshop.registered_count >= workshop.max_participants) {
-      return false;
-    }
-    
     return true;
   };
 
+  // Full workshops still accept registrations onto their waitlist
+  const isFull = () => (
+    workshop.registered_count >= workshop.max_participants || workshop.waitlist_count > 0
+  );
+
   if (loading) {
     return <LoadingSpinner message="Loading workshop details..." />;
   }
@@ -274,7 +289,7 @@ const WorkshopDetail = () => {
                   onClick={handleRegisterClick}
                   sx={{ mt: 2 }}
                 >
-                  Register Now
+                  {isFull() ? 'Join Waitlist' : 'Register Now'}
                 </Button>
               ) : (
                 <Alert severity="warning" sx={{ mt: 2 }}>
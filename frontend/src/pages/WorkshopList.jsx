@@ -81,7 +81,7 @@ const WorkshopList = () => {
         const skip = (page - 1) * limit;
         
         // Build query parameters
-        const params = { skip, limit };
+        const params = { skip, limit, view: 'summary' };
         if (filters.status) params.status = filters.status;
         if (filters.grade) params.grade = filters.grade;
         if (searchTerm) params.search = searchTerm;
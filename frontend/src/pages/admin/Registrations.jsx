@@ -1,4 +1,4 @@
-import { useState, useEffect } from 'react';
+import { useState, useEffect, useRef } from 'react';
 import {
   Box,
   Typography,
@@ -36,14 +36,27 @@ import {
   Cancel as RejectIcon,
   FilterList as FilterIcon
 } from '@mui/icons-material';
-import { getAllRegistrations, updateRegistration, exportRegistrations } from '../../services/api';
+import {
+  getAllRegistrations,
+  getWorkshops,
+  updateRegistration,
+  exportRegistrations,
+  createdRange
+} from '../../services/api';
 import { useSnackbar } from '../../contexts/SnackbarContext';
 import LoadingSpinner from '../../components/common/LoadingSpinner';
 import ErrorMessage from '../../components/common/ErrorMessage';
 
+// registration_status sent for each tab
+const TAB_STATUSES = ['', 'pending', 'approved', 'rejected', 'waitlisted'];
+
 const AdminRegistrations = () => {
   const [registrations, setRegistrations] = useState([]);
+  const [nextCursor, setNextCursor] = useState(null);
+  const [totalRegistrations, setTotalRegistrations] = useState(null);
+  const [workshops, setWorkshops] = useState([]);
   const [loading, setLoading] = useState(true);
+  const [loadingMore, setLoadingMore] = useState(false);
   const [error, setError] = useState(null);
   const [tabValue, setTabValue] = useState(0);
   const [dialogOpen, setDialogOpen] = useState(false);
@@ -51,25 +64,55 @@ const AdminRegistrations = () => {
   const [actionType, setActionType] = useState('');
   const [notes, setNotes] = useState('');
   const [filterWorkshop, setFilterWorkshop] = useState('');
+  const [createdFrom, setCreatedFrom] = useState('');
+  const [createdTo, setCreatedTo] = useState('');
+  const latestRequest = useRef(0);
   const { showMessage } = useSnackbar();
   
-  // Get unique workshops for filtering
-  const workshops = [...new Set(registrations.map(reg => reg.workshop_title))];
+  const workshopTitles = Object.fromEntries(workshops.map(workshop => [workshop._id, workshop.title]));
 
   useEffect(() => {
-    loadRegistrations();
+    getWorkshops({ view: 'summary', limit: 100 })
+      .then(setWorkshops)
+      .catch(err => console.error('Error loading workshops:', err));
   }, []);
+
+  useEffect(() => {
+    loadRegistrations();
+  }, [filterWorkshop, tabValue, createdFrom, createdTo]);
   
-  const loadRegistrations = async () => {
+  // Workshop, status and dates are filtered by the server; the first
+  // page also asks for the total
+  const loadRegistrations = async (cursor = null) => {
+    const request = ++latestRequest.current;
     try {
-      setLoading(true);
-      const data = await getAllRegistrations();
-      setRegistrations(data);
-      setLoading(false);
+      if (cursor) {
+        setLoadingMore(true);
+      } else {
+        setLoading(true);
+      }
+      const page = await getAllRegistrations({
+        cursor,
+        workshop_id: filterWorkshop,
+        registration_status: TAB_STATUSES[tabValue],
+        ...createdRange(createdFrom, createdTo),
+        count: cursor ? undefined : true
+      });
+      // A newer filter has been chosen meanwhile
+      if (request !== latestRequest.current) return;
+      setRegistrations(cursor ? [...registrations, ...page.items] : page.items);
+      setNextCursor(page.nextCursor);
+      if (!cursor) {
+        setTotalRegistrations(page.total);
+      }
     } catch (err) {
       console.error('Error loading registrations:', err);
       setError('Failed to load registrations. Please try again later.');
-      setLoading(false);
+    } finally {
+      if (request === latestRequest.current) {
+        setLoading(false);
+        setLoadingMore(false);
+      }
     }
   };
   
@@ -102,11 +145,11 @@ const AdminRegistrations = () => {
         updateData.notes = notes.trim();
       }
       
-      await updateRegistration(selectedRegistration.id, updateData);
+      await updateRegistration(selectedRegistration._id, updateData);
       
       // Update the local state
       const updatedRegistrations = registrations.map(reg => 
-        reg.id === selectedRegistration.id 
+        reg._id === selectedRegistration._id 
           ? { ...reg, registration_status: actionType, notes: notes.trim() || reg.notes }
           : reg
       );
@@ -142,18 +185,8 @@ const AdminRegistrations = () => {
     }
   };
   
-  const filteredRegistrations = filterWorkshop 
-    ? registrations.filter(reg => reg.workshop_title === filterWorkshop) 
-    : registrations;
-    
-  // Filter based on tab selection
-  const tabFilteredRegistrations = tabValue === 0
-    ? filteredRegistrations
-    : tabValue === 1
-      ? filteredRegistrations.filter(reg => reg.registration_status === 'pending')
-      : tabValue === 2
-        ? filteredRegistrations.filter(reg => reg.registration_status === 'approved')
-        : filteredRegistrations.filter(reg => reg.registration_status === 'rejected');
+  const workshopTitle = (registration) =>
+    workshopTitles[registration.workshop_id] || registration.workshop_title || 'Unknown Workshop';
     
   const formatDate = (dateString) => {
     return new Date(dateString).toLocaleDateString('en-US', { 
@@ -171,6 +204,8 @@ const AdminRegistrations = () => {
         return 'warning';
       case 'rejected':
         return 'error';
+      case 'waitlisted':
+        return 'info';
       default:
         return 'default';
     }
@@ -194,7 +229,7 @@ const AdminRegistrations = () => {
       <Card sx={{ mb: 3 }}>
         <CardContent>
           <Grid container spacing={2} alignItems="center">
-            <Grid item xs={12} md={6}>
+            <Grid item xs={12} md={5}>
               <FormControl fullWidth variant="outlined" size="small">
                 <InputLabel id="workshop-filter-label">Filter by Workshop</InputLabel>
                 <Select
@@ -206,16 +241,39 @@ const AdminRegistrations = () => {
                 >
                   <MenuItem value="">All Workshops</MenuItem>
                   {workshops.map((workshop) => (
-                    <MenuItem key={workshop} value={workshop}>
-                      {workshop}
+                    <MenuItem key={workshop._id} value={workshop._id}>
+                      {workshop.title}
                     </MenuItem>
                   ))}
                 </Select>
               </FormControl>
             </Grid>
-            <Grid item xs={12} md={6} sx={{ textAlign: 'right' }}>
+            <Grid item xs={6} md={2}>
+              <TextField
+                fullWidth
+                label="Registered from"
+                type="date"
+                value={createdFrom}
+                onChange={(e) => setCreatedFrom(e.target.value)}
+                InputLabelProps={{ shrink: true }}
+                size="small"
+              />
+            </Grid>
+            <Grid item xs={6} md={2}>
+              <TextField
+                fullWidth
+                label="Registered to"
+                type="date"
+                value={createdTo}
+                onChange={(e) => setCreatedTo(e.target.value)}
+                InputLabelProps={{ shrink: true }}
+                size="small"
+              />
+            </Grid>
+            <Grid item xs={12} md={3} sx={{ textAlign: 'right' }}>
               <Typography variant="body2" color="textSecondary">
-                Total Registrations: {registrations.length}
+                Showing {registrations.length}
+                {totalRegistrations !== null ? ` of ${totalRegistrations}` : ''} registrations
               </Typography>
             </Grid>
           </Grid>
@@ -226,9 +284,10 @@ const AdminRegistrations = () => {
       <Box sx={{ borderBottom: 1, borderColor: 'divider', mb: 2 }}>
         <Tabs value={tabValue} onChange={handleTabChange}>
           <Tab label="All Registrations" />
-          <Tab label={`Pending (${registrations.filter(r => r.registration_status === 'pending').length})`} />
-          <Tab label={`Approved (${registrations.filter(r => r.registration_status === 'approved').length})`} />
-          <Tab label={`Rejected (${registrations.filter(r => r.registration_status === 'rejected').length})`} />
+          <Tab label="Pending" />
+          <Tab label="Approved" />
+          <Tab label="Rejected" />
+          <Tab label="Waitlisted" />
         </Tabs>
       </Box>
       
@@ -247,14 +306,14 @@ const AdminRegistrations = () => {
             </TableRow>
           </TableHead>
           <TableBody>
-            {tabFilteredRegistrations.length > 0 ? (
-              tabFilteredRegistrations.map((registration) => (
-                <TableRow key={registration.id}>
+            {registrations.length > 0 ? (
+              registrations.map((registration) => (
+                <TableRow key={registration._id}>
                   <TableCell component="th" scope="row">
                     {registration.full_name}
                   </TableCell>
                   <TableCell>{registration.email}</TableCell>
-                  <TableCell>{registration.workshop_title || 'Unknown Workshop'}</TableCell>
+                  <TableCell>{workshopTitle(registration)}</TableCell>
                   <TableCell>{formatDate(registration.created_at)}</TableCell>
                   <TableCell>
                     <Chip 
@@ -301,7 +360,7 @@ const AdminRegistrations = () => {
                     <IconButton 
                       size="small"
                       color="primary"
-                      onClick={() => handleExport(registration.workshop_id, registration.workshop_title)}
+                      onClick={() => handleExport(registration.workshop_id, workshopTitle(registration))}
                     >
                       <DownloadIcon />
                     </IconButton>
@@ -319,6 +378,14 @@ const AdminRegistrations = () => {
         </Table>
       </TableContainer>
       
+      {nextCursor && (
+        <Box sx={{ textAlign: 'center', mt: 2 }}>
+          <Button variant="outlined" onClick={() => loadRegistrations(nextCursor)} disabled={loadingMore}>
+            {loadingMore ? 'Loading...' : 'Load more'}
+          </Button>
+        </Box>
+      )}
+      
       {/* Action Dialog */}
       <Dialog open={dialogOpen} onClose={handleCloseDialog}>
         <DialogTitle>
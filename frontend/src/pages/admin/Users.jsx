@@ -1,4 +1,4 @@
-import { useState, useEffect } from 'react';
+import { useState, useEffect, useRef } from 'react';
 import {
   Box,
   Typography,
@@ -30,20 +30,26 @@ import {
   FilterList as FilterIcon,
   Search as SearchIcon
 } from '@mui/icons-material';
-import { getAllUsers, updateUser } from '../../services/api';
+import { getAllUsers, updateUser, createdRange } from '../../services/api';
 import { useSnackbar } from '../../contexts/SnackbarContext';
 import LoadingSpinner from '../../components/common/LoadingSpinner';
 import ErrorMessage from '../../components/common/ErrorMessage';
 
 const AdminUsers = () => {
   const [users, setUsers] = useState([]);
+  const [nextCursor, setNextCursor] = useState(null);
+  const [totalUsers, setTotalUsers] = useState(null);
   const [loading, setLoading] = useState(true);
+  const [loadingMore, setLoadingMore] = useState(false);
   const [error, setError] = useState(null);
   const [dialogOpen, setDialogOpen] = useState(false);
   const [editDialogOpen, setEditDialogOpen] = useState(false);
   const [selectedUser, setSelectedUser] = useState(null);
   const [searchTerm, setSearchTerm] = useState('');
   const [filterRole, setFilterRole] = useState('');
+  const [createdFrom, setCreatedFrom] = useState('');
+  const [createdTo, setCreatedTo] = useState('');
+  const latestRequest = useRef(0);
   const [editFormData, setEditFormData] = useState({
     full_name: '',
     role: '',
@@ -53,18 +59,38 @@ const AdminUsers = () => {
 
   useEffect(() => {
     loadUsers();
-  }, []);
+  }, [filterRole, createdFrom, createdTo]);
   
-  const loadUsers = async () => {
+  // Role and dates are filtered by the server; the first page also asks for the total
+  const loadUsers = async (cursor = null) => {
+    const request = ++latestRequest.current;
     try {
-      setLoading(true);
-      const data = await getAllUsers();
-      setUsers(data);
-      setLoading(false);
+      if (cursor) {
+        setLoadingMore(true);
+      } else {
+        setLoading(true);
+      }
+      const page = await getAllUsers({
+        cursor,
+        role: filterRole,
+        ...createdRange(createdFrom, createdTo),
+        count: cursor ? undefined : true
+      });
+      // A newer filter has been chosen meanwhile
+      if (request !== latestRequest.current) return;
+      setUsers(cursor ? [...users, ...page.items] : page.items);
+      setNextCursor(page.nextCursor);
+      if (!cursor) {
+        setTotalUsers(page.total);
+      }
     } catch (err) {
       console.error('Error loading users:', err);
       setError('Failed to load users. Please try again later.');
-      setLoading(false);
+    } finally {
+      if (request === latestRequest.current) {
+        setLoading(false);
+        setLoadingMore(false);
+      }
     }
   };
   
@@ -141,12 +167,11 @@ const AdminUsers = () => {
     // }
   };
   
-  const filteredUsers = users
-    .filter(user => 
-      user.full_name.toLowerCase().includes(searchTerm.toLowerCase()) || 
-      user.email.toLowerCase().includes(searchTerm.toLowerCase())
-    )
-    .filter(user => filterRole ? user.role === filterRole : true);
+  // Searches the users loaded so far
+  const filteredUsers = users.filter(user => 
+    user.full_name.toLowerCase().includes(searchTerm.toLowerCase()) || 
+    user.email.toLowerCase().includes(searchTerm.toLowerCase())
+  );
   
   const formatDate = (dateString) => {
     return new Date(dateString).toLocaleDateString('en-US', { 
@@ -186,10 +211,10 @@ const AdminUsers = () => {
       {/* Filter and Search */}
       <Paper sx={{ p: 2, mb: 3 }}>
         <Grid container spacing={2} alignItems="center">
-          <Grid item xs={12} md={6}>
+          <Grid item xs={12} md={4}>
             <TextField
               fullWidth
-              placeholder="Search by name or email"
+              placeholder="Search loaded users by name or email"
               variant="outlined"
               value={searchTerm}
               onChange={(e) => setSearchTerm(e.target.value)}
@@ -200,7 +225,7 @@ const AdminUsers = () => {
             />
           </Grid>
           
-          <Grid item xs={12} md={3}>
+          <Grid item xs={12} md={2}>
             <FormControl fullWidth variant="outlined" size="small">
               <InputLabel id="role-filter-label">Filter by Role</InputLabel>
               <Select
@@ -218,9 +243,33 @@ const AdminUsers = () => {
             </FormControl>
           </Grid>
           
-          <Grid item xs={12} md={3} sx={{ textAlign: 'right' }}>
+          <Grid item xs={6} md={2}>
+            <TextField
+              fullWidth
+              label="Joined from"
+              type="date"
+              value={createdFrom}
+              onChange={(e) => setCreatedFrom(e.target.value)}
+              InputLabelProps={{ shrink: true }}
+              size="small"
+            />
+          </Grid>
+          
+          <Grid item xs={6} md={2}>
+            <TextField
+              fullWidth
+              label="Joined to"
+              type="date"
+              value={createdTo}
+              onChange={(e) => setCreatedTo(e.target.value)}
+              InputLabelProps={{ shrink: true }}
+              size="small"
+            />
+          </Grid>
+          
+          <Grid item xs={12} md={2} sx={{ textAlign: 'right' }}>
             <Typography variant="body2" color="textSecondary">
-              Total Users: {users.length}
+              Showing {users.length}{totalUsers !== null ? ` of ${totalUsers}` : ''} users
             </Typography>
           </Grid>
         </Grid>
@@ -242,7 +291,7 @@ const AdminUsers = () => {
           <TableBody>
             {filteredUsers.length > 0 ? (
               filteredUsers.map((user) => (
-                <TableRow key={user.id}>
+                <TableRow key={user._id}>
                   <TableCell component="th" scope="row">
                     {user.full_name}
                   </TableCell>
@@ -291,6 +340,14 @@ const AdminUsers = () => {
         </Table>
       </TableContainer>
       
+      {nextCursor && (
+        <Box sx={{ textAlign: 'center', mt: 2 }}>
+          <Button variant="outlined" onClick={() => loadUsers(nextCursor)} disabled={loadingMore}>
+            {loadingMore ? 'Loading...' : 'Load more'}
+          </Button>
+        </Box>
+      )}
+      
       {/* Edit User Dialog */}
       <Dialog open={editDialogOpen} onClose={handleEditClose}>
         <DialogTitle>Edit User</DialogTitle>
@@ -44,6 +44,7 @@ const Dashboard = () => {
         const workshopsData = await getWorkshops({ 
           status: 'upcoming',
           limit: 3,
+          view: 'summary',
           grade: user?.grade // Filter by user's grade
         });
         setUpcomingWorkshops(workshopsData);
@@ -80,6 +81,8 @@ const Dashboard = () => {
         return 'warning';
       case 'rejected':
         return 'error';
+      case 'waitlisted':
+        return 'info';
       default:
         return 'default';
     }
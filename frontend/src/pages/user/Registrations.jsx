@@ -108,6 +108,8 @@ const Registrations = () => {
         return 'warning';
       case 'rejected':
         return 'error';
+      case 'waitlisted':
+        return 'info';
       default:
         return 'default';
     }
@@ -185,7 +187,7 @@ const Registrations = () => {
                   </TableContainer>
                 </CardContent>
                 <CardActions>
-                  {registration.registration_status === 'pending' && (
+                  {['pending', 'waitlisted'].includes(registration.registration_status) && (
                     <Button 
                       size="small" 
                       color="error"
@@ -35,6 +35,25 @@ api.interceptors.response.use(
   }
 );
 
+// Idempotency-Key headers for writes a user may resubmit. Submitting the
+// same payload again reuses the key, so after a dropped response the
+// server replays the original result instead of creating a duplicate.
+const idempotencyKeys = {};
+
+const newIdempotencyKey = () =>
+  window.crypto && window.crypto.randomUUID
+    ? window.crypto.randomUUID()
+    : `${Date.now().toString(36)}-${Math.random().toString(36).slice(2)}`;
+
+export const idempotencyHeaders = (path, payload) => {
+  const body = JSON.stringify(payload);
+  const current = idempotencyKeys[path];
+  if (!current || current.body !== body) {
+    idempotencyKeys[path] = { body, key: newIdempotencyKey() };
+  }
+  return { 'Idempotency-Key': idempotencyKeys[path].key };
+};
+
 // Workshop API calls
 export const getWorkshops = async (params = {}) => {
   const response = await api.get('/workshops', { params });
@@ -46,8 +65,20 @@ export const getWorkshopById = async (id) => {
   return response.data;
 };
 
+// Live seat counts for one workshop over server-sent events. Calls
+// onUpdate with { registered_count, max_participants, waitlist_count,
+// seats_left, status } on every change; returns a function that closes
+// the stream. EventSource reconnects on its own after network errors.
+export const subscribeToWorkshopSeats = (id, onUpdate) => {
+  const source = new EventSource(`${api.defaults.baseURL}/workshops/${id}/events`);
+  source.addEventListener('seats', (event) => onUpdate(JSON.parse(event.data)));
+  return () => source.close();
+};
+
 export const createWorkshop = async (workshopData) => {
-  const response = await api.post('/workshops', workshopData);
+  const response = await api.post('/workshops', workshopData, {
+    headers: idempotencyHeaders('/workshops', workshopData),
+  });
   return response.data;
 };
 
@@ -62,9 +93,34 @@ export const deleteWorkshop = async (id) => {
 };
 
 // Registration API calls
-export const registerForWorkshop = async (registrationData) => {
-  const response = await api.post('/registrations', registrationData);
-  return response.data;
+const sleep = (ms) => new Promise((resolve) => setTimeout(resolve, ms));
+
+// When registration for a workshop is busy the server answers 429 with a
+// queue token; retrying with it keeps our place in line. onQueued is
+// called with { position, estimated_wait_seconds } while waiting.
+export const registerForWorkshop = async (registrationData, onQueued) => {
+  let queueToken = null;
+  for (;;) {
+    const headers = idempotencyHeaders('/registrations', registrationData);
+    if (queueToken) {
+      headers['X-Queue-Token'] = queueToken;
+    }
+    try {
+      const response = await api.post('/registrations', registrationData, { headers });
+      return response.data;
+    } catch (error) {
+      const data = error.response && error.response.data;
+      if (!error.response || error.response.status !== 429 || !data || !data.queue_token) {
+        throw error;
+      }
+      queueToken = data.queue_token;
+      if (onQueued) {
+        onQueued(data);
+      }
+      const retryAfter = Number(error.response.headers['retry-after']) || 1;
+      await sleep(retryAfter * 1000);
+    }
+  }
 };
 
 export const getMyRegistrations = async () => {
@@ -82,6 +138,11 @@ export const updateRegistration = async (id, data) => {
   return response.data;
 };
 
+export const bulkUpdateRegistrations = async (bulkData) => {
+  const response = await api.post('/registrations/bulk-status', bulkData);
+  return response.data;
+};
+
 export const cancelRegistration = async (id) => {
   const response = await api.delete(`/registrations/${id}`);
   return response.data;
@@ -109,15 +170,44 @@ export const getDashboardStats = async () => {
   return response.data;
 };
 
-export const getAllRegistrations = async () => {
-  const response = await api.get('/admin/registrations');
-  return response.data;
+// Admin lists come newest first, one page at a time. Pass nextCursor
+// back as `cursor` for the following page; total is only sent when
+// the request asks for count.
+export const ADMIN_PAGE_SIZE = 50;
+
+const getAdminPage = async (path, params = {}) => {
+  // Leave out empty filters
+  const query = Object.fromEntries(
+    Object.entries({ limit: ADMIN_PAGE_SIZE, ...params }).filter(([, value]) => value !== '' && value != null)
+  );
+  const response = await api.get(path, { params: query });
+  const total = response.headers['x-total-count'];
+  return {
+    items: response.data,
+    nextCursor: response.headers['x-next-cursor'] || null,
+    total: total === undefined ? null : Number(total),
+  };
+};
+
+// created_from/created_to for the admin lists from date inputs
+// (YYYY-MM-DD, UTC). created_to is exclusive, so it is moved to the day
+// after the chosen end date.
+export const createdRange = (from, to) => {
+  const range = {};
+  if (from) {
+    range.created_from = from;
+  }
+  if (to) {
+    const end = new Date(`${to}T00:00:00Z`);
+    end.setUTCDate(end.getUTCDate() + 1);
+    range.created_to = end.toISOString().slice(0, 10);
+  }
+  return range;
 };
 
-export const getAllUsers = async () => {
-  const response = await api.get('/admin/users');
-  return response.data;
-};
+export const getAllRegistrations = async (params) => getAdminPage('/admin/registrations', params);
+
+export const getAllUsers = async (params) => getAdminPage('/admin/users', params);
 
 export const updateUser = async (id, userData) => {
   const response = await api.put(`/admin/users/${id}`, userData);
@@ -125,7 +215,9 @@ export const updateUser = async (id, userData) => {
 };
 
 export const exportRegistrations = async (workshopId) => {
-  const response = await api.post(`/admin/export/registrations/${workshopId}`);
+  const response = await api.post(`/admin/export/registrations/${workshopId}`, null, {
+    params: { format: 'json' },
+  });
   return response.data;
 };
 